@@ -1,5 +1,5 @@
 from pathlib import Path
-import os, json
+import os, json, tempfile
 import environ
 from urllib.parse import urlparse
 from datetime import timedelta
@@ -154,6 +154,16 @@ CORS_ALLOW_HEADERS = [
     "x-csrftoken",
     "x-requested-with",
     "x-signature-token",
+    "range",
+    "if-range",
+    "if-none-match",
+]
+# pdf.js lit ces en-têtes pour le chargement progressif (requêtes Range)
+CORS_EXPOSE_HEADERS = [
+    "accept-ranges",
+    "content-range",
+    "content-length",
+    "etag",
 ]
 
 
@@ -225,6 +235,13 @@ EMAIL_USE_TLS =  env.bool('EMAIL_USE_TLS')
 EMAIL_USE_SSL =  env.bool('EMAIL_USE_SSL')
 EMAIL_HOST_USER = env("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = env("EMAIL_HOST_PASSWORD")
+# Connexion SMTP gardée ouverte par worker (signature.mailer) et retries sur erreurs transitoires
+EMAIL_TIMEOUT = env.int("EMAIL_TIMEOUT", default=10)
+EMAIL_CONNECTION_IDLE_TIMEOUT = env.int("EMAIL_CONNECTION_IDLE_TIMEOUT", default=30)
+EMAIL_RETRIES = env.int("EMAIL_RETRIES", default=2)
+EMAIL_RETRY_BACKOFF = env.float("EMAIL_RETRY_BACKOFF", default=1.0)
+# Envois faits pendant une requête HTTP (OTP, activation, mot de passe oublié) : pas de backoff bloquant
+EMAIL_REQUEST_RETRIES = env.int("EMAIL_REQUEST_RETRIES", default=0)
 
 # Certificats / signature
 PDF_SIGNER_DIR = BASE_DIR / "certs"
@@ -237,15 +254,84 @@ FREETSA_URL = "https://freetsa.org/tsr"
 FREETSA_TSA = BASE_DIR / "certs" / "tsa.crt"
 FREETSA_CACERT = BASE_DIR / "certs" / "cacert.pem"
 
+# Horodatage (signature.tsa) : backends essayés dans l'ordre, chacun avec son disjoncteur.
+# TSA_BACKENDS (JSON) : [{"name": "freetsa", "type": "http", "url": "..."},
+#                        {"name": "local", "type": "local", "cert_file": "...", "key_file": "..."}]
+TSA_BACKENDS = json.loads(
+    env.str("TSA_BACKENDS", default=json.dumps([{"name": "freetsa", "type": "http", "url": FREETSA_URL}]))
+)
+TSA_CONNECT_TIMEOUT = env.float("TSA_CONNECT_TIMEOUT", default=3.0)
+TSA_READ_TIMEOUT = env.float("TSA_READ_TIMEOUT", default=10.0)
+TSA_RETRIES = env.int("TSA_RETRIES", default=2)
+TSA_RETRY_BACKOFF = env.float("TSA_RETRY_BACKOFF", default=0.5)
+TSA_POOL_SIZE = env.int("TSA_POOL_SIZE", default=10)
+TSA_BREAKER_THRESHOLD = env.int("TSA_BREAKER_THRESHOLD", default=5)
+TSA_BREAKER_RESET = env.int("TSA_BREAKER_RESET", default=60)
+
+# Révocation (signature.revocation) : récupération OCSP/CRL pour embed_validation_info,
+# servie depuis un cache partagé entre workers (disque par défaut, Redis si URL fournie)
+SIGNATURE_REVOCATION_FETCHING = env.bool("SIGNATURE_REVOCATION_FETCHING", default=False)
+REVOCATION_CACHE_REDIS_URL = env.str("REVOCATION_CACHE_REDIS_URL", default="")
+REVOCATION_CACHE_DIR = env.str(
+    "REVOCATION_CACHE_DIR", default=os.path.join(tempfile.gettempdir(), "esign-revocation")
+)
+REVOCATION_CACHE_DEFAULT_TTL = env.int("REVOCATION_CACHE_DEFAULT_TTL", default=3600)
+REVOCATION_CACHE_MAX_TTL = env.int("REVOCATION_CACHE_MAX_TTL", default=7 * 24 * 3600)
+REVOCATION_CACHE_CERT_TTL = env.int("REVOCATION_CACHE_CERT_TTL", default=24 * 3600)
+REVOCATION_FETCH_TIMEOUT = env.int("REVOCATION_FETCH_TIMEOUT", default=10)
+REVOCATION_PREWARM_MARGIN = env.int("REVOCATION_PREWARM_MARGIN", default=900)
+
+# Cache des vérifications publiques de QR (PrintQRCodeViewSet.verify)
+QR_VERIFY_CACHE_REDIS_URL = env.str("QR_VERIFY_CACHE_REDIS_URL", default="")
+QR_VERIFY_CACHE_TTL = env.int("QR_VERIFY_CACHE_TTL", default=300)
+
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "revocation": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REVOCATION_CACHE_REDIS_URL}
+        if REVOCATION_CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": REVOCATION_CACHE_DIR}
+    ),
+    # Réponses de /prints/<uuid>/verify/ : Redis recommandé en production pour que
+    # l'invalidation (worker Celery compris) touche tous les process ; sinon mémoire locale
+    # et fraîcheur bornée par QR_VERIFY_CACHE_TTL
+    "qr_verify": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": QR_VERIFY_CACHE_REDIS_URL}
+        if QR_VERIFY_CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "qr-verify"}
+    ),
+}
+
 # KMS
 KMS_ACTIVE_KEY_ID = env.int("KMS_ACTIVE_KEY_ID", default=1)
 KMS_RSA_PUBLIC_KEYS = json.loads(
     env.str("KMS_RSA_PUBLIC_KEYS", default='{"1": "%s"}' % str(BASE_DIR / "certs" / "kms_pub_1.pem"))
 )
 KMS_RSA_PRIVATE_KEYS = json.loads(env.str("KMS_RSA_PRIVATE_KEYS", default="{}"))
+# Cache mémoire des DEK déballées (évite un RSA-OAEP par ouverture de fichier)
+KMS_DEK_CACHE_ENABLED = env.bool("KMS_DEK_CACHE_ENABLED", default=True)
+KMS_DEK_CACHE_SIZE = env.int("KMS_DEK_CACHE_SIZE", default=256)
+KMS_DEK_CACHE_TTL = env.int("KMS_DEK_CACHE_TTL", default=300)
+# Format d'écriture du stockage chiffré : EG3 (segments, lecture en flux) ou EG2 (historique)
+ENCRYPTED_STORAGE_FORMAT = env.str("ENCRYPTED_STORAGE_FORMAT", default="EG3")
+ENCRYPTED_STORAGE_SEGMENT_SIZE = env.int("ENCRYPTED_STORAGE_SEGMENT_SIZE", default=64 * 1024)
+
+# Scellement PAdES lors de la signature : "per_field" (une signature par champ, historique),
+# "per_document" (overlays en une passe + une signature par document) ou "single" (une seule signature)
+SIGNATURE_SEAL_MODE = env.str("SIGNATURE_SEAL_MODE", default="per_field")
+# Images de signature préparées (PNG, ImageReader, tampon pyHanko) gardées en LRU par process
+SIGNATURE_IMAGE_CACHE_SIZE = env.int("SIGNATURE_IMAGE_CACHE_SIZE", default=32)
 
 # OTP / limites
 CELERY_BROKER_URL = env.str("CELERY_BROKER_URL", default="")
+# Requis pour les chords (signature par lot parallèle), ex. redis://localhost:6379/1
+CELERY_RESULT_BACKEND = env.str("CELERY_RESULT_BACKEND", default="") or None
+# Nombre max d'items d'un même BatchSignJob signés simultanément
+BATCH_SIGN_CONCURRENCY = env.int("BATCH_SIGN_CONCURRENCY", default=4)
+# Archives de lot : 0 = STORED (PDF déjà compressés), 1..9 = DEFLATED à ce niveau.
+# BATCH_ZIP_STORE=False : pas d'archive stockée, le téléchargement est généré en flux.
+BATCH_ZIP_COMPRESSLEVEL = env.int("BATCH_ZIP_COMPRESSLEVEL", default=0)
+BATCH_ZIP_STORE = env.bool("BATCH_ZIP_STORE", default=True)
 MAX_REMINDERS_SIGN = 5
 MAX_PDF_SIZE = env.int("MAX_PDF_SIZE", default=10 * 1024 * 1024)
 OTP_TTL_SECONDS = env.int("OTP_TTL_SECONDS", default=300)
@@ -254,6 +340,22 @@ MAX_OTP_ATTEMPTS = env.int("MAX_OTP_ATTEMPTS", default=3)
 SIGNATURE_FRAME_ANCESTORS = env.str("SIGNATURE_FRAME_ANCESTORS", "'self'")
 SIGNATURE_X_FRAME_OPTIONS = env.str("SIGNATURE_X_FRAME_OPTIONS", "SAMEORIGIN")
 
+# Signature asynchrone (opt-in) : l'API répond 202 + job id, le worker de la file
+# SIGNATURE_QUEUE fait le travail cryptographique (celery -A esign worker -Q signing)
+SIGNATURE_ASYNC = env.bool("SIGNATURE_ASYNC", default=False)
+SIGNATURE_QUEUE = env.str("SIGNATURE_QUEUE", default="signing")
+CELERY_TASK_ROUTES = {
+    "signature.tasks.process_signing_job": {"queue": SIGNATURE_QUEUE},
+}
+
+# Rappels de signature : nombre de rappels par message Celery (chunks)
+REMINDER_CHUNK_SIZE = env.int("REMINDER_CHUNK_SIZE", default=100)
+# Échéances : enveloppes expirées par transaction, notifications par message Celery
+DEADLINE_BATCH_SIZE = env.int("DEADLINE_BATCH_SIZE", default=500)
+DEADLINE_NOTIFY_CHUNK_SIZE = env.int("DEADLINE_NOTIFY_CHUNK_SIZE", default=50)
+# Tableau de bord (?view=list) : taille de page par défaut de la pagination par curseur
+ENVELOPE_LIST_PAGE_SIZE = env.int("ENVELOPE_LIST_PAGE_SIZE", default=50)
+
 CELERY_BEAT_SCHEDULE = {
     "signature-reminders-every-10min": {
         "task": "signature.tasks.process_signature_reminders",
@@ -263,6 +365,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "signature.tasks.process_deadlines",
         "schedule": 300.0,
     },
+    "signature-revocation-prewarm-every-30min": {
+        "task": "signature.tasks.prewarm_revocation_cache",
+        "schedule": 1800.0,
+    },
     "signature-purge-cancelled-nightly": {
         "task": "signature.tasks.purge_expired_envelopes",
         "schedule": crontab(hour=2, minute=0),
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SignatureConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'signature'
+
+    def ready(self):
+        from . import qr_verify_cache
+
+        qr_verify_cache.connect_signals()
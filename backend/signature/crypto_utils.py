@@ -1,18 +1,19 @@
 # signature/crypto_utils.py 
 
 from pathlib import Path
-import hashlib, logging,base64,hashlib,inspect,io,time,uuid
+import hashlib, logging,base64,hashlib,inspect,io,os,threading,time,uuid
 from django.conf import settings
 from asn1crypto import pem, x509 as asn1x509  # pour ValidationContext pyHanko
 from pyhanko.sign import signers
 from pyhanko.sign.signers import PdfSigner, PdfSignatureMetadata
 from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
-from pyhanko.sign.timestamps.requests_client import HTTPTimeStamper
+from pyhanko.sign.timestamps.api import TimeStamper
 from pyhanko.sign.validation import ValidationContext
 from pyhanko.sign.general import SigningError
 from cryptography import x509 as cx509
 from cryptography.hazmat.backends import default_backend
 from cryptography.x509.oid import NameOID
+from . import revocation, tsa
 try:
     from pyhanko.sign.fields import SigFieldSpec as _SigFieldSpec
 except ImportError:
@@ -21,7 +22,77 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
-def extract_signer_certificate_info():
+def _file_mtime(path) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class SigningMaterialRegistry:
+    """
+    Matériel de signature construit une fois par process (gunicorn, worker Celery) et
+    partagé entre threads : SimpleSigner, racines de confiance, infos du certificat.
+    Tout est reconstruit dès que les settings SELF_SIGN_* / FREETSA_CACERT ou le mtime
+    d'un des fichiers PEM changent (rotation du certificat sans redémarrage).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fingerprint: tuple | None = None
+        self._items: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _current_fingerprint() -> tuple:
+        paths = [
+            str(settings.SELF_SIGN_KEY_FILE),
+            str(settings.SELF_SIGN_CERT_FILE),
+            *[str(p) for p in getattr(settings, "SELF_SIGN_CA_CHAIN", [])],
+            str(getattr(settings, "FREETSA_CACERT", "")),
+        ]
+        return tuple((p, _file_mtime(p)) for p in paths)
+
+    def get(self, name: str, build):
+        fingerprint = self._current_fingerprint()
+        with self._lock:
+            if self._fingerprint != fingerprint:
+                self._items = {}
+                self._fingerprint = fingerprint
+            if name in self._items:
+                self.hits += 1
+                return self._items[name]
+        # Construction hors verrou (lecture disque / parsing), publication sous verrou
+        value = build()
+        with self._lock:
+            if self._fingerprint == fingerprint:
+                value = self._items.setdefault(name, value)
+            self.misses += 1
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._items = {}
+            self._fingerprint = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "loaded": sorted(self._items)}
+
+
+_registry = SigningMaterialRegistry()
+
+
+def reset_signing_material() -> None:
+    """Force le rechargement du signer / racines de confiance / infos certificat."""
+    _registry.invalidate()
+
+
+def signing_material_stats() -> dict:
+    return _registry.stats()
+
+
+def _read_signer_certificate_info() -> dict:
     """
     Lit le certificat de signature (settings.SELF_SIGN_CERT_FILE)
     et renvoie un dict compact pour l'API publique.
@@ -49,6 +120,13 @@ def extract_signer_certificate_info():
         "country": _get(NameOID.COUNTRY_NAME),
         "serial_number": str(cert.serial_number),
     }
+
+
+def extract_signer_certificate_info() -> dict:
+    """Infos du certificat de signature (mises en cache par process, voir SigningMaterialRegistry)."""
+    return dict(_registry.get("cert_info", _read_signer_certificate_info))
+
+
 def compute_hashes(pdf_bytes: bytes):
     return {
         "hash_md5": hashlib.md5(pdf_bytes).hexdigest(),
@@ -67,7 +145,7 @@ def _load_x509_cert(pathlike) -> asn1x509.Certificate:
     return asn1x509.Certificate.load(data)
 
 
-def get_validation_context() -> ValidationContext:
+def _load_trust_roots() -> tuple:
     trust_roots = []
     for p in getattr(settings, "SELF_SIGN_CA_CHAIN", []):
         try:
@@ -78,13 +156,29 @@ def get_validation_context() -> ValidationContext:
         trust_roots.append(_load_x509_cert(settings.FREETSA_CACERT))
     except (OSError, ValueError) as e:
         logger.warning("Certificat FREETSA invalide %s: %s", settings.FREETSA_CACERT, e)
-    return ValidationContext(trust_roots=trust_roots)
+    return tuple(trust_roots)
 
 
-def get_timestamper() -> HTTPTimeStamper:
-    return HTTPTimeStamper(settings.FREETSA_URL)
+def get_timestamper() -> TimeStamper:
+    # Client partagé par process : pool keep-alive, retries, disjoncteur (voir signature.tsa)
+    return tsa.get_timestamper()
 
-def load_simple_signer() -> signers.SimpleSigner:
+def get_validation_context() -> ValidationContext:
+    # Neuf à chaque signature : son `moment` (heure de validation) et ses caches de
+    # chemins / révocation ne doivent pas vivre aussi longtemps que le process.
+    # Seules les racines de confiance (parsing PEM) sont partagées.
+    trust_roots = list(_registry.get("trust_roots", _load_trust_roots))
+    if getattr(settings, "SIGNATURE_REVOCATION_FETCHING", False):
+        # OCSP / CRL / émetteurs via le cache partagé (signature.revocation)
+        return ValidationContext(
+            trust_roots=trust_roots,
+            allow_fetching=True,
+            fetcher_backend=revocation.fetcher_backend(),
+        )
+    return ValidationContext(trust_roots=trust_roots)
+
+
+def _build_simple_signer() -> signers.SimpleSigner:
     return signers.SimpleSigner.load(
         key_file=str(settings.SELF_SIGN_KEY_FILE),
         cert_file=str(settings.SELF_SIGN_CERT_FILE),
@@ -92,6 +186,10 @@ def load_simple_signer() -> signers.SimpleSigner:
         key_passphrase=None,
     )
 
+
+def load_simple_signer() -> signers.SimpleSigner:
+    return _registry.get("signer", _build_simple_signer)
+
 def sign_pdf_bytes(
     pdf_bytes: bytes,
     field_name: str | None = None,
@@ -108,15 +206,11 @@ def sign_pdf_bytes(
     stamp_style = None
     if appearance_image_b64:
         try:
-            from PIL import Image, UnidentifiedImageError
-            from pyhanko import stamp
-            from pyhanko.pdf_utils import images
-            import binascii
-            b64 = appearance_image_b64.split(",", 1)[1] if appearance_image_b64.startswith("data:") else appearance_image_b64
-            pil = Image.open(io.BytesIO(base64.b64decode(b64))).convert("RGBA")
-            stamp_style = stamp.TextStampStyle(stamp_text="", background=images.PdfImage(pil))
-            logger.info(f"stamp_style créé pour {field_name}")
-        except (binascii.Error, UnidentifiedImageError, ValueError) as e:
+            # Style de tampon partagé par contenu (signature.signature_image)
+            from .signature_image import prepare_signature
+            stamp_style = prepare_signature(appearance_image_b64).stamp_style
+            logger.info(f"stamp_style prêt pour {field_name}")
+        except ValueError as e:
             logger.warning("Impossible de créer stamp_style pour %s: %s", field_name, e)
             stamp_style = None  # on n'empêche pas la signature si l'image est invalide
 
@@ -0,0 +1,114 @@
+# ===============================================
+# signature/email_render.py
+# Rendu des emails templatés : chaque template (HTML + texte) est rendu une seule
+# fois par combinaison « statique » (type d'email, app, URL, blocs affichés) en un
+# squelette où seules les valeurs propres au destinataire restent à insérer
+# ===============================================
+from __future__ import annotations
+
+import re
+import threading
+
+from django.conf import settings
+from django.template.loader import get_template
+from django.utils.html import conditional_escape
+
+HTML_TEMPLATE = "emails/base_template.html"
+TEXT_TEMPLATE = "emails/base_template.txt"
+
+# Valeurs propres à chaque destinataire : remplacées par un marqueur dans le
+# squelette (leur présence/absence fait partie de la clé, à cause des {% if %} / |default)
+RECIPIENT_FIELDS = (
+    "subject",
+    "user_name",
+    "message_content",
+    "action_url",
+    "action_text",
+    "otp_code",
+    "otp_expiry",
+    "info_message",
+)
+# Valeurs communes à un envoi : rendues telles quelles dans le squelette
+STATIC_FIELDS = ("email_type", "app_name", "base_url", "info_type")
+
+_MARK = "\x1b"
+_MARK_RE = re.compile(f"{_MARK}(\\w+){_MARK}")
+
+
+class _Skeleton:
+    """Template pré-rendu découpé en [texte, champ, texte, champ, ..., texte]."""
+
+    def __init__(self, rendered: str, autoescape: bool):
+        self.parts = _MARK_RE.split(rendered)
+        self.autoescape = autoescape
+
+    def render(self, context: dict) -> str:
+        out = self.parts[:]
+        for i in range(1, len(out), 2):
+            value = context[out[i]]
+            out[i] = str(conditional_escape(value)) if self.autoescape else str(value)
+        return "".join(out)
+
+
+class EmailTemplateCache:
+    """Squelettes par process, indexés par (template, champs statiques, champs renseignés)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skeletons: dict[tuple, _Skeleton] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def skeleton(self, template_name: str, context: dict) -> _Skeleton:
+        key = (
+            template_name,
+            tuple(context.get(f) for f in STATIC_FIELDS),
+            tuple(bool(context.get(f)) for f in RECIPIENT_FIELDS),
+        )
+        with self._lock:
+            skeleton = self._skeletons.get(key)
+            if skeleton is not None:
+                self.hits += 1
+                return skeleton
+        template = get_template(template_name)
+        marked = {f: context.get(f) for f in STATIC_FIELDS}
+        for f in RECIPIENT_FIELDS:
+            marked[f] = f"{_MARK}{f}{_MARK}" if context.get(f) else context.get(f)
+        # Le template texte est en {% autoescape off %} : valeurs insérées brutes
+        skeleton = _Skeleton(template.render(marked), autoescape=template_name.endswith(".html"))
+        with self._lock:
+            self._skeletons.setdefault(key, skeleton)
+            self.misses += 1
+        return skeleton
+
+    def reset(self) -> None:
+        with self._lock:
+            self._skeletons.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._skeletons), "hits": self.hits, "misses": self.misses}
+
+
+_cache = EmailTemplateCache()
+
+
+def render_template(template_name: str, context: dict) -> str:
+    # En DEBUG les templates sont relus à chaque envoi (comme le loader de Django)
+    if settings.DEBUG:
+        return get_template(template_name).render(context)
+    return _cache.skeleton(template_name, context).render(context)
+
+
+def render_email(context: dict) -> tuple[str, str]:
+    """(html, texte) de l'email uniforme pour `context`."""
+    return render_template(HTML_TEMPLATE, context), render_template(TEXT_TEMPLATE, context).strip() + "\n"
+
+
+def reset_email_templates() -> None:
+    _cache.reset()
+
+
+def email_template_stats() -> dict:
+    return _cache.stats()
@@ -1,15 +1,16 @@
 # signature/email_utils.py
 import os
 import logging
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils.html import strip_tags
 from django.utils import timezone
 
+from .email_render import render_email
+from .mailer import send_messages
+
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
@@ -17,7 +18,7 @@ User = get_user_model()
 AttachmentList = List[Tuple[str, bytes, str]]
 
 
-def send_templated_email(
+def build_templated_email(
     *,
     recipient_email: str,
     subject: str,
@@ -36,7 +37,7 @@ def send_templated_email(
     attachments: list[tuple[str, bytes, str]] | None = None,  # 👈 support PJ
 ):
     """
-    Envoie un email avec le template uniforme (+ PJ si fournies).
+    Construit (sans l'envoyer) un email avec le template uniforme (+ PJ si fournies).
     attachments: liste de tuples (filename, content_bytes, mimetype)
     """
     app_name = app_name or getattr(settings, 'APP_NAME', 'Signature Platform')
@@ -58,9 +59,8 @@ def send_templated_email(
         'base_url': base_url,
     }
 
-    # ⚠️ adapte si ton template a un autre chemin/nom
-    html_content = render_to_string('emails/base_template.html', context)
-    text_content = strip_tags(html_content) or strip_tags(message_content)
+    # Squelettes HTML / texte mis en cache par type d'email (signature.email_render)
+    html_content, text_content = render_email(context)
 
     email = EmailMultiAlternatives(
         subject=subject,
@@ -73,20 +73,40 @@ def send_templated_email(
     if attachments:
         for filename, content, mimetype in attachments:
             email.attach(filename or "attachment", content, mimetype or "application/octet-stream")
+    return email
+
 
-    
+def send_templated_email(*, retries: int | None = None, **kwargs) -> bool:
+    """
+    Envoie un email avec le template uniforme (voir build_templated_email) sur la
+    connexion SMTP partagée du worker (signature.mailer). Ne lève pas.
+    """
     try:
-        email.send()
+        email = build_templated_email(**kwargs)
     except Exception:
-        logger.exception("Erreur lors de l'envoi de l'email")
+        logger.exception("Erreur lors de la préparation de l'email")
+        return False
+    return send_messages([email], retries=retries) == 1
+
+
+def send_templated_emails(messages_kwargs: Iterable[dict]) -> int:
+    """Envoi groupé : construit tous les emails puis les envoie sur une même connexion."""
+    emails = []
+    for kwargs in messages_kwargs:
+        try:
+            emails.append(build_templated_email(**kwargs))
+        except Exception:
+            logger.exception("Erreur lors de la préparation de l'email à %s", kwargs.get("recipient_email"))
+    return send_messages(emails)
 
 
 class EmailTemplates:
     """Helpers pour générer différents types d'emails."""
 
     @staticmethod
-    def activation_email(user: User, activation_link: str) -> None:
+    def activation_email(user: User, activation_link: str, retries: int | None = None) -> None:
         send_templated_email(
+            retries=retries,
             recipient_email=user.email,
             subject="Activation de votre compte",
             message_content=(
@@ -102,8 +122,9 @@ class EmailTemplates:
         )
 
     @staticmethod
-    def password_reset_email(user: User, reset_link: str) -> None:
+    def password_reset_email(user: User, reset_link: str, retries: int | None = None) -> None:
         send_templated_email(
+            retries=retries,
             recipient_email=user.email,
             subject="Réinitialisation de votre mot de passe",
             message_content=(
@@ -163,8 +184,9 @@ class EmailTemplates:
         )
 
     @staticmethod
-    def otp_email(recipient, otp_code: str, expiry_minutes: int = 5) -> None:
+    def otp_email(recipient, otp_code: str, expiry_minutes: int = 5, retries: int | None = None) -> None:
         send_templated_email(
+            retries=retries,
             recipient_email=recipient.email,
             subject="Votre code de vérification",
             message_content=(
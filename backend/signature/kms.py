@@ -3,6 +3,11 @@
 # Abstraction KMS minimale avec backend RSA logiciel
 # ===============================================
 from __future__ import annotations
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from typing import Tuple, Dict
 from django.conf import settings
@@ -87,37 +92,208 @@ def _load_rsa_private_key(pem_path: str) -> rsa.RSAPrivateKey:
 
 
 
- 
+
+
+def _settings_key_map(name: str) -> Dict[int, str]:
+    """Lit KMS_RSA_*_KEYS et normalise (clé -> int, chemin -> absolu)."""
+    raw = getattr(settings, name, {}) or {}
+    return {int(k): _abs_path(v) for k, v in raw.items()}
+
+
+def _file_mtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _build_kms_client(active: int, pub_paths: Dict[int, str], priv_paths: Dict[int, str]) -> LocalRSAKMS:
+    if not pub_paths:
+        raise ValueError("KMS_RSA_PUBLIC_KEYS is empty; configure at least one public key")
+
+    pubs = {kid: _load_rsa_public_key(path) for kid, path in pub_paths.items()}
+    privs = {kid: _load_rsa_private_key(path) for kid, path in priv_paths.items()}
+
+    keys: Dict[int, KMSKey] = {}
+    for kid, pub in pubs.items():
+        keys[kid] = KMSKey(key_id=kid, public_key=pub, private_key=privs.get(kid))
+
+    return LocalRSAKMS(keys, active)
+
+
+class KMSClientRegistry:
+    """
+    Registre process-wide du client KMS.
+    Les PEM sont lus/parsés une seule fois par process (gunicorn, worker Celery) ;
+    le client est reconstruit si les settings KMS_* ou le mtime d'un fichier de clé changent.
+    Thread-safe : la reconstruction se fait sous verrou.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._client: LocalRSAKMS | None = None
+        self._fingerprint: tuple | None = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _current_config():
+        active = int(getattr(settings, "KMS_ACTIVE_KEY_ID", 1))
+        pub_paths = _settings_key_map("KMS_RSA_PUBLIC_KEYS")
+        priv_paths = _settings_key_map("KMS_RSA_PRIVATE_KEYS")
+        fingerprint = (
+            active,
+            tuple(sorted((kid, p, _file_mtime(p)) for kid, p in pub_paths.items())),
+            tuple(sorted((kid, p, _file_mtime(p)) for kid, p in priv_paths.items())),
+        )
+        return active, pub_paths, priv_paths, fingerprint
+
+    def get(self) -> LocalRSAKMS:
+        active, pub_paths, priv_paths, fingerprint = self._current_config()
+        client = self._client
+        if client is not None and self._fingerprint == fingerprint:
+            self.hits += 1
+            return client
+
+        with self._lock:
+            # Un autre thread a pu reconstruire pendant l'attente du verrou
+            if self._client is not None and self._fingerprint == fingerprint:
+                self.hits += 1
+                return self._client
+            client = _build_kms_client(active, pub_paths, priv_paths)
+            # Nouveau jeu de clés : ne plus servir de DEK déballées avec l'ancien
+            _dek_cache.clear()
+            self._client = client
+            self._fingerprint = fingerprint
+            self.misses += 1
+            return client
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._client = None
+            self._fingerprint = None
+        _dek_cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "loaded": int(self._client is not None)}
+
+
+class DEKCache:
+    """
+    LRU borné + TTL des DEK déballées, indexé par (key_id, SHA-256 du DEK wrappé).
+    Évite l'opération RSA-OAEP privée quand le même fichier est rouvert.
+    Les DEK sont gardées dans des bytearray remis à zéro à l'éviction/expiration.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple[int, bytes], tuple[bytearray, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _config():
+        enabled = bool(getattr(settings, "KMS_DEK_CACHE_ENABLED", True))
+        max_size = int(getattr(settings, "KMS_DEK_CACHE_SIZE", 256))
+        ttl = float(getattr(settings, "KMS_DEK_CACHE_TTL", 300))
+        return enabled and max_size > 0 and ttl > 0, max_size, ttl
+
+    @staticmethod
+    def _key(key_id: int, wrapped: bytes) -> tuple[int, bytes]:
+        return int(key_id), hashlib.sha256(wrapped).digest()
+
+    @staticmethod
+    def _zeroize(buf: bytearray) -> None:
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    def _evict(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._zeroize(entry[0])
+
+    def get(self, key_id: int, wrapped: bytes) -> bytes | None:
+        enabled, _, _ = self._config()
+        if not enabled:
+            return None
+        key = self._key(key_id, wrapped)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            dek, expires_at = entry
+            if expires_at <= now:
+                self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return bytes(dek)
+
+    def put(self, key_id: int, wrapped: bytes, dek: bytes) -> None:
+        enabled, max_size, ttl = self._config()
+        if not enabled:
+            return
+        key = self._key(key_id, wrapped)
+        with self._lock:
+            self._evict(key)
+            self._entries[key] = (bytearray(dek), time.monotonic() + ttl)
+            while len(self._entries) > max_size:
+                oldest = next(iter(self._entries))
+                self._evict(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+_dek_cache = DEKCache()
+_registry = KMSClientRegistry()
+
 
 def get_kms_client() -> LocalRSAKMS:
     """
-    Construit le client KMS local en lisant les variables de settings :
+    Retourne le client KMS local partagé du process, construit à partir des settings :
     - KMS_ACTIVE_KEY_ID: int
     - KMS_RSA_PUBLIC_KEYS: dict[int,str] -> chemins PEM publics
     - KMS_RSA_PRIVATE_KEYS: dict[int,str] -> chemins PEM privés (facultatif)
-    Normalise les clés (str -> int) et les chemins (relatif -> absolu).
+    Les clés ne sont relues que si les settings ou les fichiers PEM changent.
     """
-    active = int(getattr(settings, "KMS_ACTIVE_KEY_ID", 1))
+    return _registry.get()
 
-    pub_raw  = getattr(settings, "KMS_RSA_PUBLIC_KEYS", {})
-    priv_raw = getattr(settings, "KMS_RSA_PRIVATE_KEYS", {})
 
-    if not pub_raw:
-        raise ValueError("KMS_RSA_PUBLIC_KEYS is empty; configure at least one public key")
+def reset_kms_client() -> None:
+    """Force le rechargement des clés au prochain get_kms_client()."""
+    _registry.invalidate()
 
-    # Normaliser: clés en int, chemins en absolu
-    pubs = {}
-    for k, v in pub_raw.items():
-        kid = int(k)
-        pubs[kid] = _load_rsa_public_key(_abs_path(v))
 
-    privs = {}
-    for k, v in priv_raw.items():
-        kid = int(k)
-        privs[kid] = _load_rsa_private_key(_abs_path(v))
+def kms_cache_stats() -> Dict[str, int]:
+    return _registry.stats()
 
-    keys: Dict[int, KMSKey] = {}
-    for kid, pub in pubs.items():
-        keys[kid] = KMSKey(key_id=kid, public_key=pub, private_key=privs.get(kid))
 
-    return LocalRSAKMS(keys, active)
+def unwrap_key_cached(key_id: int, wrapped: bytes, client: LocalRSAKMS | None = None) -> bytes:
+    """
+    Déballe une DEK en passant par le cache LRU (KMS_DEK_CACHE_ENABLED / _SIZE / _TTL).
+    En cas d'absence, délègue au client KMS et mémorise le résultat.
+    """
+    dek = _dek_cache.get(key_id, wrapped)
+    if dek is not None:
+        return dek
+    client = client or get_kms_client()
+    dek = client.unwrap_key(key_id, wrapped)
+    _dek_cache.put(key_id, wrapped, dek)
+    return dek
+
+
+def dek_cache_stats() -> Dict[str, int]:
+    return _dek_cache.stats()
+
+
+def clear_dek_cache() -> None:
+    _dek_cache.clear()
@@ -0,0 +1,250 @@
+# ===============================================
+# signature/mailer.py
+# Envoi d'emails sur une connexion SMTP gardée ouverte par worker (thread) :
+# get_connection() + send_messages, retries avec backoff sur erreurs transitoires
+# (tâches Celery ; pas de retry par défaut sur le chemin des requêtes HTTP),
+# et petit serveur SMTP en process pour les tests / benchmarks
+# ===============================================
+from __future__ import annotations
+
+import logging
+import smtplib
+import socketserver
+import threading
+import time
+from email import message_from_bytes
+from typing import Iterable
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Erreurs réseau / SMTP 4xx : on peut réessayer sur une nouvelle connexion."""
+    if isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return bool(exc.recipients) and all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    # SMTPException dérive d'OSError : seules les erreurs socket sont retenues ici
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def _is_stale_connection(exc: Exception) -> bool:
+    """Socket du pool fermé par le serveur pendant l'inactivité (timeout SMTP côté serveur)."""
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, BrokenPipeError, ConnectionResetError))
+
+
+class PooledMailer:
+    """
+    Une connexion par thread, réutilisée entre les messages (et entre les tâches
+    d'un même worker) tant qu'elle n'est pas restée inactive plus de
+    EMAIL_CONNECTION_IDLE_TIMEOUT secondes. Une erreur ferme la connexion : la
+    tentative suivante en rouvre une. Une connexion réutilisée trouvée fermée par
+    le serveur est remplacée et l'envoi refait aussitôt, une fois, sans backoff ni
+    retry consommé (y compris sur le chemin des requêtes, à 0 retry).
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {"connections": 0, "sent": 0, "retries": 0, "failures": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _discard(self) -> None:
+        conn = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                logger.debug("Fermeture SMTP en erreur", exc_info=True)
+
+    def connection(self):
+        idle_timeout = float(getattr(settings, "EMAIL_CONNECTION_IDLE_TIMEOUT", 30))
+        conn = getattr(self._local, "connection", None)
+        now = time.monotonic()
+        if conn is not None and (
+            self._local.backend != settings.EMAIL_BACKEND or now - self._local.last_used > idle_timeout
+        ):
+            self._discard()
+            conn = None
+        self._local.reused = conn is not None
+        if conn is None:
+            conn = get_connection(fail_silently=False)
+            conn.open()
+            self._local.connection = conn
+            self._local.backend = settings.EMAIL_BACKEND
+            self._count("connections")
+        self._local.last_used = now
+        return conn
+
+    def _send_one(self, message: EmailMessage, retries: int) -> bool:
+        backoff = float(getattr(settings, "EMAIL_RETRY_BACKOFF", 1.0))
+        attempt = 0
+        stale_retry = True
+        while True:
+            try:
+                sent = self.connection().send_messages([message])
+                self._local.last_used = time.monotonic()
+                return bool(sent)
+            except Exception as e:
+                reused = getattr(self._local, "reused", False)
+                self._discard()
+                if stale_retry and reused and _is_stale_connection(e):
+                    stale_retry = False
+                    logger.info("Connexion SMTP du pool fermée par le serveur (%s), reconnexion", e)
+                    continue
+                if attempt >= retries or not _is_transient(e):
+                    raise
+                self._count("retries")
+                logger.warning("SMTP transitoire (%s), nouvel essai %d/%d", e, attempt + 1, retries)
+                time.sleep(backoff * (2 ** attempt))
+                attempt += 1
+
+    def send_messages(self, messages: Iterable[EmailMessage], retries: int | None = None) -> int:
+        """
+        Envoie les messages sur la connexion partagée, un par un (un échec ne fait ni
+        perdre ni renvoyer les autres). Ne lève pas : renvoie le nombre envoyé.
+        `retries` : EMAIL_RETRIES par défaut (tâches Celery), request_retries() dans une vue.
+        """
+        if retries is None:
+            retries = int(getattr(settings, "EMAIL_RETRIES", 2))
+        retries = max(0, int(retries))
+        sent = 0
+        for message in messages:
+            try:
+                if self._send_one(message, retries):
+                    sent += 1
+            except Exception:
+                self._count("failures")
+                logger.exception("Échec d'envoi de l'email à %s", ", ".join(message.recipients()))
+        self._count("sent", sent)
+        return sent
+
+    def close(self) -> None:
+        self._discard()
+
+    def reset(self) -> None:
+        self._discard()
+        with self._lock:
+            self.stats = {k: 0 for k in self.stats}
+
+
+_mailer = PooledMailer()
+
+
+def send_messages(messages: Iterable[EmailMessage], retries: int | None = None) -> int:
+    return _mailer.send_messages(messages, retries=retries)
+
+
+def request_retries() -> int:
+    """Retries pour un envoi fait pendant une requête HTTP (backoff bloquant : 0 par défaut)."""
+    return int(getattr(settings, "EMAIL_REQUEST_RETRIES", 0))
+
+
+def close_connection() -> None:
+    _mailer.close()
+
+
+def reset_mailer() -> None:
+    _mailer.reset()
+
+
+def mailer_stats() -> dict:
+    return dict(_mailer.stats)
+
+
+class LocalSMTPServer:
+    """
+    Serveur SMTP minimal en process (127.0.0.1, port libre) : garde les messages
+    reçus et compte les connexions. `fail_messages` : nombre de prochains DATA
+    rejetés en 451 (tests de retry).
+
+        with LocalSMTPServer() as server:
+            settings.EMAIL_HOST, settings.EMAIL_PORT = server.host, server.port
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.messages: list = []
+        self.connections = 0
+        self.fail_messages = 0
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def _reply(self, line: str) -> None:
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                server.connections += 1
+                self._reply("220 localhost ESMTP")
+                mail_from, rcpts = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    cmd = line.decode(errors="replace").strip()
+                    verb = cmd.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self._reply("250 localhost")
+                    elif verb == "MAIL":
+                        mail_from, rcpts = cmd[10:].strip(), []
+                        self._reply("250 OK")
+                    elif verb == "RCPT":
+                        rcpts.append(cmd[8:].strip())
+                        self._reply("250 OK")
+                    elif verb == "DATA":
+                        self._reply("354 End data with <CR><LF>.<CR><LF>")
+                        data = []
+                        while True:
+                            chunk = self.rfile.readline()
+                            if not chunk or chunk == b".\r\n":
+                                break
+                            data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                        if server.fail_messages > 0:
+                            server.fail_messages -= 1
+                            self._reply("451 Try again later")
+                            continue
+                        message = message_from_bytes(b"".join(data))
+                        server.messages.append({"from": mail_from, "to": rcpts, "message": message})
+                        self._reply("250 OK")
+                    elif verb in ("RSET", "NOOP"):
+                        self._reply("250 OK")
+                    elif verb == "QUIT":
+                        self._reply("221 Bye")
+                        return
+                    else:
+                        self._reply("502 Command not implemented")
+
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "LocalSMTPServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0016_envelope_public_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envelope',
+            name='page_geometry',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='envelopedocument',
+            name='page_geometry',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
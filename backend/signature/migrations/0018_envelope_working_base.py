@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:10
+
+import signature.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0017_page_geometry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='envelope',
+            name='working_base',
+            field=models.FileField(blank=True, null=True, storage=signature.storages.EncryptedFileSystemStorage(), upload_to='signature/bases/'),
+        ),
+        migrations.AddField(
+            model_name='envelope',
+            name='working_base_layout',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:12
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0018_envelope_working_base'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SigningJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=12)),
+                ('signature_data', models.JSONField(default=dict)),
+                ('signed_fields', models.JSONField(default=dict)),
+                ('context', models.JSONField(default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('envelope', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signing_jobs', to='signature.envelope')),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signing_jobs', to='signature.enveloperecipient')),
+                ('signature_document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='signature.signaturedocument')),
+            ],
+        ),
+    ]
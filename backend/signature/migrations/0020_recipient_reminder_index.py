@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0019_signingjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enveloperecipient',
+            index=models.Index(fields=['signed', 'next_reminder_at'], name='recipient_reminder_due_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0020_recipient_reminder_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='envelope',
+            index=models.Index(fields=['created_by', 'status', '-created_at'], name='envelope_owner_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enveloperecipient',
+            index=models.Index(fields=['user', 'signed'], name='recipient_user_signed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enveloperecipient',
+            index=models.Index(fields=['email', 'signed'], name='recipient_email_signed_idx'),
+        ),
+    ]
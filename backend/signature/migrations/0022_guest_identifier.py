@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-17 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('signature', '0021_envelope_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestIdentifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('recipient', 'Destinataire'), ('document', 'Document'), ('field', 'Champ')], max_length=16)),
+                ('opaque_id', models.CharField(max_length=24)),
+                ('raw_id', models.PositiveBigIntegerField()),
+                ('salt_fingerprint', models.CharField(max_length=16)),
+                ('envelope', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='guest_identifiers', to='signature.envelope')),
+            ],
+            options={
+                'unique_together': {('envelope', 'kind', 'opaque_id')},
+            },
+        ),
+    ]
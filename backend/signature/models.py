@@ -11,7 +11,7 @@ import hmac
 import logging
 
 from .storages import EncryptedFileSystemStorage, AADContentFile
-from .utils import validate_pdf,stream_hash
+from .utils import validate_pdf, stream_hash, pdf_page_geometry
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +42,28 @@ def _sha256(data: bytes | str) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def _ensure_page_geometry(instance, field_file) -> dict:
+    """
+    Retourne l'index de géométrie persisté ; pour les lignes antérieures à l'index,
+    le calcule une fois depuis le fichier (déchiffré) et le persiste.
+    """
+    if instance.page_geometry:
+        return instance.page_geometry
+    if not field_file or not getattr(field_file, "name", ""):
+        return {}
+    try:
+        with field_file.storage.open(field_file.name, "rb") as fh:
+            data = fh.read()
+    except Exception:
+        logger.warning("Impossible de lire %s pour indexer sa géométrie", field_file.name)
+        return {}
+    geometry = pdf_page_geometry(data)
+    if geometry and instance.pk:
+        type(instance).objects.filter(pk=instance.pk).update(page_geometry=geometry)
+    instance.page_geometry = geometry
+    return geometry
+
+
 # =========================
 # EnvelopeDocument
 # =========================
@@ -58,10 +80,15 @@ class EnvelopeDocument(models.Model):
     file_size = models.PositiveIntegerField(null=True, blank=True)
     hash_original = models.CharField(max_length=64, blank=True)  # SHA-256 hex
     version = models.PositiveIntegerField(default=1)
+    # Index {"page_count", "pages": [{"mediabox", "cropbox"}]} calculé à l'upload
+    page_geometry = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return self.name or f"Document {self.pk}"
 
+    def get_page_geometry(self) -> dict:
+        return _ensure_page_geometry(self, self.file)
+
     # ---------- util ----------
     def _file_changed(self) -> bool:
         if not self.pk:
@@ -124,6 +151,7 @@ class EnvelopeDocument(models.Model):
             self.file_size = len(data)
             if self.file_type == "pdf" and not data.startswith(b"%PDF-"):
                 raise ValidationError("Le fichier n'est pas un PDF valide.")
+            self.page_geometry = pdf_page_geometry(data)
             # hash clair
             try:
                 import hashlib
@@ -191,6 +219,17 @@ class Envelope(models.Model):
     version = models.PositiveIntegerField(default=1)
     file_size = models.PositiveIntegerField(null=True, blank=True)
     file_type = models.CharField(max_length=50, blank=True)
+    # Index de géométrie de document_file (voir EnvelopeDocument.page_geometry)
+    page_geometry = models.JSONField(default=dict, blank=True)
+    # PDF de base de travail (concaténation chiffrée des originaux) et son layout
+    # {"sources", "order", "page_counts", "offsets", "pages"} — voir signature.working_base
+    working_base = models.FileField(
+        upload_to="signature/bases/",
+        storage=encrypted_storage,
+        null=True,
+        blank=True,
+    )
+    working_base_layout = models.JSONField(default=dict, blank=True)
 
     flow_type = models.CharField(
         max_length=20, choices=FLOW_CHOICES, default="sequential"
@@ -201,6 +240,12 @@ class Envelope(models.Model):
     expires_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Onglets du tableau de bord (EnvelopeViewSet.get_queryset) : filtre + tri servis par l'index
+            models.Index(fields=['created_by', 'status', '-created_at'], name='envelope_owner_status_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
 
@@ -218,6 +263,36 @@ class Envelope(models.Model):
         # Gardé pour compatibilité si ailleurs tu hashes des bytes/str
         return _sha256(data)
 
+    def get_page_geometry(self) -> dict:
+        return _ensure_page_geometry(self, self.document_file)
+
+    def delete_stored_files(self) -> None:
+        """
+        Supprime du stockage tous les fichiers de l'enveloppe (document principal,
+        base de travail, annexes, PDF signés) avant une purge. Best-effort.
+        """
+        files_to_delete = []
+        for field_file in (self.document_file, self.working_base):
+            if field_file and field_file.name:
+                files_to_delete.append(field_file)
+        for document in self.documents.all():
+            if document.file and document.file.name:
+                files_to_delete.append(document.file)
+        for signature in self.signatures.all():
+            if signature.signed_file and signature.signed_file.name:
+                files_to_delete.append(signature.signed_file)
+
+        for field_file in files_to_delete:
+            try:
+                field_file.delete(save=False)
+            except FileNotFoundError:
+                continue
+            except Exception as exc:
+                logger.warning(
+                    "Suppression impossible du fichier %s (enveloppe %s): %s",
+                    getattr(field_file, "name", "<inconnu>"), self.pk, exc,
+                )
+
     @property
     def is_completed(self) -> bool:
         return self.status == "completed"
@@ -281,6 +356,7 @@ class Envelope(models.Model):
             self.file_size = len(data)
             if self.file_type == "pdf" and not data.startswith(b"%PDF-"):
                 raise ValidationError("Le fichier n'est pas un PDF valide.")
+            self.page_geometry = pdf_page_geometry(data)
             try:
                 import hashlib
                 self.hash_original = hashlib.sha256(data).hexdigest()
@@ -406,6 +482,13 @@ class EnvelopeRecipient(models.Model):
     class Meta:
         unique_together = ['envelope', 'email']
         ordering = ['order']
+        indexes = [
+            # Sélection des rappels dus (process_signature_reminders)
+            models.Index(fields=['signed', 'next_reminder_at'], name='recipient_reminder_due_idx'),
+            # Semi-jointures des onglets destinataire (EnvelopeViewSet._recipient_filter)
+            models.Index(fields=['user', 'signed'], name='recipient_user_signed_idx'),
+            models.Index(fields=['email', 'signed'], name='recipient_email_signed_idx'),
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.envelope.title}"
@@ -436,6 +519,27 @@ class SigningField(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_field_type_display()}) - Page {self.page}"
 
+class GuestIdentifier(models.Model):
+    """
+    Identifiant opaque exposé aux invités (HMAC tronqué, voir
+    views.envelope._guest_identifiers) → id réel, pour la résolution inverse par
+    requête indexée. `salt_fingerprint` : empreinte du SIGNATURE_GUEST_SALT ayant
+    servi ; après rotation, les lignes sont recalculées à la première résolution.
+    """
+    KIND_CHOICES = [("recipient", "Destinataire"), ("document", "Document"), ("field", "Champ")]
+
+    envelope = models.ForeignKey(Envelope, on_delete=models.CASCADE, related_name='guest_identifiers')
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    opaque_id = models.CharField(max_length=24)
+    raw_id = models.PositiveBigIntegerField()
+    salt_fingerprint = models.CharField(max_length=16)
+
+    class Meta:
+        unique_together = ['envelope', 'kind', 'opaque_id']
+
+    def __str__(self):
+        return f"{self.kind}:{self.opaque_id} -> {self.raw_id}"
+
 class SignatureDocument(models.Model):
     envelope = models.ForeignKey(Envelope, on_delete=models.CASCADE, related_name='signatures')
     recipient = models.ForeignKey(EnvelopeRecipient, on_delete=models.CASCADE)
@@ -452,6 +556,34 @@ class SignatureDocument(models.Model):
     def __str__(self):
         return f"Signature de {self.recipient.full_name} - {self.envelope.title}"
 
+class SigningJob(models.Model):
+    """Signature différée (SIGNATURE_ASYNC) : exécutée par le worker de la file de signature."""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    envelope = models.ForeignKey(Envelope, on_delete=models.CASCADE, related_name="signing_jobs")
+    recipient = models.ForeignKey(EnvelopeRecipient, on_delete=models.CASCADE, related_name="signing_jobs")
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="queued")
+    signature_data = models.JSONField(default=dict)
+    signed_fields = models.JSONField(default=dict)
+    # Contexte HTTP capturé à la soumission (signataire, IP, user-agent, URL de base)
+    context = models.JSONField(default=dict)
+    signature_document = models.ForeignKey(
+        SignatureDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"SigningJob {self.id} - {self.status}"
+
+
 # signature/models.py
 class PrintQRCode(models.Model):
     TYPE_CHOICES = [
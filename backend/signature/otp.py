@@ -5,6 +5,7 @@ from django.core.cache import cache
 from django.conf import settings
 from smtplib import SMTPException
 from .email_utils import EmailTemplates
+from .mailer import request_retries
 
 
 # Durée de validité de l'OTP (en secondes) et nombre max de tentatives
@@ -65,7 +66,8 @@ def send_otp(recipient, otp):
     En cas d'échec, l'erreur est journalisée de manière détaillée.
     """
     try:
-        EmailTemplates.otp_email(recipient, otp, expiry_minutes)
+        # Appelé depuis la vue send_otp : pas de retry/backoff bloquant la requête
+        EmailTemplates.otp_email(recipient, otp, expiry_minutes, retries=request_retries())
     except (SMTPException, ValueError) as e:
         # Log l'erreur sans interrompre le flux
         import logging
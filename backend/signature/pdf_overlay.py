@@ -0,0 +1,171 @@
+# ===============================================
+# signature/pdf_overlay.py
+# Calques image (signatures, QR) ajoutés en mise à jour incrémentale pyHanko :
+# seuls les flux de contenu des pages touchées et les nouveaux XObjects sont
+# ajoutés en fin de fichier — le document d'origine (et les plages d'octets des
+# signatures existantes) reste intact
+# ===============================================
+from __future__ import annotations
+
+import hashlib
+import io
+
+from PIL import Image
+from pyhanko.pdf_utils import generic, misc
+from pyhanko.pdf_utils.generic import pdf_name
+from pyhanko.pdf_utils.images import pil_image
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+
+RESOURCE_PREFIX = "/EsignImg"
+
+
+def _inherited(page: generic.DictionaryObject, key: str):
+    node = page
+    while node is not None:
+        if key in node:
+            return node[key]
+        node = node["/Parent"] if "/Parent" in node else None
+    return None
+
+
+def _box(value) -> tuple[float, float, float, float]:
+    llx, lly, urx, ury = (float(v) for v in value)
+    return min(llx, urx), min(lly, ury), max(llx, urx), max(lly, ury)
+
+
+def fit_box(img_w: int, img_h: int, x: float, y: float, w: float, h: float) -> tuple[float, float, float, float]:
+    """Équivalent de reportlab preserveAspectRatio=True, anchor='c'."""
+    if not img_w or not img_h:
+        return x, y, w, h
+    scale = min(w / img_w, h / img_h)
+    dw, dh = img_w * scale, img_h * scale
+    return x + (w - dw) / 2, y + (h - dh) / 2, dw, dh
+
+
+class _IndexedIncrementalWriter(IncrementalPdfFileWriter):
+    """
+    find_page_for_modification en O(1) : pyHanko reparcourt l'arbre des pages à
+    chaque appel (quadratique quand on touche toutes les pages) ; ici il est
+    indexé une seule fois, au premier besoin.
+    """
+
+    _page_index: list | None = None
+
+    def _index_pages(self) -> list:
+        index, seen = [], set()
+
+        def _walk(node_ref, inherited):
+            node = node_ref.get_object()
+            try:
+                inherited = node.raw_get("/Resources")
+            except KeyError:
+                pass
+            for kid_ref in node["/Kids"]:
+                if kid_ref.reference in seen:
+                    raise misc.PdfReadError("Circular reference in page tree")
+                seen.add(kid_ref.reference)
+                if kid_ref.get_object()["/Type"] == "/Pages":
+                    _walk(kid_ref, inherited)
+                else:
+                    index.append((kid_ref, inherited))
+
+        _walk(self.root.raw_get("/Pages"), generic.DictionaryObject())
+        return index
+
+    def find_page_for_modification(self, page_ix):
+        if self._page_index is None:
+            self._page_index = self._index_pages()
+        page_ref, inherited = self._page_index[page_ix]
+        try:
+            # Ressources propres à la page, relues à chaque fois (add_stream_to_page peut les remplacer)
+            return page_ref, page_ref.get_object().raw_get("/Resources")
+        except KeyError:
+            return page_ref, inherited
+
+
+class IncrementalOverlay:
+    """
+    Accumule des images à poser sur des pages puis écrit UNE révision incrémentale.
+    Chaque image (clé de contenu) n'est embarquée qu'une fois ; les flux de dessin
+    identiques (ex. QR au même endroit sur des pages de même taille) sont partagés.
+    Coordonnées en points PDF, origine bas-gauche de la page.
+    """
+
+    def __init__(self, pdf_bytes: bytes):
+        self._source = pdf_bytes
+        self.writer = _IndexedIncrementalWriter(io.BytesIO(pdf_bytes), strict=False)
+        self._images: dict[str, tuple[str, Image.Image]] = {}
+        self._image_refs: dict[str, generic.IndirectObject] = {}
+        self._streams: dict[bytes, generic.IndirectObject] = {}
+        self._draws: dict[int, list[tuple[bytes, str]]] = {}
+
+    @property
+    def page_count(self) -> int:
+        return int(self.writer.root["/Pages"]["/Count"])
+
+    def _page(self, page_ix: int) -> generic.DictionaryObject:
+        page_ref, _ = self.writer.find_page_for_modification(page_ix)
+        return page_ref.get_object()
+
+    def media_box(self, page_ix: int) -> tuple[float, float, float, float]:
+        return _box(_inherited(self._page(page_ix), "/MediaBox"))
+
+    def crop_box(self, page_ix: int) -> tuple[float, float, float, float]:
+        page = self._page(page_ix)
+        return _box(_inherited(page, "/CropBox") or _inherited(page, "/MediaBox"))
+
+    def _image_ref(self, key: str) -> generic.IndirectObject:
+        # XObject image écrit au premier usage, puis partagé par toutes les pages
+        if key not in self._image_refs:
+            image = self._images[key][1]
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            self._image_refs[key] = pil_image(image, self.writer)
+        return self._image_refs[key]
+
+    def add_image(self, page_ix: int, image: Image.Image, x: float, y: float, w: float, h: float, *, key: str | None = None):
+        """Pose `image` dans le rectangle (x, y, w, h) de la page `page_ix`."""
+        if key is None:
+            key = hashlib.sha256(image.tobytes()).hexdigest()
+        # Nom dérivé du contenu : une page qui porte déjà cette image (révision
+        # précédente, ressources partagées) la réutilise sans la ré-embarquer
+        name = self._images.setdefault(key, (f"{RESOURCE_PREFIX}{key[:16]}", image))[0]
+        paint = b"q %g 0 0 %g %g %g cm %s Do Q\n" % (w, h, x, y, name.encode("ascii"))
+        self._draws.setdefault(page_ix, []).append((paint, key))
+
+    def _shared_stream(self, data: bytes) -> generic.IndirectObject:
+        ref = self._streams.get(data)
+        if ref is None:
+            stream = generic.StreamObject(stream_data=data)
+            stream.compress()
+            ref = self._streams[data] = self.writer.add_object(stream)
+        return ref
+
+    def _page_resources(self, page_ix: int, keys) -> generic.DictionaryObject | None:
+        """XObjects à déclarer sur la page (ceux déjà présents — ressources partagées — sont omis)."""
+        _, res_ref = self.writer.find_page_for_modification(page_ix)
+        existing = res_ref.get_object().get("/XObject")
+        existing = existing.get_object() if existing is not None else {}
+        missing = generic.DictionaryObject()
+        for key in keys:
+            name = self._images[key][0]
+            if name not in existing:
+                missing[pdf_name(name)] = self._image_ref(key)
+        if not missing:
+            return None
+        return generic.DictionaryObject({pdf_name("/XObject"): missing})
+
+    def to_bytes(self) -> bytes:
+        """Révision incrémentale (ou le PDF d'origine inchangé si rien n'a été posé)."""
+        if not self._draws:
+            return self._source
+        push = self._shared_stream(b"q\n")
+        for page_ix, draws in sorted(self._draws.items()):
+            resources = self._page_resources(page_ix, dict.fromkeys(key for _, key in draws))
+            paint = b"Q\n" + b"".join(p for p, _ in draws)
+            # Contenu existant isolé dans q/Q (comme pyHanko pour ses tampons)
+            self.writer.add_stream_to_page(page_ix, push, prepend=True)
+            self.writer.add_stream_to_page(page_ix, self._shared_stream(paint), resources)
+        out = io.BytesIO()
+        self.writer.write(out)
+        return out.getvalue()
@@ -0,0 +1,31 @@
+# ===============================================
+# signature/qr_stamp.py
+# Apposition du QR de vérification sur toutes les pages : le QR est embarqué une
+# seule fois (XObject image) et référencé par chaque page en mise à jour
+# incrémentale (signature.pdf_overlay) — les signatures antérieures restent intactes
+# ===============================================
+from __future__ import annotations
+
+import hashlib
+import io
+
+from PIL import Image
+
+from .pdf_overlay import IncrementalOverlay
+
+
+def stamp_qr_all_pages(pdf_bytes: bytes, qr_png_bytes: bytes, *, size_pt=50, margin_pt=13, y_offset=-5) -> bytes:
+    """
+    Appose le QR (PNG) en bas à droite de toutes les pages.
+    Les flux de contenu d'origine ne sont ni décodés ni réécrits ; le flux de
+    placement est partagé par toutes les pages de même MediaBox.
+    """
+    overlay = IncrementalOverlay(pdf_bytes)
+    qr = Image.open(io.BytesIO(qr_png_bytes)).convert("L")
+    key = hashlib.sha256(qr_png_bytes).hexdigest()
+    for page_ix in range(overlay.page_count):
+        llx, lly, urx, _ = overlay.media_box(page_ix)
+        x = urx - margin_pt - size_pt
+        y = lly + margin_pt + y_offset
+        overlay.add_image(page_ix, qr, x, y, size_pt, size_pt, key=key)
+    return overlay.to_bytes()
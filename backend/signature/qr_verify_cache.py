@@ -0,0 +1,93 @@
+# ===============================================
+# signature/qr_verify_cache.py
+# Cache des réponses publiques de PrintQRCodeViewSet.verify, par QR (uuid + hmac),
+# invalidé à chaque changement de l'enveloppe, de ses destinataires, de ses
+# signatures ou du QR lui-même (signaux + appels explicites pour les update() en masse)
+# ===============================================
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, "QR_VERIFY_CACHE_ALIAS", "qr_verify")]
+
+
+def _key(qr_uuid, sig: str) -> str:
+    return "qrverify:" + hashlib.sha256(f"{qr_uuid}:{sig}".encode("utf-8")).hexdigest()
+
+
+def get_entry(qr_uuid, sig: str | None) -> dict | None:
+    """Entrée {"payload", "etag", "last_modified"} en cache, ou None."""
+    if not sig:
+        return None
+    try:
+        return _cache().get(_key(qr_uuid, sig))
+    except Exception:
+        logger.warning("Cache verify QR indisponible", exc_info=True)
+        return None
+
+
+def set_entry(qr_uuid, sig: str, entry: dict) -> None:
+    try:
+        _cache().set(_key(qr_uuid, sig), entry, timeout=int(getattr(settings, "QR_VERIFY_CACHE_TTL", 300)))
+    except Exception:
+        logger.warning("Cache verify QR indisponible", exc_info=True)
+
+
+def invalidate_envelopes(envelope_ids: Iterable[int]) -> None:
+    """Supprime les réponses en cache de tous les QR des enveloppes données."""
+    from .models import PrintQRCode
+
+    envelope_ids = list(envelope_ids)
+    if not envelope_ids:
+        return
+    keys = [
+        _key(qr_uuid, qr_hmac)
+        for qr_uuid, qr_hmac in PrintQRCode.objects.filter(envelope_id__in=envelope_ids).values_list("uuid", "hmac")
+    ]
+    if keys:
+        try:
+            _cache().delete_many(keys)
+        except Exception:
+            logger.warning("Invalidation du cache verify QR impossible", exc_info=True)
+
+
+def invalidate_qr(qr_uuid, sig: str) -> None:
+    try:
+        _cache().delete(_key(qr_uuid, sig))
+    except Exception:
+        logger.warning("Invalidation du cache verify QR impossible", exc_info=True)
+
+
+def _on_change(sender, instance, **kwargs):
+    from .models import PrintQRCode
+
+    if isinstance(instance, PrintQRCode):
+        # Clé connue directement (reste valable après suppression, y compris en cascade)
+        qr_uuid, qr_hmac = instance.uuid, instance.hmac
+        transaction.on_commit(lambda: invalidate_qr(qr_uuid, qr_hmac))
+        return
+    envelope_id = getattr(instance, "envelope_id", None) or instance.pk
+    if envelope_id is None:
+        return
+    # Après commit : une lecture concurrente ne peut pas remettre l'ancien état en cache
+    transaction.on_commit(lambda: invalidate_envelopes([envelope_id]))
+
+
+def connect_signals() -> None:
+    from .models import Envelope, EnvelopeRecipient, PrintQRCode, SignatureDocument
+
+    for model in (Envelope, EnvelopeRecipient, SignatureDocument, PrintQRCode):
+        uid = f"qr_verify_cache:{model.__name__}"
+        post_save.connect(_on_change, sender=model, dispatch_uid=f"{uid}:save")
+        post_delete.connect(_on_change, sender=model, dispatch_uid=f"{uid}:delete")
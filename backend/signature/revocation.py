@@ -0,0 +1,267 @@
+# ===============================================
+# signature/revocation.py
+# Cache partagé (disque / Redis via le cache Django "revocation") des réponses
+# OCSP, CRL et certificats émetteurs récupérés par pyHanko pour embed_validation_info
+# ===============================================
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Iterable
+
+from asn1crypto import crl, ocsp, pem, x509
+from django.conf import settings
+from django.core.cache import caches
+from pyhanko_certvalidator.authority import AuthorityWithCert
+from pyhanko_certvalidator.fetchers.api import (
+    CertificateFetcher,
+    CRLFetcher,
+    FetcherBackend,
+    Fetchers,
+    OCSPFetcher,
+)
+from pyhanko_certvalidator.fetchers.requests_fetchers import RequestsFetcherBackend
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, "REVOCATION_CACHE_ALIAS", "revocation")]
+
+
+def _key(kind: str, *parts: bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part)
+    return f"revinfo:{kind}:{h.hexdigest()}"
+
+
+def _now() -> datetime:
+    return datetime.now(dt_timezone.utc)
+
+
+def _ttl_until(next_update: datetime | None) -> int:
+    """Durée de cache en secondes : jusqu'à nextUpdate, sinon défaut, bornée par le max."""
+    default_ttl = int(getattr(settings, "REVOCATION_CACHE_DEFAULT_TTL", 3600))
+    max_ttl = int(getattr(settings, "REVOCATION_CACHE_MAX_TTL", 7 * 24 * 3600))
+    if next_update is None:
+        return min(default_ttl, max_ttl)
+    return max(0, min(int((next_update - _now()).total_seconds()), max_ttl))
+
+
+def _ocsp_next_update(resp: ocsp.OCSPResponse) -> datetime | None:
+    try:
+        basic = resp["response_bytes"]["response"].parsed
+        updates = [r["next_update"].native for r in basic["tbs_response_data"]["responses"]]
+    except (KeyError, TypeError, ValueError):
+        return None
+    updates = [u for u in updates if u is not None]
+    return min(updates) if updates else None
+
+
+def _crl_next_update(crls: Iterable[crl.CertificateList]) -> datetime | None:
+    updates = [c["tbs_cert_list"]["next_update"].native for c in crls]
+    updates = [u for u in updates if u is not None]
+    return min(updates) if updates else None
+
+
+class _Store:
+    """
+    Entrée de cache = (expiration epoch, liste de DER). `min_remaining` permet au
+    pré-chauffage de considérer comme périmée une entrée proche de son nextUpdate.
+    """
+
+    def __init__(self, min_remaining: int = 0):
+        self.min_remaining = min_remaining
+
+    def get(self, key: str) -> list[bytes] | None:
+        entry = _cache().get(key)
+        if not entry:
+            return None
+        expires_at, blobs = entry
+        if expires_at - _now().timestamp() <= self.min_remaining:
+            return None
+        return blobs
+
+    def put(self, key: str, blobs: list[bytes], ttl: int) -> None:
+        if ttl <= 0:
+            return
+        _cache().set(key, (_now().timestamp() + ttl, blobs), timeout=ttl)
+
+
+class CachedOCSPFetcher(OCSPFetcher):
+    def __init__(self, inner: OCSPFetcher, store: _Store):
+        self.inner = inner
+        self.store = store
+        self._by_cert: dict[bytes, list[ocsp.OCSPResponse]] = {}
+
+    async def fetch(self, cert, authority) -> ocsp.OCSPResponse:
+        cert_der = cert.dump()
+        key = _key("ocsp", cert_der, authority.public_key.dump())
+        cached = self.store.get(key)
+        if cached:
+            resp = ocsp.OCSPResponse.load(cached[0])
+        else:
+            resp = await self.inner.fetch(cert, authority)
+            self.store.put(key, [resp.dump()], _ttl_until(_ocsp_next_update(resp)))
+        # Dernière réponse seulement (comme les CRL) : pas d'accumulation sur un fetcher partagé
+        self._by_cert[cert_der] = [resp]
+        return resp
+
+    def fetched_responses(self) -> Iterable[ocsp.OCSPResponse]:
+        return [r for responses in self._by_cert.values() for r in responses]
+
+    def fetched_responses_for_cert(self, cert) -> Iterable[ocsp.OCSPResponse]:
+        return list(self._by_cert.get(cert.dump(), []))
+
+
+class CachedCRLFetcher(CRLFetcher):
+    def __init__(self, inner: CRLFetcher, store: _Store):
+        self.inner = inner
+        self.store = store
+        self._by_cert: dict[bytes, list[crl.CertificateList]] = {}
+
+    async def fetch(self, cert, *, use_deltas=None) -> Iterable[crl.CertificateList]:
+        cert_der = cert.dump()
+        key = _key("crl", cert_der, b"deltas" if use_deltas else b"")
+        cached = self.store.get(key)
+        if cached is not None:
+            crls = [crl.CertificateList.load(b) for b in cached]
+        else:
+            crls = list(await self.inner.fetch(cert, use_deltas=use_deltas))
+            self.store.put(key, [c.dump() for c in crls], _ttl_until(_crl_next_update(crls)))
+        self._by_cert[cert_der] = crls
+        return crls
+
+    def fetched_crls(self) -> Iterable[crl.CertificateList]:
+        return [c for crls in self._by_cert.values() for c in crls]
+
+    def fetched_crls_for_cert(self, cert) -> Iterable[crl.CertificateList]:
+        return self._by_cert[cert.dump()]
+
+
+class CachedCertificateFetcher(CertificateFetcher):
+    def __init__(self, inner: CertificateFetcher, store: _Store):
+        self.inner = inner
+        self.store = store
+        self._fetched: dict[bytes, x509.Certificate] = {}
+
+    async def _cached_issuers(self, kind: str, der: bytes, source):
+        key = _key(kind, der)
+        cached = self.store.get(key)
+        if cached is not None:
+            certs = [x509.Certificate.load(b) for b in cached]
+        else:
+            certs = [c async for c in source()]
+            ttl = int(getattr(settings, "REVOCATION_CACHE_CERT_TTL", 24 * 3600))
+            self.store.put(key, [c.dump() for c in certs], ttl)
+        for c in certs:
+            self._fetched[c.dump()] = c
+            yield c
+
+    def fetch_cert_issuers(self, cert):
+        return self._cached_issuers("issuers", cert.dump(), lambda: self.inner.fetch_cert_issuers(cert))
+
+    def fetch_crl_issuers(self, certificate_list):
+        return self._cached_issuers(
+            "crl-issuers", certificate_list.dump(), lambda: self.inner.fetch_crl_issuers(certificate_list)
+        )
+
+    def fetched_certs(self) -> Iterable[x509.Certificate]:
+        return list(self._fetched.values())
+
+
+class CachedFetcherBackend(FetcherBackend):
+    """Fetchers requests de pyHanko enveloppés par le cache partagé."""
+
+    def __init__(self, per_request_timeout: int = 10, min_remaining: int = 0):
+        self.inner = RequestsFetcherBackend(per_request_timeout=per_request_timeout)
+        self.min_remaining = min_remaining
+
+    def get_fetchers(self) -> Fetchers:
+        inner = self.inner.get_fetchers()
+        store = _Store(self.min_remaining)
+        return Fetchers(
+            ocsp_fetcher=CachedOCSPFetcher(inner.ocsp_fetcher, store),
+            crl_fetcher=CachedCRLFetcher(inner.crl_fetcher, store),
+            cert_fetcher=CachedCertificateFetcher(inner.cert_fetcher, store),
+        )
+
+
+def fetcher_backend(min_remaining: int = 0) -> CachedFetcherBackend:
+    return CachedFetcherBackend(
+        per_request_timeout=int(getattr(settings, "REVOCATION_FETCH_TIMEOUT", 10)),
+        min_remaining=min_remaining,
+    )
+
+
+def _load_certs(paths) -> list[x509.Certificate]:
+    certs = []
+    for p in paths:
+        try:
+            data = Path(p).read_bytes()
+        except OSError as e:
+            logger.warning("Certificat illisible %s: %s", p, e)
+            continue
+        if pem.detect(data):
+            certs.extend(x509.Certificate.load(der) for _, _, der in pem.unarmor(data, multiple=True))
+        else:
+            certs.append(x509.Certificate.load(data))
+    return certs
+
+
+def signing_chain_certificates() -> list[x509.Certificate]:
+    """Certificats dont les infos de révocation sont embarquées : signataire + chaîne + TSA."""
+    paths = [
+        settings.SELF_SIGN_CERT_FILE,
+        *getattr(settings, "SELF_SIGN_CA_CHAIN", []),
+        getattr(settings, "FREETSA_TSA", None),
+        getattr(settings, "FREETSA_CACERT", None),
+    ]
+    return _load_certs([p for p in paths if p])
+
+
+async def _prewarm(certs: list[x509.Certificate], fetchers: Fetchers) -> dict:
+    known = {c.subject.dump(): c for c in certs}
+    counts = {"ocsp": 0, "crl": 0, "errors": 0}
+    for cert in certs:
+        issuer = known.get(cert.issuer.dump())
+        if issuer is None:
+            try:
+                async for fetched in fetchers.cert_fetcher.fetch_cert_issuers(cert):
+                    known.setdefault(fetched.subject.dump(), fetched)
+                    issuer = issuer or fetched
+            except Exception as e:
+                counts["errors"] += 1
+                logger.warning("Émetteur introuvable pour %s: %s", cert.subject.human_friendly, e)
+        if cert.ocsp_urls and issuer is not None:
+            try:
+                await fetchers.ocsp_fetcher.fetch(cert, AuthorityWithCert(issuer))
+                counts["ocsp"] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                logger.warning("OCSP indisponible pour %s: %s", cert.subject.human_friendly, e)
+        if cert.crl_distribution_points:
+            try:
+                await fetchers.crl_fetcher.fetch(cert)
+                counts["crl"] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                logger.warning("CRL indisponible pour %s: %s", cert.subject.human_friendly, e)
+    return counts
+
+
+def prewarm(certs: list[x509.Certificate] | None = None) -> dict:
+    """
+    Rafraîchit le cache pour la chaîne de signature et la chaîne TSA : les entrées à
+    moins de REVOCATION_PREWARM_MARGIN secondes de leur nextUpdate sont re-téléchargées.
+    """
+    margin = int(getattr(settings, "REVOCATION_PREWARM_MARGIN", 900))
+    fetchers = fetcher_backend(min_remaining=margin).get_fetchers()
+    certs = signing_chain_certificates() if certs is None else certs
+    counts = asyncio.run(_prewarm(certs, fetchers))
+    logger.info("Pré-chauffage révocation: %s", counts)
+    return counts
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.db import transaction
 from rest_framework.reverse import reverse
 from .email_utils import EmailTemplates
+from .mailer import request_retries
 from .models import (SavedSignature, FieldTemplate, BatchSignJob, BatchSignItem,
     Envelope,EnvelopeRecipient,SigningField,SignatureDocument,PrintQRCode,
     NotificationPreference,EnvelopeDocument,
@@ -13,8 +14,6 @@ from .models import (SavedSignature, FieldTemplate, BatchSignJob, BatchSignItem,
 
 from django.utils.encoding import force_str
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
-from PyPDF2 import PdfReader
-import io
 import logging
 from django.contrib.auth.password_validation import validate_password
 
@@ -100,7 +99,7 @@ class PasswordResetSerializer(serializers.Serializer):
 
         # Envoi d'email (try/except pour ne rien révéler en cas d'erreur)
         try:
-            EmailTemplates.password_reset_email(user, reset_link)
+            EmailTemplates.password_reset_email(user, reset_link, retries=request_retries())
         except Exception as e:
             logger.error(
                 f"Erreur envoi email de réinitialisation pour {email}: {e}",
@@ -323,22 +322,19 @@ class EnvelopeSerializer(serializers.ModelSerializer):
     def _validate_page_against_pdf(self, document, page_number):
         """
         (optionnel mais utile) : si PDF, vérifier que la page demandée existe.
-        On ne bloque pas si ce n’est pas un PDF ou si la lecture échoue.
+        S'appuie sur l'index de géométrie calculé à l'upload (pas de relecture du PDF).
+        On ne bloque pas si ce n’est pas un PDF ou si l'index est indisponible.
         """
         if not document or not document.file or not document.file.name.lower().endswith('.pdf'):
             return
         try:
-            document.file.seek(0)
-            content = document.file.read()
-            document.file.seek(0)
-            if not content.startswith(b'%PDF-'):
-                return
-            pdf = PdfReader(io.BytesIO(content))
-            if page_number < 1 or page_number > len(pdf.pages):
-                raise serializers.ValidationError(f'page {page_number} hors limites (1..{len(pdf.pages)}) pour le document {document.id}')
+            page_count = int(document.get_page_geometry().get('page_count') or 0)
         except Exception:
             # logging seulement ; on évite de bloquer agressivement si l’IO échoue
             logger.warning('Impossible de valider la page PDF pour document %s', getattr(document, 'id', '?'))
+            return
+        if page_count and (page_number < 1 or page_number > page_count):
+            raise serializers.ValidationError(f'page {page_number} hors limites (1..{page_count}) pour le document {document.id}')
 
     # -------- create / update --------
 
@@ -531,14 +527,21 @@ class BatchSignJobSerializer(serializers.ModelSerializer):
         model = BatchSignJob
         fields = ["id", "mode", "status", "total", "done", "failed", "started_at", "finished_at", "result_zip", "created_at", "items"]
 class EnvelopeListSerializer(serializers.ModelSerializer):
-    recipients_count = serializers.IntegerField(source='recipients.count', read_only=True)
-    completion_rate = serializers.ReadOnlyField()
+    """
+    Mode liste du tableau de bord : compteurs lus sur les annotations
+    `recipients_count` / `signed_count` (voir EnvelopeViewSet._list_queryset)
+    et `created_by` chargé par select_related — aucune requête par ligne.
+    """
+    recipients_count = serializers.IntegerField(read_only=True)
+    signed_count = serializers.IntegerField(read_only=True)
+    completion_rate = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
 
     class Meta:
         model = Envelope
         fields = [
             'id',
+            'public_id',
             'title',
             'status',
             'created_by',
@@ -546,10 +549,15 @@ class EnvelopeListSerializer(serializers.ModelSerializer):
             'created_at',
             'deadline_at',
             'recipients_count',
+            'signed_count',
             'completion_rate',
             'flow_type',
         ]
 
+    def get_completion_rate(self, obj):
+        total = obj.recipients_count
+        return (obj.signed_count / total * 100) if total > 0 else 0.0
+
     def get_created_by_name(self, obj):
         name = obj.created_by.get_full_name().strip()
         return name or obj.created_by.username
@@ -0,0 +1,144 @@
+# ===============================================
+# signature/signature_image.py
+# Image de signature préparée une seule fois (PNG RGBA normalisé, ImageReader
+# reportlab, style de tampon pyHanko) et partagée entre champs, documents et items
+# ===============================================
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+from django.conf import settings
+from PIL import Image, UnidentifiedImageError
+from reportlab.lib.utils import ImageReader
+
+
+def decode_signature_data(data) -> bytes:
+    """
+    Octets bruts d'une image de signature : bytes, data URL, base64 brut, ou
+    dict de signature_data (première valeur chaîne non vide).
+    """
+    if isinstance(data, dict):
+        data = next((v for v in data.values() if isinstance(v, str) and v), None)
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    if not data or not isinstance(data, str):
+        raise ValueError("Signature manquante")
+    b64 = data.split(",", 1)[1] if data.startswith("data:") else data
+    try:
+        return base64.b64decode(b64)
+    except binascii.Error as e:
+        raise ValueError("Signature base64 invalide") from e
+
+
+class PreparedSignature:
+    """
+    Signature normalisée. `image_reader` est réutilisé par tous les calques reportlab
+    (décodage unique) ; `stamp_style` est construit une fois par thread car
+    pyHanko rattache son PdfImage au writer en cours.
+    """
+
+    def __init__(self, png: bytes):
+        self.png = png
+        self.key = hashlib.sha256(png).hexdigest()
+        self._local = threading.local()
+
+    @cached_property
+    def image(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.png)).convert("RGBA")
+
+    @cached_property
+    def b64(self) -> str:
+        return base64.b64encode(self.png).decode()
+
+    @cached_property
+    def image_reader(self) -> ImageReader:
+        return ImageReader(self.image)
+
+    @property
+    def stamp_style(self):
+        style = getattr(self._local, "stamp_style", None)
+        if style is None:
+            from pyhanko import stamp
+            from pyhanko.pdf_utils import images
+
+            style = stamp.TextStampStyle(stamp_text="", background=images.PdfImage(self.image))
+            self._local.stamp_style = style
+        return style
+
+
+class PreparedSignatureCache:
+    """LRU par process, indexé par empreinte SHA-256 de l'entrée ET du PNG normalisé."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, PreparedSignature] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _max_size(self) -> int:
+        return max(1, int(getattr(settings, "SIGNATURE_IMAGE_CACHE_SIZE", 32)))
+
+    def _remember(self, key: str, prepared: PreparedSignature) -> None:
+        self._entries[key] = prepared
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size():
+            self._entries.popitem(last=False)
+
+    def get(self, raw: bytes) -> PreparedSignature:
+        raw_key = hashlib.sha256(raw).hexdigest()
+        with self._lock:
+            prepared = self._entries.get(raw_key)
+            if prepared is not None:
+                self._entries.move_to_end(raw_key)
+                self.hits += 1
+                return prepared
+        try:
+            im = Image.open(io.BytesIO(raw)).convert("RGBA")
+        except (UnidentifiedImageError, OSError) as e:
+            raise ValueError("Signature invalide") from e
+        out = io.BytesIO()
+        im.save(out, format="PNG")
+        prepared = PreparedSignature(out.getvalue())
+        with self._lock:
+            # Le PNG normalisé (réutilisé en base64 par les tâches) pointe vers le même objet
+            prepared = self._entries.get(prepared.key, prepared)
+            self._remember(prepared.key, prepared)
+            self._remember(raw_key, prepared)
+            self.misses += 1
+        return prepared
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache = PreparedSignatureCache()
+
+
+def prepare_signature(data) -> PreparedSignature:
+    """
+    PreparedSignature partagée pour `data` (bytes, base64, data URL, dict ou déjà
+    préparée). Lève ValueError si l'image est absente ou illisible.
+    """
+    if isinstance(data, PreparedSignature):
+        return data
+    return _cache.get(decode_signature_data(data))
+
+
+def reset_prepared_signatures() -> None:
+    _cache.reset()
+
+
+def prepared_signature_stats() -> dict:
+    return _cache.stats()
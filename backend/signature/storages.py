@@ -1,9 +1,10 @@
 
 # ===============================================
 # signature/storages.py  
-# Envelope encryption v2 : EG2 + KMS + AAD doc_uuid + size() sans déchiffrage
+# Envelope encryption v3 : EG3 (segments AES-GCM, lecture en flux) + KMS + AAD doc_uuid
+# Lecture rétro-compatible EG2 / EG1 / PDF en clair
 # ===============================================
-import os, io, uuid, struct, logging,base64
+import os, io, uuid, struct, logging,base64,tempfile
 from typing import Optional
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import ContentFile, File
@@ -11,15 +12,137 @@ from django.core.exceptions import ValidationError
 from django.conf import settings
 import base64
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 from cryptography.exceptions import InvalidTag
-from .kms import get_kms_client
+from .kms import get_kms_client, unwrap_key_cached
 
 logger = logging.getLogger(__name__)
 # constants pratiques
 _EG2_FIXED_MIN = 3 + 1 + 1 + 1 + 2 + 2 + 12 + 16  # = 39
 _EG1_FIXED     = 3 + 1 + 12 + 16                  # = 32
 
+# EG3 : magic 'EG3'(3) | ver(1) | key_id(1) | aad_type(1) | aad_len(2) | wlen(2) | seg_size(4) | aad | wrapped | trames
+# trame : nonce(12) | ciphertext(<= seg_size) | tag(16)
+_EG3_FIXED_FMT = ">3sBBBHHI"
+_EG3_FIXED     = struct.calcsize(_EG3_FIXED_FMT)  # = 14
+_EG3_NONCE     = 12
+_EG3_TAG       = 16
+_EG3_OVERHEAD  = _EG3_NONCE + _EG3_TAG
+_EG3_DEFAULT_SEGMENT_SIZE = 64 * 1024
+
+
+def _eg3_segment_aad(aad: bytes, index: int, final: bool) -> bytes:
+    """AAD d'une trame : AAD du document + index + drapeau 'dernière trame' (anti réordonnancement/troncature)."""
+    return aad + struct.pack(">QB", index, 1 if final else 0)
+
+
+class EG3DecryptingFile(io.RawIOBase):
+    """
+    Fichier en lecture seule qui déchiffre un blob EG3 à la demande.
+    Seule la trame courante est gardée en clair : mémoire constante quelle que soit la taille du document.
+    Supporte read()/seek()/tell() (PdfReader, FileResponse, requêtes Range).
+    """
+
+    def __init__(self, path: str, name: str, *, dek: bytes, aad: bytes, segment_size: int, data_offset: int):
+        super().__init__()
+        self.name = name
+        self._path = path
+        self._aead = AESGCM(dek)
+        self._aad = aad
+        self._segment_size = segment_size
+        self._frame_size = segment_size + _EG3_OVERHEAD
+        self._data_offset = data_offset
+        self._fh = open(path, "rb")
+        self._pos = 0
+        self._cached_index = None
+        self._cached_plain = b""
+
+        enc_len = os.fstat(self._fh.fileno()).st_size - data_offset
+        if enc_len < _EG3_OVERHEAD:
+            self._fh.close()
+            raise ValueError("Blob EG3 sans segment chiffré")
+        self._segments = -(-enc_len // self._frame_size)
+        last_len = enc_len - (self._segments - 1) * self._frame_size - _EG3_OVERHEAD
+        if last_len < 0:
+            self._fh.close()
+            raise ValueError("Dernier segment EG3 tronqué")
+        self.size = (self._segments - 1) * segment_size + last_len
+
+    # --- déchiffrement d'une trame ---
+    def _segment(self, index: int) -> bytes:
+        if index == self._cached_index:
+            return self._cached_plain
+        final = index == self._segments - 1
+        self._fh.seek(self._data_offset + index * self._frame_size)
+        frame = self._fh.read(self._frame_size)
+        if len(frame) < _EG3_OVERHEAD:
+            raise ValueError("Segment EG3 tronqué")
+        try:
+            plain = self._aead.decrypt(
+                frame[:_EG3_NONCE], frame[_EG3_NONCE:], _eg3_segment_aad(self._aad, index, final)
+            )
+        except InvalidTag:
+            raise ValueError("Le fichier chiffré est corrompu ou le tag est invalide.")
+        self._cached_index = index
+        self._cached_plain = plain
+        return plain
+
+    # --- API fichier ---
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"whence invalide: {whence}")
+        if pos < 0:
+            raise ValueError("Position négative")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b):
+        view = memoryview(b).cast("B")
+        written = 0
+        while written < len(view) and self._pos < self.size:
+            index, offset = divmod(self._pos, self._segment_size)
+            plain = self._segment(index)
+            n = min(len(view) - written, len(plain) - offset)
+            view[written:written + n] = plain[offset:offset + n]
+            written += n
+            self._pos += n
+        return written
+
+    def open(self, mode="rb"):
+        """Compat FieldFile.open() : rouvre le fichier sous-jacent ou revient au début."""
+        if self._fh.closed:
+            self._fh = open(self._path, "rb")
+        self._pos = 0
+        return self
+
+    def close(self):
+        try:
+            self._fh.close()
+        finally:
+            self._cached_index = None
+            self._cached_plain = b""
+            super().close()
+
+    @property
+    def closed(self):
+        return self._fh.closed
+
 # --- Petit wrapper pour injecter l'AAD depuis l'appelant (modèles / vues) ---
 class AADContentFile(ContentFile):
     def __init__(self, content: bytes, aad: bytes, name: str | None = None):
@@ -44,11 +167,14 @@ def _get_aad_from_content(content: File, fallback_name: str) -> tuple[int, bytes
 
 class EncryptedFileSystemStorage(FileSystemStorage):
     """
-    Chiffrement *par enveloppe* v2
+    Chiffrement *par enveloppe* v3
       - DEK aléatoire par fichier (AES-256-GCM)
       - DEK *wrap* via KMS (RSA-OAEP par défaut)
       - AAD = doc_uuid (si fourni) OU nom du fichier
-    En-tête EG2 auto-descriptif :
+    Écriture EG3 par défaut (settings.ENCRYPTED_STORAGE_FORMAT = "EG3" | "EG2") :
+      magic 'EG3'(3) | ver(1) | key_id(1) | aad_type(1) | aad_len(2) | wlen(2) | seg_size(4) | aad | wrapped | trames
+      trame = nonce(12) | ciphertext | tag(16), AAD de trame = aad | index(8) | final(1)
+    En-tête EG2 (lecture + écriture optionnelle) :
       magic 'EG2'(3) | ver(1) | key_id(1) | aad_type(1) | aad_len(2) | wlen(2) | iv(12) | tag(16) | aad | wrapped | ciphertext
     """
 
@@ -148,56 +274,111 @@ class EncryptedFileSystemStorage(FileSystemStorage):
             raise ValidationError("Impossible d'ouvrir le fichier source pour chiffrement (flux fermé).")
 
         _rewind_or_reopen(content)
-        chunk_size = 1024 * 1024  # 1 Mo
-        first_chunk = True
-        ciphertext = bytearray()
-        total_size = 0
 
-        # Générer DEK & IV
+        def _plain_chunks(chunk_size):
+            """Lit la source par blocs en appliquant les contrôles taille / en-tête PDF."""
+            first_chunk = True
+            total_size = 0
+            while True:
+                chunk = content.read(chunk_size)
+                if not chunk:
+                    break
+                total_size += len(chunk)
+                if is_pdf and size_attr is None and total_size > max_pdf_size:
+                    raise ValidationError(
+                        f"Fichier trop volumineux (max {max_pdf_size // (1024 * 1024)}MB)"
+                    )
+                if first_chunk:
+                    # Validation basique PDF si extension .pdf
+                    if final_name.lower().endswith('.pdf') and not chunk.startswith(b'%PDF-'):
+                        raise ValidationError("Le fichier n'est pas un PDF valide.")
+                    first_chunk = False
+                yield chunk
+            if first_chunk:
+                raise ValidationError("Le fichier est vide.")
+
+        # AAD : doc_uuid binaire (16o) si fourni par l'appelant, sinon le nom final
+        aad_type, aad_value = _get_aad_from_content(content, final_name)
+
+        fmt = str(getattr(settings, "ENCRYPTED_STORAGE_FORMAT", "EG3")).upper()
+        if fmt == "EG2":
+            payload, key_id = self._encrypt_eg2(kms, _plain_chunks(1024 * 1024), aad_type, aad_value)
+        else:
+            fmt = "EG3"
+            payload, key_id = self._encrypt_eg3(kms, _plain_chunks, aad_type, aad_value)
+
+        try:
+            saved = super()._save(final_name, payload)
+        finally:
+            payload.close()
+        logger.info(f"Encrypted {saved} ({fmt}/KMS, aad_type={aad_type}, kid={key_id})")
+        return saved
+
+    def _encrypt_eg2(self, kms, chunks, aad_type: int, aad_value: bytes):
+        """Chiffrement EG2 historique (un seul GCM sur tout le fichier) — conservé pour les déploiements mixtes."""
         dek = os.urandom(32)
         iv = os.urandom(12)
         cipher = Cipher(algorithms.AES(dek), modes.GCM(iv), backend=default_backend())
         enc = cipher.encryptor()
-
-        # AAD : doc_uuid binaire (16o) si fourni par l'appelant, sinon le nom final
-        aad_type, aad_value = _get_aad_from_content(content, final_name)
         enc.authenticate_additional_data(aad_value)
 
-        while True:
-            chunk = content.read(chunk_size)
-            if not chunk:
-                break
-            total_size += len(chunk)
-            if is_pdf and size_attr is None and total_size > max_pdf_size:
-                raise ValidationError(
-                    f"Fichier trop volumineux (max {max_pdf_size // (1024 * 1024)}MB)"
-                )
-            if first_chunk:
-                # Validation basique PDF si extension .pdf
-                if final_name.lower().endswith('.pdf') and not chunk.startswith(b'%PDF-'):
-                    raise ValidationError("Le fichier n'est pas un PDF valide.")
-                first_chunk = False
+        ciphertext = bytearray()
+        for chunk in chunks:
             ciphertext.extend(enc.update(chunk))
-
-        if first_chunk:
-            raise ValidationError("Le fichier est vide.")
-
         ciphertext.extend(enc.finalize())
-        tag = enc.tag
 
-        ciphertext = bytes(ciphertext)
-
-        # Wrap DEK avec KMS
         key_id, wrapped = kms.wrap_key(dek)
+        header = self._pack_header(key_id=key_id, aad_type=aad_type, aad=aad_value, iv=iv, tag=enc.tag, wrapped=wrapped)
+        return ContentFile(header + bytes(ciphertext)), key_id
 
-        # Assembler l'en-tête v2
-        header = self._pack_header(key_id=key_id, aad_type=aad_type, aad=aad_value, iv=iv, tag=tag, wrapped=wrapped)
+    def _encrypt_eg3(self, kms, plain_chunks, aad_type: int, aad_value: bytes):
+        """
+        Chiffrement EG3 : trames AES-GCM indépendantes (nonce + tag par segment) écrites
+        dans un fichier temporaire — la mémoire reste bornée à ~2 segments.
+        """
+        segment_size = int(getattr(settings, "ENCRYPTED_STORAGE_SEGMENT_SIZE", _EG3_DEFAULT_SEGMENT_SIZE))
+        if not (0 < segment_size <= 0xFFFFFFFF):
+            raise ValueError("ENCRYPTED_STORAGE_SEGMENT_SIZE invalide")
 
-        cf = ContentFile(header + ciphertext)
-        cf.name = final_name
-        saved = super()._save(final_name, cf)
-        logger.info(f"Encrypted {saved} (EG2/KMS, aad_type={aad_type}, kid={key_id})")
-        return saved
+        dek = os.urandom(32)
+        aead = AESGCM(dek)
+        key_id, wrapped = kms.wrap_key(dek)
+        if not (0 <= key_id <= 255):
+            raise ValueError("key_id must fit in 1 byte")
+        if aad_type not in (0, 1):
+            raise ValueError("aad_type must be 0(name) or 1(uuid)")
+
+        header = struct.pack(
+            _EG3_FIXED_FMT, b"EG3", 3, key_id, aad_type, len(aad_value), len(wrapped), segment_size,
+        )
+        tmp = tempfile.SpooledTemporaryFile(max_size=4 * segment_size)
+        tmp.write(header + aad_value + wrapped)
+
+        def _write_frame(index, data, final):
+            nonce = os.urandom(_EG3_NONCE)
+            tmp.write(nonce + aead.encrypt(nonce, bytes(data), _eg3_segment_aad(aad_value, index, final)))
+
+        # Découpe exacte en segments ; on garde un segment d'avance pour savoir lequel est le dernier
+        buf = bytearray()
+        pending = None
+        index = 0
+        for chunk in plain_chunks(segment_size):
+            buf.extend(chunk)
+            while len(buf) >= segment_size:
+                if pending is not None:
+                    _write_frame(index, pending, False)
+                    index += 1
+                pending = bytes(buf[:segment_size])
+                del buf[:segment_size]
+        if buf:
+            if pending is not None:
+                _write_frame(index, pending, False)
+                index += 1
+            pending = bytes(buf)
+        _write_frame(index, pending, True)
+
+        tmp.seek(0)
+        return File(tmp), key_id
 
     # --- NOUVEAU : helpers de détection ---
     @staticmethod
@@ -258,16 +439,59 @@ class EncryptedFileSystemStorage(FileSystemStorage):
         return bio
 
     # --- MODIFIER open() pour sniffer et router ---
+    def _unpack_eg3_header(self, head: bytes):
+        if len(head) < _EG3_FIXED:
+            raise ValueError("Blob trop petit pour en-tête EG3")
+        magic, ver, key_id, aad_type, aad_len, wlen, segment_size = struct.unpack(_EG3_FIXED_FMT, head[:_EG3_FIXED])
+        if magic != b"EG3" or ver != 3:
+            raise ValueError("Unsupported encrypted blob version")
+        if segment_size <= 0:
+            raise ValueError("Taille de segment EG3 invalide")
+        off = _EG3_FIXED
+        if len(head) < off + aad_len + wlen:
+            raise ValueError("EG3 header declares more bytes than available")
+        aad = head[off:off + aad_len]
+        wrapped = head[off + aad_len:off + aad_len + wlen]
+        return key_id, aad_type, aad, wrapped, segment_size, off + aad_len + wlen
+
+    def _open_eg3(self, name: str, f) -> EG3DecryptingFile:
+        fixed = f.read(_EG3_FIXED)
+        _, _, _, _, aad_len, wlen, _ = struct.unpack(_EG3_FIXED_FMT, fixed)
+        head = fixed + f.read(aad_len + wlen)
+        key_id, _aad_type, aad, wrapped, segment_size, data_offset = self._unpack_eg3_header(head)
+
+        dek = unwrap_key_cached(key_id, wrapped)
+        reader = EG3DecryptingFile(
+            self.path(name), name,
+            dek=dek, aad=aad, segment_size=segment_size, data_offset=data_offset,
+        )
+        # Premier segment déchiffré tout de suite : clé/AAD vérifiés à l'ouverture
+        try:
+            if name.lower().endswith('.pdf') and reader.read(5) != b'%PDF-':
+                raise ValueError("Le fichier déchiffré n'est pas un PDF valide.")
+            reader.seek(0)
+        except Exception:
+            reader.close()
+            raise
+        return reader
+
     def open(self, name, mode='rb'):
         """
         Ouvre un fichier chiffré.
+        - EG3 (v3): segments AES-GCM déchiffrés à la demande (mémoire constante)
         - EG2 (v2): envelope + KMS (wrapped DEK), AAD = doc_uuid/nom
         - EG1 (legacy): clé globale base64 (settings.FILE_ENCRYPTION_KEY_B64), AAD = nom
         - PDF en clair: servi tel quel (utile pendant migration)
         """
-        
-    
         with super().open(name, mode) as f:
+            if f.read(3) == b"EG3":
+                f.seek(0)
+                try:
+                    return self._open_eg3(name, f)
+                except Exception:
+                    logger.exception("Error opening %s", name)
+                    raise
+            f.seek(0)
             blob = f.read()
     
         try:
@@ -284,9 +508,8 @@ class EncryptedFileSystemStorage(FileSystemStorage):
                 key_id, aad_type, aad, iv, tag, wrapped, off = self._unpack_header(blob)
                 ciphertext = blob[off:]
     
-                # unwrap DEK via KMS
-                kms = get_kms_client()
-                dek = kms.unwrap_key(key_id, wrapped)
+                # unwrap DEK via KMS (cache LRU des DEK déjà déballées)
+                dek = unwrap_key_cached(key_id, wrapped)
     
                 cipher = Cipher(algorithms.AES(dek), modes.GCM(iv, tag), backend=default_backend())
                 dec = cipher.decryptor()
@@ -368,9 +591,18 @@ class EncryptedFileSystemStorage(FileSystemStorage):
         path = self.path(name)
         enc_size = os.path.getsize(path)
         with open(path, 'rb') as f:
-            head = f.read(max(_EG2_FIXED_MIN, 5))  # 5 suffit pour '%PDF-'
+            head = f.read(max(_EG2_FIXED_MIN, _EG3_FIXED, 5))  # 5 suffit pour '%PDF-'
 
         m = self._magic(head)
+        if m == b"EG3":
+            with open(path, 'rb') as f:
+                fixed = f.read(_EG3_FIXED)
+                _, _, _, _, aad_len, wlen, segment_size = struct.unpack(_EG3_FIXED_FMT, fixed)
+            enc_len = enc_size - (_EG3_FIXED + aad_len + wlen)
+            frame = segment_size + _EG3_OVERHEAD
+            segments = -(-enc_len // frame) if enc_len > 0 else 0
+            return max(0, enc_len - segments * _EG3_OVERHEAD)
+
         if m == b"EG2":
             # Relire l'en-tête complet selon les longueurs déclarées
             with open(path, 'rb') as f:
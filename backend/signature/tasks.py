@@ -11,20 +11,18 @@ import os
 import jwt
 
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
 from django.utils import timezone
 from django.utils.text import slugify, get_valid_filename
 
-from PIL import Image, UnidentifiedImageError
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-
 from .models import (
     Envelope,
     EnvelopeRecipient,
     BatchSignJob,
     BatchSignItem,
     SignatureDocument,
+    SigningJob,
     PrintQRCode,
 )
 from .crypto_utils import (
@@ -32,7 +30,11 @@ from .crypto_utils import (
     compute_hashes,
     extract_signer_certificate_info,
 )
-from .email_utils import EmailTemplates, send_templated_email
+from .email_utils import EmailTemplates, send_templated_emails
+from .pdf_overlay import IncrementalOverlay
+from .qr_stamp import stamp_qr_all_pages
+from .qr_verify_cache import invalidate_envelopes
+from .signature_image import prepare_signature
 
 import qrcode
 
@@ -98,10 +100,12 @@ def send_signed_pdf_to_all_signers(envelope_id: int):
         envelope_id,
     )
 
+    # Un email par signataire, envoyés groupés sur une même connexion SMTP
+    messages = []
     for r in signed_recipients:
         full_name = (r.full_name or r.email or "").strip() or "Signataire"
-        try:
-            send_templated_email(
+        messages.append(
+            dict(
                 recipient_email=r.email,
                 subject=f"Document finalisé : {env.title}",
                 message_content=(
@@ -116,122 +120,55 @@ def send_signed_pdf_to_all_signers(envelope_id: int):
                 app_name=getattr(settings, "APP_NAME", "Signature Platform"),
                 attachments=attachments,  # 👈 PJ
             )
-            logger.info("Email final envoyé à %s", r.email)
-        except TypeError:
-            logger.exception("TypeError lors de l'envoi de l'email final à %s", r.email)
-        except Exception:
-            logger.exception("Erreur lors de l'envoi de l'email final à %s", r.email)
+        )
+    sent = send_templated_emails(messages)
+    logger.info("Email final envoyé à %s/%s signataire(s) de l'enveloppe %s", sent, total, envelope_id)
 
 
-def _paste_signature_on_pdf(pdf_bytes: bytes, sig_img_bytes: bytes, placements: list) -> bytes:
+def _paste_signature_on_pdf(pdf_bytes: bytes, sig_img_bytes, placements: list) -> bytes:
     """
     Appose l'image de signature aux positions indiquées (page,x,y,width,height)
     - x,y,width,height : valeurs relatives (0-1) mesurées depuis le HAUT-GAUCHE de la CropBox dans le front.
     - Conversion ici vers repère PDF (bas-gauche) + offset CropBox.
-    Retourne un PDF bytes (non signé crypto).
+    - sig_img_bytes : octets image ou PreparedSignature (décodée une seule fois).
+    Retourne un PDF bytes (non signé crypto), en mise à jour incrémentale : seules
+    les pages portant un placement sont réécrites.
     """
-    base_reader = PdfReader(io.BytesIO(pdf_bytes))
-    out = PdfWriter()
+    overlay = IncrementalOverlay(pdf_bytes)
+    sig = prepare_signature(sig_img_bytes)
 
-    # image
-    sig_img = Image.open(io.BytesIO(sig_img_bytes)).convert("RGBA")
-    sig_reader = ImageReader(sig_img)
-
-    # indexer placements par page (1-based)
-    by_page = {}
     for p in placements or []:
-        page_no = int(p["page"])
-        by_page.setdefault(page_no, []).append(
-            {
-                "x": float(p["x"]),
-                "y": float(p["y"]),
-                "width": float(p["width"]),
-                "height": float(p["height"]),
-            }
-        )
-
-    for page_num in range(1, len(base_reader.pages) + 1):
-        page = base_reader.pages[page_num - 1]
+        page_ix = int(p["page"]) - 1
+        if not 0 <= page_ix < overlay.page_count:
+            continue
 
         # Dimensions/offsets : utiliser la CropBox si présente (c'est ce que voit pdf.js)
-        crop = getattr(page, "cropbox", None) or page.mediabox
-        crop_llx = float(crop.left)
-        crop_lly = float(crop.bottom)
-        crop_urx = float(crop.right)
-        crop_ury = float(crop.top)
+        crop_llx, crop_lly, crop_urx, crop_ury = overlay.crop_box(page_ix)
         crop_w = crop_urx - crop_llx
         crop_h = crop_ury - crop_lly
 
-        # Overlay reportlab sur la MediaBox (repère natif du PDF)
-        media_w = float(page.mediabox.width)
-        media_h = float(page.mediabox.height)
-
-        if page_num not in by_page:
-            out.add_page(page)
-            continue
-
-        # Créer un calque (même taille que la MediaBox)
-        packet = io.BytesIO()
-        c = canvas.Canvas(packet, pagesize=(media_w, media_h))
-
-        for pl in by_page[page_num]:
-            # UI: x,y,width,height relatifs [0,1]
-            x_ui = pl["x"] * crop_w
-            y_ui = pl["y"] * crop_h
-            w = pl["width"] * crop_w
-            h = pl["height"] * crop_h
-
-            # inverser Y dans la CropBox
-            y_from_bottom_in_crop = crop_h - y_ui - h
-
-            # ajouter l'offset de la CropBox pour revenir au repère MediaBox
-            x_pdf = crop_llx + x_ui
-            y_pdf = crop_lly + y_from_bottom_in_crop
+        # UI: x,y,width,height relatifs [0,1]
+        x_ui = float(p["x"]) * crop_w
+        y_ui = float(p["y"]) * crop_h
+        w = float(p["width"]) * crop_w
+        h = float(p["height"]) * crop_h
 
-            c.drawImage(sig_reader, x_pdf, y_pdf, width=w, height=h, mask="auto")
+        # inverser Y dans la CropBox, puis ajouter l'offset de la CropBox (repère MediaBox)
+        x_pdf = crop_llx + x_ui
+        y_pdf = crop_lly + (crop_h - y_ui - h)
+        overlay.add_image(page_ix, sig.image, x_pdf, y_pdf, w, h, key=sig.key)
 
-        c.save()
-        packet.seek(0)
-
-        overlay_reader = PdfReader(packet)
-        overlay_page = overlay_reader.pages[0]
-        page.merge_page(overlay_page)
-        out.add_page(page)
-
-    buf = io.BytesIO()
-    out.write(buf)
-    return buf.getvalue()
+    return overlay.to_bytes()
 
 
 def _add_qr_overlay_all_pages(pdf_bytes: bytes, qr_png_bytes: bytes, size_pt=50, margin_pt=13, y_offset=-5) -> bytes:
-    """Appose un QR (PNG) en bas-droite sur *toutes* les pages."""
-    reader = PdfReader(io.BytesIO(pdf_bytes))
-    writer = PdfWriter()
-    for page in reader.pages:
-        w = float(page.mediabox.width)
-        h = float(page.mediabox.height)
-        buf = io.BytesIO()
-        c = canvas.Canvas(buf, pagesize=(w, h))
-        x = w - margin_pt - size_pt
-        y = margin_pt + y_offset
-        c.drawImage(ImageReader(io.BytesIO(qr_png_bytes)), x, y, width=size_pt, height=size_pt, mask="auto")
-        c.showPage()
-        c.save()
-        buf.seek(0)
-        overlay = PdfReader(buf)
-        page.merge_page(overlay.pages[0])
-        writer.add_page(page)
-    out = io.BytesIO()
-    writer.write(out)
-    return out.getvalue()
+    """Appose un QR (PNG) en bas-droite sur *toutes* les pages (un seul XObject partagé)."""
+    return stamp_qr_all_pages(pdf_bytes, qr_png_bytes, size_pt=size_pt, margin_pt=margin_pt, y_offset=y_offset)
 
 
 def _normalize_signature_to_png_bytes(buf: bytes) -> bytes:
     """Normalise n'importe quel format image en PNG (RGBA)."""
-    im = Image.open(io.BytesIO(buf)).convert("RGBA")
-    out = io.BytesIO()
-    im.save(out, format="PNG")
-    return out.getvalue()
+    return prepare_signature(buf).png
 
 
 def _crypto_sign_pdf(
@@ -240,15 +177,12 @@ def _crypto_sign_pdf(
     *,
     appearance_image_b64: str | None = None,
 ) -> bytes:
-    """Proxy vers sign_pdf_bytes en rechargeant le module (worker long-lived)."""
-    from importlib import reload
-    from . import crypto_utils as cu
-
-    try:
-        reload(cu)
-    except ImportError as exc:
-        logging.exception("Failed to reload crypto_utils: %s", exc)
-    return cu.sign_pdf_bytes(
+    """
+    Proxy vers sign_pdf_bytes. Le signer / ValidationContext sont mis en cache par
+    process et rechargés automatiquement si les certificats changent sur disque
+    (crypto_utils.SigningMaterialRegistry) : plus besoin de recharger le module.
+    """
+    return sign_pdf_bytes(
         pdf_bytes,
         field_name=field_name,
         appearance_image_b64=appearance_image_b64,
@@ -277,10 +211,7 @@ def _load_signature(job, use_saved_signature_id=None, signature_upload_path=None
     if not sig_bytes:
         raise ValueError("Aucune signature fournie")
 
-    try:
-        return _normalize_signature_to_png_bytes(sig_bytes)
-    except UnidentifiedImageError as e:
-        raise ValueError("Signature invalide") from e
+    return _normalize_signature_to_png_bytes(sig_bytes)
 
 
 def _apply_visual_signature(pdf_src: bytes, sig_bytes: bytes, placements: list) -> bytes:
@@ -371,27 +302,109 @@ def _generate_qr(job, name: str, placements: list, signed_bytes: bytes) -> bytes
     return final_bytes
 
 
+def _zip_compression() -> tuple[int, int | None]:
+    """
+    (méthode, niveau) pour les archives de lot. Les PDF sont déjà compressés :
+    STORED par défaut (BATCH_ZIP_COMPRESSLEVEL=0), DEFLATED au niveau 1..9 sinon.
+    """
+    level = int(getattr(settings, "BATCH_ZIP_COMPRESSLEVEL", 0))
+    if level <= 0:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, min(level, 9)
+
+
+def _completed_batch_items(job):
+    return job.items.filter(status="completed").exclude(signed_file="").order_by("id")
+
+
+def _write_batch_entry(zf: zipfile.ZipFile, item, chunk_size: int = 1024 * 1024):
+    """
+    Copie un PDF signé (déchiffré à la volée, par blocs) dans l'archive.
+    Générateur : rend la main après chaque bloc écrit (utilisé pour le flux HTTP).
+    """
+    storage = item.signed_file.storage
+    with storage.open(item.signed_file.name, "rb") as src, \
+            zf.open(os.path.basename(item.signed_file.name), "w", force_zip64=True) as dst:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            dst.write(chunk)
+            yield
+
+
 def _zip_results(job):
-    """Crée l'archive ZIP des PDF signés."""
+    """
+    Crée l'archive ZIP des PDF signés : écrite dans un fichier temporaire (mémoire bornée,
+    débordement sur disque) puis chiffrée en flux par le storage, en une seule sauvegarde.
+    """
+    import tempfile
+    from django.core.files import File
+
+    compression, level = _zip_compression()
     try:
-        memzip = io.BytesIO()
-        with zipfile.ZipFile(memzip, "w", zipfile.ZIP_DEFLATED) as zf:
-            for it in job.items.filter(status="completed"):
-                if it.signed_file:
-                    it.signed_file.open("rb")
-                    zf.writestr(os.path.basename(it.signed_file.name), it.signed_file.read())
-                    it.signed_file.close()
-        memzip.seek(0)
-        job.result_zip.save(f"batch_{job.id}.zip", ContentFile(memzip.read()), save=False)
-    
-        job.result_zip.save(
-            f"batch_{job.id}.zip", ContentFile(memzip.read()), save=False
-        )
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as tmp:
+            with zipfile.ZipFile(tmp, "w", compression, compresslevel=level) as zf:
+                for item in _completed_batch_items(job):
+                    for _ in _write_batch_entry(zf, item):
+                        pass
+            tmp.seek(0)
+            job.result_zip.save(f"batch_{job.id}.zip", File(tmp), save=False)
     except Exception as exc:
-        
         logger.error("Échec de la création du ZIP pour le job %s: %s", job.id, exc)
 
 
+class _ZipStreamBuffer(io.RawIOBase):
+    """Sortie non-seekable pour zipfile : accumule les octets écrits jusqu'au prochain drain()."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_batch_zip(job):
+    """
+    Génère l'archive du job à la volée (aucune archive stockée) : zipfile écrit en mode
+    flux (descripteurs de données) et chaque bloc est rendu dès qu'il est produit.
+    """
+    compression, level = _zip_compression()
+    out = _ZipStreamBuffer()
+    with zipfile.ZipFile(out, "w", compression, compresslevel=level) as zf:
+        for item in _completed_batch_items(job):
+            for _ in _write_batch_entry(zf, item):
+                data = out.drain()
+                if data:
+                    yield data
+    data = out.drain()
+    if data:
+        yield data
+
+
+def _batch_chord_supported() -> bool:
+    """Les chords Celery exigent un backend de résultats (CELERY_RESULT_BACKEND)."""
+    from celery.backends.base import DisabledBackend
+
+    return not isinstance(process_batch_sign_item.app.backend, DisabledBackend)
+
+
 @shared_task
 def process_batch_sign_job(
     job_id: int,
@@ -402,20 +415,23 @@ def process_batch_sign_job(
     include_qr: bool = False,
 ):
     """
-    Traite un BatchSignJob: appose la signature visuelle puis signe chaque PDF.
-    Si include_qr=True :
-      - crée une enveloppe minimale "completed"
-      - enregistre un SignatureDocument (hashes + infos certificat)
-      - génère un QR standard /verify/{uuid}?sig=...
-      - appose le QR sur toutes les pages
-      - re-signe ("FinalizeQR") pour sceller l'overlay
+    Lance un BatchSignJob : chaque item est signé par une sous-tâche
+    (process_batch_sign_item), le ZIP et le statut final sont produits par
+    finalize_batch_sign_job, en corps de chord.
+    Au plus BATCH_SIGN_CONCURRENCY items d'un même job sont traités simultanément :
+    les items sont répartis en autant de chaînes exécutées en parallèle.
+    Sans backend de résultats (chord impossible), les items sont traités ici en séquence.
+    Si include_qr=True, chaque item reçoit en plus enveloppe minimale, SignatureDocument,
+    QR /verify/{uuid}?sig=... sur toutes les pages et re-scellement ("FinalizeQR").
     """
+    from celery import chain, chord, group
+
     job = BatchSignJob.objects.select_related("created_by").get(pk=job_id)
     job.status = "running"
     job.started_at = timezone.now()
     job.save(update_fields=["status", "started_at"])
 
-    # 1) Charger l'image de signature
+    # 1) Charger l'image de signature (une fois, transmise aux sous-tâches)
     try:
         sig_bytes = _load_signature(
             job,
@@ -429,79 +445,116 @@ def process_batch_sign_job(
         job.save(update_fields=["status", "finished_at"])
         return
 
-    # 2) Traiter chaque item
-    done = failed = 0
-    # on écrit directement les PDFs finaux dans les items, puis on zipp à la fin
-    for item in job.items.all().select_related("envelope_document"):
-        try:
-            item.status = "running"
-            item.save(update_fields=["status"])
-
-            # PDF source
-            pdf_src = None
-            name = "document.pdf"
-            if item.envelope_document and item.envelope_document.file:
-                srcf = item.envelope_document.file
-                srcf.open("rb")
-                pdf_src = srcf.read()
-                srcf.close()
-                name = os.path.basename(getattr(item.envelope_document.file, "name", name)) or name
-            elif item.source_file:
-                srcf = item.source_file
-                srcf.open("rb")
-                pdf_src = srcf.read()
-                srcf.close()
-                name = os.path.basename(getattr(item.source_file, "name", name)) or name
-            else:
-                raise Exception("Aucun fichier source")
-
-            # placements
-            placements = item.placements or []
-            if not placements:
-                raise Exception("Aucun placement fourni")
-
-            # Apposer la signature visuelle
-            stamped = _apply_visual_signature(pdf_src, sig_bytes, placements)
-
-            # Signature numérique PAdES (scellé 1)
-            signed_bytes = _apply_digital_signature(
-                stamped,
-                field_name=f"Batch_{item.id}",
-                appearance_image_b64=sig_b64,
-            )
+    item_ids = list(job.items.order_by("id").values_list("id", flat=True))
 
-            final_bytes = signed_bytes
-            base_name = (name.rsplit(".", 1)[0] or "document")
-            out_name = f"{base_name}_signed.pdf"
+    # 2) Un item par sous-tâche, puis ZIP + statut
+    if not item_ids or not _batch_chord_supported():
+        for item_id in item_ids:
+            process_batch_sign_item(item_id, sig_b64, include_qr)
+        finalize_batch_sign_job(job_id)
+        return
 
-            if include_qr:
-                final_bytes = _generate_qr(job, name, placements, signed_bytes)
+    lanes_count = max(1, int(getattr(settings, "BATCH_SIGN_CONCURRENCY", 4)))
+    lanes = [item_ids[i::lanes_count] for i in range(min(lanes_count, len(item_ids)))]
+    header = group(
+        chain(*[process_batch_sign_item.si(item_id, sig_b64, include_qr) for item_id in lane])
+        for lane in lanes
+    )
+    chord(header)(finalize_batch_sign_job.si(job_id))
 
-            # Écrire le PDF final dans l'item
-            item.signed_file.save(out_name, ContentFile(final_bytes), save=False)
-            item.status = "completed"
-            item.error = ""
-            item.save(update_fields=["signed_file", "status", "error"])
 
-            done += 1
-            job.done = done
-            job.save(update_fields=["done"])
+@shared_task
+def process_batch_sign_item(item_id: int, sig_b64: str, include_qr: bool = False) -> bool:
+    """
+    Signe un BatchSignItem : signature visuelle, PAdES, QR optionnel.
+    Ne lève jamais (le chord doit atteindre l'étape finale) ; les compteurs du job
+    sont incrémentés atomiquement (F()) pour supporter les workers concurrents.
+    """
+    try:
+        item = BatchSignItem.objects.select_related("job__created_by", "envelope_document").get(pk=item_id)
+    except Exception:
+        logger.exception("BatchSignItem %s introuvable", item_id)
+        return False
+    # Redélivrance (acks tardifs, worker perdu) : un item terminé ne recompte pas
+    if item.status in ("completed", "failed"):
+        logger.info("BatchSignItem %s déjà traité (%s)", item.id, item.status)
+        return item.status == "completed"
+    job = item.job
+    try:
+        item.status = "running"
+        item.save(update_fields=["status"])
+        # Décodée une fois par process worker, partagée par tous les items du lot
+        sig = prepare_signature(sig_b64)
+
+        # PDF source
+        pdf_src = None
+        name = "document.pdf"
+        if item.envelope_document and item.envelope_document.file:
+            srcf = item.envelope_document.file
+            srcf.open("rb")
+            pdf_src = srcf.read()
+            srcf.close()
+            name = os.path.basename(getattr(item.envelope_document.file, "name", name)) or name
+        elif item.source_file:
+            srcf = item.source_file
+            srcf.open("rb")
+            pdf_src = srcf.read()
+            srcf.close()
+            name = os.path.basename(getattr(item.source_file, "name", name)) or name
+        else:
+            raise Exception("Aucun fichier source")
 
-        except Exception as e:
-            item.status = "failed"
-            item.error = str(e)
-            item.save(update_fields=["status", "error"])
-            failed += 1
-            job.failed = failed
-            job.save(update_fields=["failed"])
+        # placements
+        placements = item.placements or []
+        if not placements:
+            raise Exception("Aucun placement fourni")
+
+        # Apposer la signature visuelle
+        stamped = _apply_visual_signature(pdf_src, sig, placements)
+
+        # Signature numérique PAdES (scellé 1)
+        signed_bytes = _apply_digital_signature(
+            stamped,
+            field_name=f"Batch_{item.id}",
+            appearance_image_b64=sig_b64,
+        )
 
-    # 3) ZIP des résultats
-    _zip_results(job)
+        final_bytes = signed_bytes
+        base_name = (name.rsplit(".", 1)[0] or "document")
+        out_name = f"{base_name}_signed.pdf"
+
+        if include_qr:
+            final_bytes = _generate_qr(job, name, placements, signed_bytes)
+
+        # Écrire le PDF final dans l'item
+        item.signed_file.save(out_name, ContentFile(final_bytes), save=False)
+        item.status = "completed"
+        item.error = ""
+        item.save(update_fields=["signed_file", "status", "error"])
+        BatchSignJob.objects.filter(pk=job.pk).update(done=F("done") + 1)
+        return True
+
+    except Exception as e:
+        item.status = "failed"
+        item.error = str(e)
+        item.save(update_fields=["status", "error"])
+        BatchSignJob.objects.filter(pk=job.pk).update(failed=F("failed") + 1)
+        return False
+
+
+@shared_task
+def finalize_batch_sign_job(job_id: int):
+    """Étape finale du chord : ZIP des résultats et statut du job."""
+    job = BatchSignJob.objects.get(pk=job_id)
+
+    # 3) ZIP des résultats (sauf si le téléchargement est servi en flux, sans archive stockée)
+    if getattr(settings, "BATCH_ZIP_STORE", True):
+        _zip_results(job)
 
     # 4) Statut final
-    if failed == 0 and done == job.total:
+    if job.failed == 0 and job.done == job.total:
         job.status = "completed"
-    elif done > 0:
+    elif job.done > 0:
         job.status = "partial"
     else:
         job.status = "failed"
@@ -509,6 +562,55 @@ def process_batch_sign_job(
     job.save(update_fields=["status", "finished_at", "result_zip"])
 
 
+SIGNING_JOB_ERROR = "La signature n'a pas pu être finalisée. Veuillez réessayer ou contacter l'expéditeur."
+
+
+@shared_task
+def process_signing_job(job_id: str):
+    """
+    Exécute une signature différée (SIGNATURE_ASYNC) sur la file de signature :
+    même cœur que la signature synchrone (EnvelopeViewSet._do_sign), avec le contexte
+    HTTP capturé à la soumission.
+    """
+    from .views.envelope import EnvelopeViewSet  # import tardif : les vues importent ce module
+
+    with transaction.atomic():
+        job = SigningJob.objects.select_for_update().select_related("envelope", "recipient").get(pk=job_id)
+        if job.status != "queued":
+            logger.info("SigningJob %s déjà pris en charge (%s)", job.id, job.status)
+            return
+        job.status = "running"
+        job.started_at = timezone.now()
+        job.save(update_fields=["status", "started_at"])
+
+    try:
+        # Verrou par enveloppe : deux signataires (ou une redélivrance) ne construisent
+        # pas en parallèle sur le même PDF de travail / statut d'enveloppe
+        with transaction.atomic():
+            envelope = Envelope.objects.select_for_update().get(pk=job.envelope_id)
+            recipient = EnvelopeRecipient.objects.get(pk=job.recipient_id)
+            if recipient.signed:
+                raise ValueError(f"Destinataire {recipient.id} déjà signé")
+            EnvelopeViewSet()._do_sign(
+                envelope, recipient, job.signature_data, job.signed_fields, context=job.context
+            )
+    except Exception:
+        # Détails dans les logs uniquement : l'erreur du job est exposée sans authentification
+        logger.exception("SigningJob %s échoué", job.id)
+        job.status = "failed"
+        job.error = SIGNING_JOB_ERROR
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        return
+
+    job.signature_document = (
+        SignatureDocument.objects.filter(recipient=job.recipient).order_by("-signed_at").first()
+    )
+    job.status = "completed"
+    job.finished_at = timezone.now()
+    job.save(update_fields=["signature_document", "status", "finished_at"])
+
+
 def _build_sign_link(envelope, recipient):
     """Construit le lien de signature (in-app si user, sinon lien invité avec JWT)."""
     expire_at = datetime.utcnow() + timedelta(hours=24)
@@ -561,10 +663,13 @@ def send_signature_email(envelope_id, recipient_id):
 def send_reminder_email(envelope_id, recipient_id):
     """Rappel avec template (passe par process_signature_reminders)."""
     try:
-        envelope = Envelope.objects.get(pk=envelope_id)
-        recipient = EnvelopeRecipient.objects.get(pk=recipient_id, envelope=envelope, signed=False)
-    except (Envelope.DoesNotExist, EnvelopeRecipient.DoesNotExist):
+        # Une seule requête : destinataire + enveloppe (+ user pour le lien)
+        recipient = EnvelopeRecipient.objects.select_related("envelope", "user").get(
+            pk=recipient_id, envelope_id=envelope_id, signed=False
+        )
+    except EnvelopeRecipient.DoesNotExist:
         return
+    envelope = recipient.envelope
 
     if envelope.deadline_at and envelope.deadline_at <= timezone.now():
         return
@@ -585,37 +690,54 @@ def send_reminder_email(envelope_id, recipient_id):
     recipient.last_reminder_at = timezone.now()
     recipient.next_reminder_at = timezone.now() + timedelta(days=(envelope.reminder_days or 0))
 
-    recipient.save()
+    recipient.save(update_fields=["reminder_count", "last_reminder_at", "next_reminder_at"])
+
+
+def _due_reminders(now):
+    """
+    (envelope_id, recipient_id) des rappels dus, en UNE requête sur EnvelopeRecipient
+    (index signed/next_reminder_at) jointe à Envelope. En séquentiel, seul le
+    signataire courant est retenu : aucun non-signé d'ordre inférieur (à ordre égal,
+    le plus petit id) dans la même enveloppe.
+    """
+    earlier_unsigned = EnvelopeRecipient.objects.filter(
+        envelope_id=OuterRef("envelope_id"), signed=False
+    ).filter(Q(order__lt=OuterRef("order")) | Q(order=OuterRef("order"), pk__lt=OuterRef("pk")))
+    return (
+        EnvelopeRecipient.objects.filter(
+            signed=False,
+            next_reminder_at__lte=now,
+            reminder_count__lt=MAX_REMINDERS,
+            envelope__status__in=["sent", "pending"],
+            envelope__deadline_at__gt=now,
+        )
+        .filter(~Q(envelope__flow_type="sequential") | ~Exists(earlier_unsigned))
+        .order_by("envelope_id", "order", "pk")
+        .values_list("envelope_id", "pk")
+    )
 
 
 @shared_task
 def process_signature_reminders():
-    """Job périodique : envoie les rappels dus (next_reminder_at <= now)."""
-    now = timezone.now()
-
-    # Enveloppes encore actives
-    envelopes = Envelope.objects.filter(status__in=["sent", "pending"], deadline_at__gt=now)
-
-    for env in envelopes:
-        if env.flow_type == "sequential":
-            # ne relancer que le "courant"
-            rec = env.recipients.filter(signed=False).order_by("order").first()
-            if not rec:
-                continue
-            if rec.next_reminder_at and rec.next_reminder_at <= now and rec.reminder_count < MAX_REMINDERS:
-                send_reminder_email.delay(env.id, rec.id)
-        else:
-            # parallèle : tous les non signés
-            for rec in env.recipients.filter(signed=False):
-                if rec.next_reminder_at and rec.next_reminder_at <= now and rec.reminder_count < MAX_REMINDERS:
-                    send_reminder_email.delay(env.id, rec.id)
+    """
+    Job périodique : envoie les rappels dus (next_reminder_at <= now).
+    Sélection ensembliste (_due_reminders) puis envoi groupé : un message Celery
+    par paquet de REMINDER_CHUNK_SIZE rappels au lieu d'un par destinataire.
+    """
+    due = list(_due_reminders(timezone.now()))
+    if not due:
+        return 0
+    chunk_size = max(1, int(getattr(settings, "REMINDER_CHUNK_SIZE", 100)))
+    send_reminder_email.chunks(due, chunk_size).apply_async()
+    logger.info("process_signature_reminders: %d rappel(s) en %d paquet(s)", len(due), -(-len(due) // chunk_size))
+    return len(due)
 
 
 @shared_task
 def send_deadline_email(envelope_id):
     """Avertit le créateur et les non-signés que l'échéance est dépassée avec template."""
     try:
-        env = Envelope.objects.get(pk=envelope_id)
+        env = Envelope.objects.select_related("created_by").get(pk=envelope_id)
     except Envelope.DoesNotExist:
         return
 
@@ -625,33 +747,67 @@ def send_deadline_email(envelope_id):
     except Exception as e:
         logger.error(f"Erreur envoi email deadline créateur: {e}")
 
-    # Email aux destinataires non-signés
-    for rec in env.recipients.filter(signed=False):
-        try:
-            send_templated_email(
-                recipient_email=rec.email,
-                subject=f"Échéance dépassée : {env.title}",
-                message_content=f"La date limite pour signer le document '{env.title}' est maintenant dépassée. Le processus de signature a été interrompu.",
-                user_name=rec.full_name,
-                email_type="Échéance dépassée",
-                info_message="Si vous devez toujours signer ce document, contactez la personne qui vous l'a envoyé pour obtenir un nouveau lien.",
-                info_type="warning",
-            )
-        except Exception as e:
-            logger.error(f"Erreur envoi email deadline destinataire {rec.id}: {e}")
+    # Emails aux destinataires non-signés (groupés sur une même connexion SMTP)
+    send_templated_emails(
+        dict(
+            recipient_email=rec.email,
+            subject=f"Échéance dépassée : {env.title}",
+            message_content=f"La date limite pour signer le document '{env.title}' est maintenant dépassée. Le processus de signature a été interrompu.",
+            user_name=rec.full_name,
+            email_type="Échéance dépassée",
+            info_message="Si vous devez toujours signer ce document, contactez la personne qui vous l'a envoyé pour obtenir un nouveau lien.",
+            info_type="warning",
+        )
+        for rec in env.recipients.filter(signed=False)
+    )
+
+
+def _expire_deadline_batch(now, batch_size: int) -> list[int]:
+    """
+    Expire au plus `batch_size` enveloppes échues dans une transaction. Les lignes
+    sont verrouillées en skip_locked : un autre nœud qui exécute la même tâche en
+    parallèle saute ce lot au lieu de l'expirer (et de le notifier) une seconde fois.
+    Les notifications partent après commit.
+    """
+    active = ["sent", "pending"]
+    with transaction.atomic():
+        ids = list(
+            Envelope.objects.select_for_update(skip_locked=True)
+            .filter(status__in=active, deadline_at__lte=now)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Envelope.objects.filter(pk__in=ids, status__in=active).update(status="expired")
+        EnvelopeRecipient.objects.filter(envelope_id__in=ids, signed=False).update(next_reminder_at=None)
+
+        chunk_size = max(1, int(getattr(settings, "DEADLINE_NOTIFY_CHUNK_SIZE", 50)))
+        transaction.on_commit(
+            lambda: send_deadline_email.chunks([(pk,) for pk in ids], chunk_size).apply_async()
+        )
+        # update() en masse : pas de signal post_save, invalidation explicite
+        transaction.on_commit(lambda: invalidate_envelopes(ids))
+    return ids
 
 
 @shared_task
 def process_deadlines():
-    """Job périodique : marque 'expired' les enveloppes non complétées dont la deadline est passée."""
+    """
+    Job périodique : marque 'expired' les enveloppes non complétées dont la deadline
+    est passée, par lots de DEADLINE_BATCH_SIZE (UPDATE ensemblistes, notifications groupées).
+    """
     now = timezone.now()
-    to_expire = Envelope.objects.filter(status__in=["sent", "pending"], deadline_at__lte=now)
-
-    for env in to_expire:
-        env.status = "expired"
-        env.save(update_fields=["status"])
-        send_deadline_email.delay(env.id)
-        env.recipients.filter(signed=False).update(next_reminder_at=None)
+    batch_size = max(1, int(getattr(settings, "DEADLINE_BATCH_SIZE", 500)))
+    expired = 0
+    while True:
+        ids = _expire_deadline_batch(now, batch_size)
+        expired += len(ids)
+        if len(ids) < batch_size:
+            break
+    if expired:
+        logger.info("process_deadlines: %d enveloppe(s) expirée(s)", expired)
+    return expired
 
 
 @shared_task
@@ -664,32 +820,14 @@ def send_document_completed_notification(envelope_id):
         logger.error(f"Erreur notification document complété: {e}")
 
 
-def _delete_envelope_files(envelope: Envelope) -> None:
-    files_to_delete = []
-
-    if envelope.document_file and envelope.document_file.name:
-        files_to_delete.append(envelope.document_file)
-
-    for document in envelope.documents.all():
-        if document.file and document.file.name:
-            files_to_delete.append(document.file)
-
-    for signature in envelope.signatures.all():
-        if signature.signed_file and signature.signed_file.name:
-            files_to_delete.append(signature.signed_file)
+@shared_task
+def prewarm_revocation_cache():
+    """Pré-charge OCSP/CRL/émetteurs de la chaîne de signature et de la TSA (voir signature.revocation)."""
+    if not getattr(settings, "SIGNATURE_REVOCATION_FETCHING", False):
+        return None
+    from .revocation import prewarm
 
-    for file_field in files_to_delete:
-        try:
-            file_field.delete(save=False)
-        except FileNotFoundError:
-            continue
-        except Exception as exc:  # pragma: no cover - best-effort cleanup
-            logger.warning(
-                "Unable to delete file %s for envelope %s: %s",
-                getattr(file_field, "name", "<unknown>"),
-                envelope.pk,
-                exc,
-            )
+    return prewarm()
 
 
 @shared_task
@@ -708,7 +846,7 @@ def purge_expired_envelopes():
         logger.info(
             "Purging cancelled envelope %s older than 10 days", envelope.pk
         )
-        _delete_envelope_files(envelope)
+        envelope.delete_stored_files()
         envelope.delete()
         purged += 1
 
@@ -0,0 +1,136 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from reportlab.pdfgen import canvas
+
+from signature import tasks
+from signature.models import BatchSignItem, BatchSignJob
+
+PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+)
+
+
+def _pdf_bytes(label: str) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(200, 200))
+    c.drawString(40, 120, label)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+class BatchSignJobTests(TestCase):
+    def setUp(self):
+        self.temp_media = tempfile.mkdtemp()
+        base_dir = Path(__file__).resolve().parents[2]
+        override = override_settings(
+            MEDIA_ROOT=self.temp_media,
+            KMS_ACTIVE_KEY_ID=1,
+            KMS_RSA_PUBLIC_KEYS={"1": str(base_dir / "certs" / "kms_pub_1.pem")},
+            KMS_RSA_PRIVATE_KEYS={"1": str(base_dir / "certs" / "kms_priv_1.pem")},
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(lambda: shutil.rmtree(self.temp_media, ignore_errors=True))
+
+        self.user = get_user_model().objects.create_user(
+            username="batcher", password="password", email="batcher@example.com"
+        )
+        self.sig_path = os.path.join(self.temp_media, "sig.png")
+        with open(self.sig_path, "wb") as fh:
+            fh.write(PNG_1PX)
+
+    def _job(self, count: int, *, broken: int = 0) -> BatchSignJob:
+        job = BatchSignJob.objects.create(created_by=self.user, mode="bulk_same_spot", total=count)
+        placement = [{"page": 1, "x": 0.1, "y": 0.1, "width": 0.2, "height": 0.1}]
+        for i in range(count):
+            item = BatchSignItem(job=job, placements=[] if i < broken else placement)
+            item.source_file.save(f"doc{i}.pdf", ContentFile(_pdf_bytes(f"DOC{i}")), save=False)
+            item.save()
+        return job
+
+    def test_items_processed_with_atomic_counters_without_result_backend(self):
+        job = self._job(3, broken=1)
+
+        with mock.patch.object(tasks, "_apply_digital_signature", side_effect=lambda pdf, **_kw: pdf):
+            tasks.process_batch_sign_job(job.id, signature_upload_path=self.sig_path)
+
+        job.refresh_from_db()
+        self.assertEqual((job.done, job.failed), (2, 1))
+        self.assertEqual(job.status, "partial")
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(job.items.filter(status="completed").count(), 2)
+
+    def test_redelivered_items_do_not_count_twice(self):
+        job = self._job(2, broken=1)
+        sig_b64 = base64.b64encode(PNG_1PX).decode()
+        items = list(job.items.order_by("id"))
+
+        with mock.patch.object(tasks, "_apply_digital_signature", side_effect=lambda pdf, **_kw: pdf):
+            for _ in range(2):
+                for item in items:
+                    tasks.process_batch_sign_item(item.id, sig_b64)
+
+        job.refresh_from_db()
+        self.assertEqual((job.done, job.failed), (1, 1))
+        self.assertFalse(tasks.process_batch_sign_item(10**9, sig_b64))
+
+    @override_settings(BATCH_SIGN_CONCURRENCY=2)
+    def test_items_fanned_out_as_capped_chord(self):
+        job = self._job(5)
+
+        with mock.patch.object(tasks, "_batch_chord_supported", return_value=True), \
+                mock.patch("celery.chord") as chord_mock:
+            tasks.process_batch_sign_job(job.id, signature_upload_path=self.sig_path)
+
+        header = chord_mock.call_args.args[0]
+        lanes = list(header.tasks)
+        self.assertEqual(len(lanes), 2)
+        item_ids = sorted(
+            sig.args[0] for lane in lanes for sig in lane.tasks
+        )
+        self.assertEqual(item_ids, sorted(job.items.values_list("id", flat=True)))
+
+        body = chord_mock.return_value.call_args.args[0]
+        self.assertEqual(body.task, "signature.tasks.finalize_batch_sign_job")
+        self.assertEqual(body.args, (job.id,))
+
+    def _signed_job(self, count: int) -> BatchSignJob:
+        job = self._job(count)
+        with mock.patch.object(tasks, "_apply_digital_signature", side_effect=lambda pdf, **_kw: pdf):
+            tasks.process_batch_sign_job(job.id, signature_upload_path=self.sig_path)
+        job.refresh_from_db()
+        return job
+
+    def test_result_zip_saved_once_and_stored_uncompressed(self):
+        job = self._signed_job(2)
+
+        self.assertTrue(job.result_zip.name.endswith(".zip"))
+        with default_storage.open(job.result_zip.name, "rb") as fh:
+            zf = zipfile.ZipFile(io.BytesIO(fh.read()))
+        infos = zf.infolist()
+        self.assertEqual(len(infos), 2)
+        self.assertTrue(all(i.compress_type == zipfile.ZIP_STORED for i in infos))
+        self.assertIsNone(zf.testzip())
+        self.assertTrue(all(zf.read(i).startswith(b"%PDF") for i in infos))
+
+    @override_settings(BATCH_ZIP_STORE=False)
+    def test_streamed_archive_without_stored_zip(self):
+        job = self._signed_job(3)
+        self.assertFalse(job.result_zip)
+
+        data = b"".join(tasks.iter_batch_zip(job))
+        zf = zipfile.ZipFile(io.BytesIO(data))
+        self.assertEqual(len(zf.namelist()), 3)
+        self.assertIsNone(zf.testzip())
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from signature import crypto_utils
+
+CERTS = Path(__file__).resolve().parents[2] / "certs"
+
+
+class SigningMaterialCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(self.tmp, ignore_errors=True))
+        self.cert = os.path.join(self.tmp, "cert.pem")
+        self.key = os.path.join(self.tmp, "key.pem")
+        shutil.copy(CERTS / "selfsign_cert.pem", self.cert)
+        shutil.copy(CERTS / "selfsign_key.pem", self.key)
+        override = override_settings(
+            SELF_SIGN_CERT_FILE=self.cert,
+            SELF_SIGN_KEY_FILE=self.key,
+            SELF_SIGN_CA_CHAIN=[self.cert],
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        crypto_utils.reset_signing_material()
+
+    def test_signer_and_trust_roots_are_reused(self):
+        signer = crypto_utils.load_simple_signer()
+        with mock.patch.object(crypto_utils, "_load_trust_roots", wraps=crypto_utils._load_trust_roots) as load_mock:
+            first = crypto_utils.get_validation_context()
+            second = crypto_utils.get_validation_context()
+
+        self.assertIs(crypto_utils.load_simple_signer(), signer)
+        self.assertEqual(load_mock.call_count, 1)
+        # Contexte neuf par signature : l'heure de validation n'est pas figée
+        self.assertIsNot(second, first)
+        self.assertGreaterEqual(second.moment, first.moment)
+
+    def test_certificate_info_read_once(self):
+        with mock.patch.object(
+            crypto_utils, "_read_signer_certificate_info", wraps=crypto_utils._read_signer_certificate_info
+        ) as read_mock:
+            first = crypto_utils.extract_signer_certificate_info()
+            second = crypto_utils.extract_signer_certificate_info()
+
+        self.assertEqual(first, second)
+        self.assertEqual(read_mock.call_count, 1)
+
+    def test_certificate_mtime_change_rebuilds(self):
+        signer = crypto_utils.load_simple_signer()
+        st = os.stat(self.cert)
+        os.utime(self.cert, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        self.assertIsNot(crypto_utils.load_simple_signer(), signer)
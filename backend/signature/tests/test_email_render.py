@@ -0,0 +1,75 @@
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+
+from signature import email_render
+from signature.email_utils import build_templated_email
+
+BASE = {
+    "email_type": "Rappel de signature",
+    "app_name": "Esign",
+    "base_url": "https://esign.example.com",
+    "info_type": "warning",
+}
+
+
+def _context(i: int, **overrides) -> dict:
+    ctx = dict(
+        BASE,
+        subject=f"Rappel - Signature requise : Contrat {i}",
+        user_name=f"Destinataire <{i}> & co",
+        message_content=f"Le document « Contrat {i} » attend votre signature.",
+        action_url=f"https://esign.example.com/sign/{i}?token=a&b",
+        action_text="Signer maintenant",
+        otp_code=None,
+        otp_expiry=None,
+        info_message="Merci de le traiter dès que possible.",
+    )
+    ctx.update(overrides)
+    return ctx
+
+
+class EmailRenderTests(SimpleTestCase):
+    def setUp(self):
+        email_render.reset_email_templates()
+        self.addCleanup(email_render.reset_email_templates)
+
+    def test_cached_html_matches_django_rendering(self):
+        contexts = [
+            _context(1),
+            _context(2),
+            _context(3, action_url=None, otp_code="123456", otp_expiry=10, info_type="info"),
+            _context(4, user_name="", info_message=None),
+        ]
+        for ctx in contexts:
+            with self.subTest(ctx=ctx["subject"]):
+                html, _ = email_render.render_email(ctx)
+                self.assertEqual(html, render_to_string(email_render.HTML_TEMPLATE, ctx))
+
+        stats = email_render.email_template_stats()
+        # 3 combinaisons distinctes × (HTML + texte) ; le 2e destinataire réutilise le squelette
+        self.assertEqual(stats["misses"], 6)
+        self.assertEqual(stats["hits"], 2)
+
+    def test_recipient_values_escaped_in_html_only(self):
+        html, text = email_render.render_email(_context(7))
+
+        self.assertIn("Destinataire &lt;7&gt; &amp; co", html)
+        self.assertIn("Bonjour Destinataire <7> & co,", text)
+        self.assertIn("Signer maintenant : https://esign.example.com/sign/7?token=a&b", text)
+        self.assertIn("Important : Merci de le traiter", text)
+        self.assertNotIn("<", text.replace("<7>", ""))
+
+    def test_templated_email_has_text_and_html_parts(self):
+        email = build_templated_email(
+            recipient_email="dest@example.com",
+            subject="Votre code de vérification",
+            message_content="Saisissez le code ci-dessous.",
+            otp_code="654321",
+            otp_expiry=5,
+        )
+
+        self.assertIn("Votre code de vérification : 654321", email.body)
+        self.assertIn("Ce code expire dans 5 minutes.", email.body)
+        html, mimetype = email.alternatives[0]
+        self.assertEqual(mimetype, "text/html")
+        self.assertIn('<div class="otp-number">654321</div>', html)
@@ -17,9 +17,10 @@ from signature.models import (
     Envelope,
     EnvelopeDocument,
     EnvelopeRecipient,
+    GuestIdentifier,
     SignatureDocument,
 )
-from signature.views.envelope import EnvelopeViewSet
+from signature.views.envelope import EnvelopeViewSet, _guest_identifier
 
 
 class EnvelopeActionTests(APITestCase):
@@ -316,7 +317,7 @@ class EnvelopeActionTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertTrue(Envelope.objects.filter(pk=envelope.pk).exists())
 
-    def test_do_sign_handles_multiple_documents(self):
+    def _two_document_signing(self):
         envelope = Envelope.objects.create(
             title="Multi", created_by=self.creator, status="sent"
         )
@@ -372,6 +373,10 @@ class EnvelopeActionTests(APITestCase):
             field1_id: sig_image,
             field2_id: sig_image,
         }
+        return view, envelope, recipient, signature_data, signed_fields
+
+    def test_do_sign_handles_multiple_documents(self):
+        view, envelope, recipient, signature_data, signed_fields = self._two_document_signing()
 
         with mock.patch.object(
             EnvelopeViewSet,
@@ -396,3 +401,240 @@ class EnvelopeActionTests(APITestCase):
 
         self.assertEqual(overlay_pages, [0, 1])
         self.assertEqual(sign_pages, [0, 1])
+
+    def test_do_sign_resolves_guest_identifiers(self):
+        view, envelope, recipient, signature_data, signed_fields = self._two_document_signing()
+        for meta in signed_fields.values():
+            meta["recipient_id"] = _guest_identifier(envelope, "recipient", meta["recipient_id"])
+            meta["document_id"] = _guest_identifier(envelope, "document", meta["document_id"])
+
+        with mock.patch.object(
+            EnvelopeViewSet,
+            "_add_signature_overlay_to_pdf",
+            autospec=True,
+        ) as overlay_mock, mock.patch(
+            "signature.views.envelope.sign_pdf_bytes"
+        ) as sign_mock:
+            overlay_mock.side_effect = (
+                lambda _self, pdf, *_args, **_kwargs: pdf
+            )
+            sign_mock.side_effect = lambda pdf, **_kwargs: pdf
+
+            response = view._do_sign(envelope, recipient, signature_data, signed_fields)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([call.args[7] for call in overlay_mock.call_args_list], [0, 1])
+        self.assertTrue(GuestIdentifier.objects.filter(envelope=envelope, kind="document").exists())
+
+    def _sign_grouped(self, mode):
+        view, envelope, recipient, signature_data, signed_fields = self._two_document_signing()
+        with override_settings(SIGNATURE_SEAL_MODE=mode), mock.patch.object(
+            EnvelopeViewSet,
+            "_add_signature_overlays_to_pdf",
+            autospec=True,
+        ) as overlays_mock, mock.patch(
+            "signature.views.envelope.sign_pdf_bytes"
+        ) as sign_mock:
+            overlays_mock.side_effect = lambda _self, pdf, _overlays: pdf
+            sign_mock.side_effect = lambda pdf, **_kwargs: pdf
+
+            response = view._do_sign(envelope, recipient, signature_data, signed_fields)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(overlays_mock.call_count, 1)
+        overlay_pages = [ov[0] for ov in overlays_mock.call_args.args[2]]
+        self.assertEqual(overlay_pages, [0, 1])
+        return [call.kwargs.get("page_ix") for call in sign_mock.call_args_list]
+
+    def test_do_sign_single_seal_mode_signs_once(self):
+        self.assertEqual(self._sign_grouped("single"), [0])
+
+    def test_do_sign_per_document_seal_mode_signs_each_document_once(self):
+        self.assertEqual(self._sign_grouped("per_document"), [0, 1])
+
+    def test_multi_overlay_single_rewrite_preserves_pages(self):
+        pdf = self._pdf_with_label("multi.pdf", "MULTI").read()
+        sig_image = "data:image/png;base64," + (
+            "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+        )
+        out = EnvelopeViewSet()._add_signature_overlays_to_pdf(
+            pdf, [(0, 10, 10, 50, 20, sig_image), (0, 100, 100, 50, 20, sig_image)]
+        )
+        self.assertNotEqual(out, pdf)
+        self.assertTrue(out.startswith(b"%PDF-"))
+
+    def test_document_save_indexes_page_geometry(self):
+        envelope = Envelope.objects.create(title="Geo", created_by=self.creator)
+        doc = EnvelopeDocument.objects.create(
+            envelope=envelope, file=self._pdf_with_label("geo.pdf", "GEO")
+        )
+
+        geometry = EnvelopeDocument.objects.get(pk=doc.pk).page_geometry
+        self.assertEqual(geometry["page_count"], 1)
+        self.assertEqual(geometry["pages"][0]["mediabox"], [0.0, 0.0, 200.0, 200.0])
+        self.assertEqual(geometry["pages"][0]["cropbox"], [0.0, 0.0, 200.0, 200.0])
+
+    def test_missing_page_geometry_is_backfilled_once(self):
+        envelope = Envelope.objects.create(title="Legacy", created_by=self.creator)
+        doc = EnvelopeDocument.objects.create(
+            envelope=envelope, file=self._pdf_with_label("legacy.pdf", "OLD")
+        )
+        EnvelopeDocument.objects.filter(pk=doc.pk).update(page_geometry={})
+
+        legacy = EnvelopeDocument.objects.get(pk=doc.pk)
+        self.assertEqual(legacy.get_page_geometry()["page_count"], 1)
+        self.assertEqual(EnvelopeDocument.objects.get(pk=doc.pk).page_geometry["page_count"], 1)
+
+    def test_field_page_validation_uses_geometry_index(self):
+        from rest_framework import serializers as drf_serializers
+        from signature.serializers import EnvelopeSerializer
+
+        envelope = Envelope.objects.create(title="Val", created_by=self.creator)
+        doc = EnvelopeDocument.objects.create(
+            envelope=envelope, file=self._pdf_with_label("val.pdf", "VAL")
+        )
+        doc = EnvelopeDocument.objects.get(pk=doc.pk)
+
+        serializer = EnvelopeSerializer()
+        with mock.patch("signature.models.pdf_page_geometry") as parse_mock:
+            serializer._validate_page_against_pdf(doc, 1)
+            with self.assertRaises(drf_serializers.ValidationError):
+                serializer._validate_page_against_pdf(doc, 2)
+        parse_mock.assert_not_called()
+
+    def test_working_base_is_built_once_and_reused(self):
+        from signature import working_base
+
+        envelope = Envelope.objects.create(title="Base", created_by=self.creator)
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("a.pdf", "A"))
+        doc_b = EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("b.pdf", "B"))
+
+        layout = working_base.ensure_working_base(envelope)
+        self.assertEqual(layout["order"][-1], doc_b.id)
+        self.assertEqual(layout["offsets"], [0, 1])
+        self.assertEqual(len(layout["pages"]), 2)
+
+        stored = Envelope.objects.get(pk=envelope.pk)
+        with open(Path(self.temp_media) / stored.working_base.name, "rb") as raw:
+            self.assertFalse(raw.read(5).startswith(b"%PDF-"))
+        self.assertTrue(working_base.read_working_base(stored).startswith(b"%PDF-"))
+
+        with mock.patch.object(working_base, "_build") as build_mock:
+            working_base.ensure_working_base(stored)
+        build_mock.assert_not_called()
+
+    def test_single_document_working_base_keeps_original_bytes(self):
+        from signature import working_base
+
+        envelope = Envelope.objects.create(title="Solo", created_by=self.creator)
+        original = self._pdf_with_label("solo.pdf", "SOLO")
+        data = original.read()
+        original.seek(0)
+        EnvelopeDocument.objects.create(envelope=envelope, file=original)
+
+        stored = Envelope.objects.get(pk=envelope.pk)
+        layout = working_base.ensure_working_base(stored)
+        self.assertEqual(layout["page_counts"], [1])
+        self.assertEqual(working_base.read_working_base(stored), data)
+
+    def test_working_base_layout_reuses_geometry_index(self):
+        from signature import working_base
+
+        envelope = Envelope.objects.create(title="Index", created_by=self.creator)
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("a.pdf", "A"))
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("b.pdf", "B"))
+
+        with mock.patch("signature.models.pdf_page_geometry") as parse_mock:
+            layout = working_base.ensure_working_base(Envelope.objects.get(pk=envelope.pk))
+        parse_mock.assert_not_called()
+        self.assertEqual(layout["pages"][0]["mediabox"], [0.0, 0.0, 200.0, 200.0])
+
+    def test_purge_deletes_working_base(self):
+        from datetime import timedelta
+
+        from signature import working_base
+        from signature.tasks import purge_expired_envelopes
+
+        envelope = Envelope.objects.create(title="Purge", created_by=self.creator)
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("a.pdf", "A"))
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("b.pdf", "B"))
+        working_base.ensure_working_base(envelope)
+        envelope.refresh_from_db()
+        storage, base_name = envelope.working_base.storage, envelope.working_base.name
+        self.assertTrue(storage.exists(base_name))
+
+        Envelope.objects.filter(pk=envelope.pk).update(
+            status="cancelled", cancelled_at=timezone.now() - timedelta(days=11)
+        )
+        self.assertEqual(purge_expired_envelopes(), 1)
+        self.assertFalse(storage.exists(base_name))
+
+    def test_working_base_rebuilt_when_documents_change(self):
+        from signature import working_base
+
+        envelope = Envelope.objects.create(title="Stale", created_by=self.creator)
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("a.pdf", "A"))
+        working_base.ensure_working_base(envelope)
+
+        EnvelopeDocument.objects.create(envelope=envelope, file=self._pdf_with_label("c.pdf", "C"))
+        layout = working_base.ensure_working_base(Envelope.objects.get(pk=envelope.pk))
+        self.assertEqual(layout["page_counts"], [1, 1])
+
+    @override_settings(SIGNATURE_ASYNC=True)
+    def test_async_sign_enqueues_job_and_reports_status(self):
+        from signature.models import SigningJob
+        from signature.tasks import process_signing_job
+
+        _, envelope, recipient, signature_data, signed_fields = self._two_document_signing()
+        url = reverse("envelopes-sign-authenticated", kwargs={"pk": envelope.public_id})
+
+        with mock.patch("signature.views.envelope.process_signing_job.delay") as delay_mock, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {"signature_data": signature_data, "signed_fields": signed_fields}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_id = response.data["job_id"]
+        delay_mock.assert_called_once_with(job_id)
+        self.assertFalse(SignatureDocument.objects.filter(envelope=envelope).exists())
+
+        status_url = reverse("envelopes-sign-job", kwargs={"pk": envelope.public_id, "job_id": job_id})
+        self.assertEqual(self.client.get(status_url).data["status"], "queued")
+
+        with mock.patch(
+            "signature.views.envelope.sign_pdf_bytes", side_effect=lambda pdf, **_kwargs: pdf
+        ), mock.patch("signature.views.envelope.send_signed_pdf_to_all_signers"), mock.patch(
+            "signature.views.envelope.send_document_completed_notification"
+        ):
+            process_signing_job(job_id)
+
+        job = SigningJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.signature_document.recipient, recipient)
+        self.assertEqual(job.signature_document.signer, self.creator)
+        self.assertEqual(self.client.get(status_url).data["status"], "completed")
+
+    @override_settings(SIGNATURE_ASYNC=True)
+    def test_async_sign_failure_reports_generic_error(self):
+        from signature.models import SigningJob
+        from signature.tasks import SIGNING_JOB_ERROR, process_signing_job
+
+        _, envelope, recipient, signature_data, signed_fields = self._two_document_signing()
+        job = SigningJob.objects.create(
+            envelope=envelope, recipient=recipient, signature_data=signature_data,
+            signed_fields=signed_fields, context={"base_url": "http://testserver"},
+        )
+
+        with mock.patch(
+            "signature.views.envelope.sign_pdf_bytes", side_effect=RuntimeError("/srv/keys/hsm.pem illisible")
+        ), self.assertLogs("signature.tasks", level="ERROR") as logs:
+            process_signing_job(str(job.id))
+
+        status_url = reverse("envelopes-sign-job", kwargs={"pk": envelope.public_id, "job_id": job.id})
+        data = self.client.get(status_url).data
+        self.assertEqual(data["status"], "failed")
+        self.assertEqual(data["error"], SIGNING_JOB_ERROR)
+        self.assertIn("hsm.pem", "\n".join(logs.output))
+        recipient.refresh_from_db()
+        self.assertFalse(recipient.signed)
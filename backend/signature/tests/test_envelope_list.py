@@ -0,0 +1,183 @@
+import logging
+import os
+import time
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from signature.models import Envelope, EnvelopeRecipient
+from signature.views.envelope import EnvelopeViewSet
+
+logger = logging.getLogger(__name__)
+
+TABS = [None, "draft", "cancelled", "sent", "action_required", "completed"]
+# Taille du jeu de données du benchmark (désactivé si absent), ex. ESIGN_BENCH_ENVELOPES=100000
+BENCH_ENVELOPES = int(os.environ.get("ESIGN_BENCH_ENVELOPES", "0") or 0)
+
+
+def _queryset(user, status_q=None):
+    params = {"status": status_q} if status_q else {}
+    request = APIRequestFactory().get("/api/signature/envelopes/", params)
+    request.user = user
+    view = EnvelopeViewSet()
+    view.request = Request(request)
+    view.request.user = user
+    return view.get_queryset()
+
+
+class EnvelopeListQueryTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.me = User.objects.create_user(username="me", password="password", email="me@example.com")
+        self.other = User.objects.create_user(username="other", password="password", email="other@example.com")
+
+        def env(title, owner, status, recipients=()):
+            envelope = Envelope.objects.create(title=title, created_by=owner, status=status)
+            for i, (email, user, signed) in enumerate(recipients):
+                EnvelopeRecipient.objects.create(
+                    envelope=envelope, email=email, user=user, full_name=email, order=i + 1, signed=signed
+                )
+            return envelope
+
+        self.draft = env("draft", self.me, "draft")
+        self.mine_sent = env("mine-sent", self.me, "sent", [("x@example.com", None, False)])
+        self.todo_user = env("todo-user", self.other, "sent", [("me@example.com", self.me, False)])
+        self.todo_guest = env("todo-guest", self.other, "pending", [
+            ("a@example.com", None, True), ("me@example.com", None, False),
+        ])
+        self.done_by_me = env("done-by-me", self.other, "completed", [
+            ("me@example.com", self.me, True), ("b@example.com", None, True),
+        ])
+        self.mine_done = env("mine-done", self.me, "completed", [("c@example.com", None, True)])
+        # Même email mais rattaché à un autre compte : ne doit pas remonter
+        env("foreign", self.other, "sent", [("me@example.com", self.other, False)])
+
+    def _titles(self, status_q):
+        return sorted(e.title for e in _queryset(self.me, status_q))
+
+    def test_tabs_return_expected_envelopes(self):
+        self.assertEqual(self._titles("draft"), ["draft"])
+        self.assertEqual(self._titles("sent"), ["mine-sent"])
+        self.assertEqual(self._titles("action_required"), ["todo-guest", "todo-user"])
+        self.assertEqual(self._titles("completed"), ["done-by-me", "mine-done"])
+        self.assertEqual(
+            self._titles(None),
+            ["done-by-me", "draft", "mine-done", "mine-sent", "todo-guest", "todo-user"],
+        )
+
+    def test_each_tab_is_one_query_without_join_or_distinct(self):
+        for status_q in TABS:
+            with self.subTest(status=status_q):
+                qs = _queryset(self.me, status_q)
+                sql = str(qs.query).upper()
+                self.assertNotIn("DISTINCT", sql)
+                self.assertNotIn("JOIN", sql)
+                with self.assertNumQueries(1):
+                    list(qs)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class EnvelopeDashboardListTests(APITestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.me = User.objects.create_user(
+            username="me", password="password", email="me@example.com", first_name="Awa", last_name="Diop"
+        )
+        self.client.force_authenticate(user=self.me)
+        self.url = reverse("envelopes-list")
+
+    def _envelopes(self, count):
+        for i in range(count):
+            envelope = Envelope.objects.create(title=f"E{i}", created_by=self.me, status="sent")
+            for j in range(3):
+                EnvelopeRecipient.objects.create(
+                    envelope=envelope, email=f"r{j}@example.com", full_name=f"R{j}", order=j + 1, signed=j < i % 4
+                )
+
+    def _num_queries(self, params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_list_mode_counts_from_annotations(self):
+        self._envelopes(4)
+
+        response = self.client.get(self.url, {"view": "list", "status": "sent"})
+
+        rows = {row["title"]: row for row in response.json()["results"]}
+        self.assertEqual(
+            [(rows[f"E{i}"]["recipients_count"], rows[f"E{i}"]["signed_count"]) for i in range(4)],
+            [(3, 0), (3, 1), (3, 2), (3, 3)],
+        )
+        self.assertAlmostEqual(rows["E2"]["completion_rate"], 200 / 3)
+        self.assertEqual(rows["E0"]["created_by_name"], "Awa Diop")
+
+    def test_page_query_count_is_constant_and_cursor_paginated(self):
+        self._envelopes(5)
+        small, _ = self._num_queries({"view": "list"})
+        self._envelopes(55)
+        large, page = self._num_queries({"view": "list"})
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(page["results"]), 50)
+        self.assertIn("cursor=", page["next"])
+        rest = self.client.get(page["next"]).json()
+        self.assertEqual(len(rest["results"]), 10)
+        self.assertIsNone(rest["next"])
+
+
+@skipUnless(BENCH_ENVELOPES, "benchmark désactivé (ESIGN_BENCH_ENVELOPES)")
+class EnvelopeListBenchmark(TestCase):
+    """Onglets sur un gros volume : une requête chacun, sous ESIGN_BENCH_MAX_MS (défaut 500 ms)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        users = [
+            User.objects.create_user(username=f"u{i}", password="x", email=f"u{i}@example.com") for i in range(50)
+        ]
+        cls.me = users[0]
+        statuses = ["draft", "sent", "pending", "completed", "cancelled", "expired"]
+        envelopes = Envelope.objects.bulk_create(
+            [
+                Envelope(title=f"E{i}", created_by=users[i % len(users)], status=statuses[i % len(statuses)])
+                for i in range(BENCH_ENVELOPES)
+            ],
+            batch_size=5000,
+        )
+        EnvelopeRecipient.objects.bulk_create(
+            [
+                EnvelopeRecipient(
+                    envelope=e,
+                    user=users[(i + 1) % len(users)] if i % 3 else None,
+                    email=users[(i + 1) % len(users)].email,
+                    full_name="R",
+                    order=1,
+                    signed=bool(i % 2),
+                )
+                for i, e in enumerate(envelopes)
+            ],
+            batch_size=5000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def test_tabs_query_count_and_timing(self):
+        budget_ms = float(os.environ.get("ESIGN_BENCH_MAX_MS", "500"))
+        for status_q in TABS:
+            with self.subTest(status=status_q):
+                qs = _queryset(self.me, status_q)[:50]
+                start = time.perf_counter()
+                with self.assertNumQueries(1):
+                    list(qs)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                result = f"{BENCH_ENVELOPES} enveloppes, onglet={status_q}: {elapsed_ms:.1f} ms"
+                logger.info("[bench] %s", result)
+                self.assertLess(elapsed_ms, budget_ms, result)
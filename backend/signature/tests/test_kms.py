@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from signature import kms
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+PUB = str(BASE_DIR / "certs" / "kms_pub_1.pem")
+PRIV = str(BASE_DIR / "certs" / "kms_priv_1.pem")
+
+
+@override_settings(
+    KMS_ACTIVE_KEY_ID=1,
+    KMS_RSA_PUBLIC_KEYS={"1": PUB},
+    KMS_RSA_PRIVATE_KEYS={"1": PRIV},
+)
+class KMSClientRegistryTests(SimpleTestCase):
+    def setUp(self):
+        kms.reset_kms_client()
+
+    def test_client_is_reused_between_calls(self):
+        before = kms.kms_cache_stats()
+        first = kms.get_kms_client()
+        second = kms.get_kms_client()
+        after = kms.kms_cache_stats()
+
+        self.assertIs(first, second)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+        self.assertEqual(after["hits"] - before["hits"], 1)
+
+    def test_settings_change_rebuilds_client(self):
+        first = kms.get_kms_client()
+        with override_settings(KMS_RSA_PRIVATE_KEYS={}):
+            second = kms.get_kms_client()
+            with self.assertRaises(ValueError):
+                second.unwrap_key(1, b"x")
+        self.assertIsNot(first, second)
+
+    def test_key_file_mtime_change_rebuilds_client(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(lambda: shutil.rmtree(tmp, ignore_errors=True))
+        pub_copy = os.path.join(tmp, "pub.pem")
+        shutil.copy(PUB, pub_copy)
+
+        with override_settings(KMS_RSA_PUBLIC_KEYS={"1": pub_copy}):
+            first = kms.get_kms_client()
+            st = os.stat(pub_copy)
+            os.utime(pub_copy, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+            second = kms.get_kms_client()
+
+        self.assertIsNot(first, second)
+        kid, wrapped = second.wrap_key(b"k" * 32)
+        self.assertEqual(second.unwrap_key(kid, wrapped), b"k" * 32)
+
+
+@override_settings(
+    KMS_ACTIVE_KEY_ID=1,
+    KMS_RSA_PUBLIC_KEYS={"1": PUB},
+    KMS_RSA_PRIVATE_KEYS={"1": PRIV},
+    KMS_DEK_CACHE_ENABLED=True,
+    KMS_DEK_CACHE_SIZE=2,
+    KMS_DEK_CACHE_TTL=60,
+)
+class DEKCacheTests(SimpleTestCase):
+    def setUp(self):
+        kms.reset_kms_client()
+        self.client_kms = kms.get_kms_client()
+
+    def _wrap(self, dek):
+        return self.client_kms.wrap_key(dek)
+
+    def test_repeat_unwrap_skips_rsa(self):
+        kid, wrapped = self._wrap(b"a" * 32)
+        with mock.patch.object(kms.LocalRSAKMS, "unwrap_key", autospec=True, side_effect=kms.LocalRSAKMS.unwrap_key) as spy:
+            self.assertEqual(kms.unwrap_key_cached(kid, wrapped), b"a" * 32)
+            self.assertEqual(kms.unwrap_key_cached(kid, wrapped), b"a" * 32)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_lru_eviction_zeroizes(self):
+        wrapped = [self._wrap(bytes([i]) * 32) for i in range(1, 4)]
+        for kid, w in wrapped[:2]:
+            kms.unwrap_key_cached(kid, w)
+
+        cache = kms._dek_cache
+        oldest_key = cache._key(*wrapped[0])
+        buf, _ = cache._entries[oldest_key]
+        kms.unwrap_key_cached(*wrapped[2])
+
+        self.assertEqual(kms.dek_cache_stats()["size"], 2)
+        self.assertNotIn(oldest_key, cache._entries)
+        self.assertEqual(bytes(buf), b"\x00" * 32)
+
+    def test_disabled_cache_always_unwraps(self):
+        kid, wrapped = self._wrap(b"b" * 32)
+        with override_settings(KMS_DEK_CACHE_ENABLED=False):
+            with mock.patch.object(kms.LocalRSAKMS, "unwrap_key", autospec=True, side_effect=kms.LocalRSAKMS.unwrap_key) as spy:
+                kms.unwrap_key_cached(kid, wrapped)
+                kms.unwrap_key_cached(kid, wrapped)
+        self.assertEqual(spy.call_count, 2)
+
+    def test_expired_entry_is_dropped(self):
+        kid, wrapped = self._wrap(b"c" * 32)
+        kms.unwrap_key_cached(kid, wrapped)
+        with mock.patch("signature.kms.time.monotonic", return_value=kms.time.monotonic() + 3600):
+            self.assertIsNone(kms._dek_cache.get(kid, wrapped))
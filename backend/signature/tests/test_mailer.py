@@ -0,0 +1,89 @@
+from unittest import mock
+
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase, override_settings
+
+from signature import mailer
+from signature.email_utils import send_templated_emails
+
+
+def _message(i: int) -> EmailMessage:
+    return EmailMessage(subject=f"S{i}", body="corps", from_email="from@example.com", to=[f"to{i}@example.com"])
+
+
+class PooledMailerTests(SimpleTestCase):
+    def setUp(self):
+        self.server = mailer.LocalSMTPServer().start()
+        self.addCleanup(self.server.stop)
+        override = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST=self.server.host,
+            EMAIL_PORT=self.server.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_RETRIES=1,
+            EMAIL_RETRY_BACKOFF=0,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        mailer.reset_mailer()
+        self.addCleanup(mailer.reset_mailer)
+
+    def test_messages_share_one_connection_across_calls(self):
+        self.assertEqual(mailer.send_messages([_message(i) for i in range(3)]), 3)
+        self.assertEqual(mailer.send_messages([_message(3)]), 1)
+
+        self.assertEqual(len(self.server.messages), 4)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(mailer.mailer_stats()["connections"], 1)
+
+    def test_transient_failure_retried_on_new_connection(self):
+        self.server.fail_messages = 1
+        self.assertEqual(mailer.send_messages([_message(0), _message(1)]), 2)
+
+        self.assertEqual([m["message"]["Subject"] for m in self.server.messages], ["S0", "S1"])
+        self.assertEqual(mailer.mailer_stats()["retries"], 1)
+        self.assertEqual(self.server.connections, 2)
+
+    def test_exhausted_retries_do_not_block_other_messages(self):
+        self.server.fail_messages = 2
+        self.assertEqual(mailer.send_messages([_message(0), _message(1)]), 1)
+        self.assertEqual(mailer.mailer_stats()["failures"], 1)
+
+    def test_request_path_sends_without_retry(self):
+        self.server.fail_messages = 1
+        self.assertEqual(mailer.send_messages([_message(0)], retries=mailer.request_retries()), 0)
+        self.assertEqual(mailer.mailer_stats()["retries"], 0)
+        self.assertEqual(mailer.mailer_stats()["failures"], 1)
+
+    def test_otp_email_not_retried_in_view(self):
+        from signature import otp
+
+        self.server.fail_messages = 1
+        with mock.patch.object(mailer.time, "sleep") as sleep_mock:
+            otp.send_otp(mock.Mock(id=1, email="r@example.com", full_name="R"), "123456")
+        sleep_mock.assert_not_called()
+        self.assertEqual(self.server.messages, [])
+        self.assertEqual(mailer.mailer_stats()["retries"], 0)
+
+    def test_stale_pooled_connection_reopened_without_retry(self):
+        self.assertEqual(mailer.send_messages([_message(0)]), 1)
+        # Le serveur a fermé la connexion inactive : smtplib lève SMTPServerDisconnected
+        mailer._mailer.connection().connection.close()
+
+        with mock.patch.object(mailer.time, "sleep") as sleep_mock:
+            self.assertEqual(mailer.send_messages([_message(1)], retries=mailer.request_retries()), 1)
+        sleep_mock.assert_not_called()
+        self.assertEqual([m["message"]["Subject"] for m in self.server.messages], ["S0", "S1"])
+        self.assertEqual(mailer.mailer_stats()["retries"], 0)
+        self.assertEqual(mailer.mailer_stats()["connections"], 2)
+
+    def test_templated_batch(self):
+        sent = send_templated_emails(
+            dict(recipient_email=f"r{i}@example.com", subject="Sujet", message_content="Bonjour") for i in range(5)
+        )
+        self.assertEqual(sent, 5)
+        self.assertEqual(self.server.connections, 1)
+        self.assertTrue(all(m["message"].is_multipart() for m in self.server.messages))
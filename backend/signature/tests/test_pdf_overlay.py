@@ -0,0 +1,61 @@
+import base64
+import io
+from pathlib import Path
+
+from django.test import SimpleTestCase
+from pyhanko.pdf_utils.incremental_writer import IncrementalPdfFileWriter
+from pyhanko.pdf_utils.reader import PdfFileReader
+from pyhanko.sign import signers
+from pyhanko.sign.validation import validate_pdf_signature
+from reportlab.pdfgen import canvas
+
+from signature.tasks import _paste_signature_on_pdf
+
+CERTS = Path(__file__).resolve().parents[2] / "certs"
+PNG_1PX = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR4nGNgYAAAAAMAAWgmWQ0AAAAASUVORK5CYII="
+)
+
+
+def _pdf(pages: int) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=(200, 200))
+    for i in range(pages):
+        c.drawString(40, 120, f"PAGE{i}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _signed(pdf: bytes) -> bytes:
+    signer = signers.SimpleSigner.load(
+        key_file=str(CERTS / "selfsign_key.pem"), cert_file=str(CERTS / "selfsign_cert.pem")
+    )
+    out = io.BytesIO()
+    signers.PdfSigner(signers.PdfSignatureMetadata(field_name="First"), signer=signer).sign_pdf(
+        IncrementalPdfFileWriter(io.BytesIO(pdf)), output=out
+    )
+    return out.getvalue()
+
+
+class IncrementalOverlayTests(SimpleTestCase):
+    def test_overlay_appends_revision_and_keeps_earlier_signature_intact(self):
+        signed = _signed(_pdf(3))
+        placement = [{"page": 2, "x": 0.1, "y": 0.1, "width": 0.2, "height": 0.1}]
+
+        out = _paste_signature_on_pdf(signed, PNG_1PX, placement)
+
+        self.assertTrue(out.startswith(signed))
+        reader = PdfFileReader(io.BytesIO(out))
+        status = validate_pdf_signature(reader.embedded_signatures[0])
+        self.assertTrue(status.intact)
+        self.assertEqual(reader.xrefs.total_revisions, 3)
+
+    def test_only_touched_pages_are_rewritten(self):
+        pdf = _pdf(50)
+        out = _paste_signature_on_pdf(pdf, PNG_1PX, [{"page": 7, "x": 0, "y": 0, "width": 0.5, "height": 0.5}])
+
+        revision = PdfFileReader(io.BytesIO(out)).xrefs.explicit_refs_in_revision(1)
+        # Page 7, /Contents, /Resources, flux q et dessin, image + SMask, catalogue, /Info :
+        # indépendant du nombre de pages du document
+        self.assertLessEqual(len(revision), 9)
@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from signature import tasks
+from signature.models import Envelope, EnvelopeRecipient
+
+
+class ReminderSchedulingTests(TestCase):
+    def setUp(self):
+        self.creator = get_user_model().objects.create_user(
+            username="creator", password="password", email="creator@example.com"
+        )
+        self.now = timezone.now()
+        self.past = self.now - timedelta(hours=1)
+
+    def _envelope(self, flow_type="sequential", **kwargs):
+        defaults = {"status": "sent", "deadline_at": self.now + timedelta(days=3)}
+        defaults.update(kwargs)
+        return Envelope.objects.create(title="Doc", created_by=self.creator, flow_type=flow_type, **defaults)
+
+    def _recipient(self, envelope, order, **kwargs):
+        defaults = {"next_reminder_at": self.past}
+        defaults.update(kwargs)
+        return EnvelopeRecipient.objects.create(
+            envelope=envelope, email=f"r{order}-{envelope.pk}@example.com", full_name=f"R{order}", order=order, **defaults
+        )
+
+    def test_due_reminders_selected_in_a_single_query(self):
+        seq = self._envelope("sequential")
+        self._recipient(seq, 1, signed=True)
+        current = self._recipient(seq, 2)
+        self._recipient(seq, 3)  # pas encore son tour
+
+        par = self._envelope("parallel")
+        par_a = self._recipient(par, 1)
+        par_b = self._recipient(par, 2)
+        self._recipient(par, 3, next_reminder_at=self.now + timedelta(days=1))
+        self._recipient(par, 4, reminder_count=tasks.MAX_REMINDERS)
+
+        expired = self._envelope("parallel", deadline_at=self.past)
+        self._recipient(expired, 1)
+        draft = self._envelope("parallel", status="draft")
+        self._recipient(draft, 1)
+
+        # Séquentiel dont le signataire courant n'est pas encore dû : personne n'est relancé
+        waiting = self._envelope("sequential")
+        self._recipient(waiting, 1, next_reminder_at=self.now + timedelta(days=1))
+        self._recipient(waiting, 2)
+
+        with self.assertNumQueries(1):
+            due = list(tasks._due_reminders(self.now))
+
+        self.assertEqual(
+            sorted(due),
+            sorted([(seq.pk, current.pk), (par.pk, par_a.pk), (par.pk, par_b.pk)]),
+        )
+
+    @override_settings(REMINDER_CHUNK_SIZE=2)
+    def test_reminders_enqueued_in_chunks(self):
+        env = self._envelope("parallel")
+        recipients = [self._recipient(env, i) for i in range(1, 6)]
+
+        with mock.patch.object(tasks.send_reminder_email, "chunks") as chunks_mock:
+            sent = tasks.process_signature_reminders()
+
+        self.assertEqual(sent, 5)
+        pairs, size = chunks_mock.call_args.args
+        self.assertEqual(sorted(pairs), sorted((env.pk, r.pk) for r in recipients))
+        self.assertEqual(size, 2)
+        chunks_mock.return_value.apply_async.assert_called_once_with()
+
+    def test_send_reminder_email_updates_recipient(self):
+        env = self._envelope("parallel", reminder_days=2)
+        rec = self._recipient(env, 1)
+
+        with mock.patch.object(tasks.EmailTemplates, "signature_reminder_email") as email_mock:
+            tasks.send_reminder_email(env.pk, rec.pk)
+
+        email_mock.assert_called_once()
+        rec.refresh_from_db()
+        self.assertEqual(rec.reminder_count, 1)
+        self.assertGreater(rec.next_reminder_at, self.now + timedelta(days=1))
+
+
+class DeadlineExpiryTests(TestCase):
+    def setUp(self):
+        self.creator = get_user_model().objects.create_user(
+            username="creator", password="password", email="creator@example.com"
+        )
+        self.now = timezone.now()
+
+    def _envelope(self, deadline_at, status="sent"):
+        env = Envelope.objects.create(title="Doc", created_by=self.creator, status=status, deadline_at=deadline_at)
+        EnvelopeRecipient.objects.create(
+            envelope=env, email=f"r-{env.pk}@example.com", full_name="R", next_reminder_at=self.now
+        )
+        return env
+
+    @override_settings(DEADLINE_BATCH_SIZE=2, DEADLINE_NOTIFY_CHUNK_SIZE=10)
+    def test_overdue_envelopes_expired_in_batches_and_notified_once(self):
+        overdue = [self._envelope(self.now - timedelta(hours=1)) for _ in range(5)]
+        future = self._envelope(self.now + timedelta(days=1))
+        done = self._envelope(self.now - timedelta(hours=1), status="completed")
+
+        with mock.patch.object(tasks.send_deadline_email, "chunks") as chunks_mock, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(tasks.process_deadlines(), 5)
+
+        notified = sorted(pk for call in chunks_mock.call_args_list for (pk,) in call.args[0])
+        self.assertEqual(notified, sorted(e.pk for e in overdue))
+        self.assertEqual(chunks_mock.call_count, 3)
+
+        self.assertEqual(
+            set(Envelope.objects.filter(status="expired").values_list("pk", flat=True)), {e.pk for e in overdue}
+        )
+        self.assertFalse(
+            EnvelopeRecipient.objects.filter(envelope__in=overdue, next_reminder_at__isnull=False).exists()
+        )
+        self.assertTrue(EnvelopeRecipient.objects.filter(envelope=future, next_reminder_at__isnull=False).exists())
+        done.refresh_from_db()
+        self.assertEqual(done.status, "completed")
+
+        # Un second passage (autre nœud beat) ne renotifie rien
+        with mock.patch.object(tasks.send_deadline_email, "chunks") as chunks_mock:
+            self.assertEqual(tasks.process_deadlines(), 0)
+        chunks_mock.assert_not_called()
@@ -0,0 +1,55 @@
+import io
+
+import qrcode
+from django.test import SimpleTestCase
+from PyPDF2 import PdfReader
+from reportlab.pdfgen import canvas
+
+from signature.qr_stamp import stamp_qr_all_pages
+
+
+def _pdf(sizes) -> bytes:
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer)
+    for i, size in enumerate(sizes):
+        c.setPageSize(size)
+        c.drawString(40, 120, f"PAGE{i}")
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _qr_png() -> bytes:
+    buffer = io.BytesIO()
+    qrcode.make("https://example.com/verify/uuid?sig=hmac").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class QRStampTests(SimpleTestCase):
+    def test_single_shared_image_referenced_from_every_page(self):
+        sizes = [(595, 842)] * 6 + [(842, 595)] * 2
+        out = stamp_qr_all_pages(_pdf(sizes), _qr_png())
+        reader = PdfReader(io.BytesIO(out))
+
+        self.assertEqual(len(reader.pages), len(sizes))
+        xobjects = {ref.idnum for page in reader.pages for ref in page["/Resources"]["/XObject"].values()}
+        self.assertEqual(len(xobjects), 1)
+
+        # Un flux de placement par largeur de page, partagé par les pages de même taille
+        placements = {page["/Contents"][-1].idnum for page in reader.pages}
+        self.assertEqual(len(placements), 2)
+
+        for i, page in enumerate(reader.pages):
+            self.assertIn(f"PAGE{i}", page.extract_text())
+
+    def test_incremental_update_keeps_original_bytes_and_embeds_qr_once(self):
+        pdf = _pdf([(595, 842)] * 20)
+        out = stamp_qr_all_pages(pdf, _qr_png())
+        self.assertTrue(out.startswith(pdf))
+        self.assertEqual(out.count(b"/Subtype /Image"), 1)
+        self.assertLess(len(out) - len(pdf), 20_000)
+
+        # Second passage (ex. re-scellement) : l'image déjà déclarée est réutilisée
+        again = stamp_qr_all_pages(out, _qr_png())
+        self.assertTrue(again.startswith(out))
+        self.assertEqual(again.count(b"/Subtype /Image"), 1)
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from signature import tasks
+from signature.models import Envelope, EnvelopeRecipient, PrintQRCode, SignatureDocument
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class QRVerifyCacheTests(APITestCase):
+    def setUp(self):
+        caches["qr_verify"].clear()
+        self.addCleanup(caches["qr_verify"].clear)
+        creator = get_user_model().objects.create_user(username="owner", password="p", email="owner@example.com")
+        self.envelope = Envelope.objects.create(title="Contrat", created_by=creator, status="sent")
+        self.recipient = EnvelopeRecipient.objects.create(
+            envelope=self.envelope, email="r@example.com", full_name="R", order=1
+        )
+        self.qr = PrintQRCode.objects.create(envelope=self.envelope, qr_type="permanent")
+        self.url = reverse("prints-verify", kwargs={"uuid": self.qr.uuid})
+
+    def _get(self, sig=None, **headers):
+        return self.client.get(self.url, {"sig": sig or self.qr.hmac}, **headers)
+
+    def test_second_scan_served_from_cache_without_queries(self):
+        first = self._get()
+        self.assertEqual(first.status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            second = self._get()
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.json(), first.json())
+        self.assertTrue(second.json()["document_url"].endswith(f"/prints/{self.qr.uuid}/document/?sig={self.qr.hmac}"))
+
+    def test_invalid_signature_never_served_from_cache(self):
+        self._get()
+        self.assertEqual(self._get(sig="0" * 64).status_code, 403)
+
+    def test_conditional_requests_return_304(self):
+        first = self._get()
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_recipient_and_signature_changes_invalidate(self):
+        etag = self._get()["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipient.signed = True
+            self.recipient.signed_at = timezone.now()
+            self.recipient.save()
+            SignatureDocument.objects.create(
+                envelope=self.envelope, recipient=self.recipient, signature_data="x",
+                certificate_data={"hash_sha256": "abc"},
+            )
+
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["signers"][0]["signed"])
+        self.assertEqual(response.json()["hash_sha256"], "abc")
+
+    def test_revocation_and_bulk_expiry_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.envelope.deadline_at = timezone.now() - timedelta(minutes=1)
+            self.envelope.save()
+        self.assertEqual(self._get().json()["status"], "sent")
+
+        with mock.patch.object(tasks.send_deadline_email, "chunks"), \
+                self.captureOnCommitCallbacks(execute=True):
+            tasks._expire_deadline_batch(timezone.now(), 10)
+        self.assertEqual(self._get().json()["status"], "expired")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.qr.state = "revoked"
+            self.qr.save()
+        self.assertEqual(self._get().status_code, 403)
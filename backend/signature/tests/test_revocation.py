@@ -0,0 +1,119 @@
+import asyncio
+import datetime
+from unittest import mock
+
+from asn1crypto import crl as asn1_crl, ocsp as asn1_ocsp, x509 as asn1_x509
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from pyhanko_certvalidator.fetchers.api import CRLFetcher, OCSPFetcher
+
+from signature import revocation
+
+NOW = datetime.datetime.now(datetime.timezone.utc)
+KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+NAME = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Test CA")])
+
+
+def _cert() -> asn1_x509.Certificate:
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(NAME)
+        .issuer_name(NAME)
+        .public_key(KEY.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(NOW - datetime.timedelta(days=1))
+        .not_valid_after(NOW + datetime.timedelta(days=30))
+        .sign(KEY, hashes.SHA256())
+    )
+    return asn1_x509.Certificate.load(cert.public_bytes(serialization.Encoding.DER))
+
+
+def _crl(next_update: datetime.datetime) -> asn1_crl.CertificateList:
+    built = (
+        x509.CertificateRevocationListBuilder()
+        .issuer_name(NAME)
+        .last_update(NOW - datetime.timedelta(hours=1))
+        .next_update(next_update)
+        .sign(KEY, hashes.SHA256())
+    )
+    return asn1_crl.CertificateList.load(built.public_bytes(serialization.Encoding.DER))
+
+
+class _CountingCRLFetcher(CRLFetcher):
+    def __init__(self, next_update):
+        self.next_update = next_update
+        self.calls = 0
+
+    async def fetch(self, cert, *, use_deltas=None):
+        self.calls += 1
+        return [_crl(self.next_update)]
+
+
+class _CountingOCSPFetcher(OCSPFetcher):
+    def __init__(self):
+        self.calls = 0
+
+    async def fetch(self, cert, authority):
+        self.calls += 1
+        return asn1_ocsp.OCSPResponse({"response_status": "try_later"})
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "revocation": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "revinfo-tests"},
+    }
+)
+class RevocationCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["revocation"].clear()
+        self.cert = _cert()
+
+    def _fetch(self, inner, min_remaining=0):
+        fetcher = revocation.CachedCRLFetcher(inner, revocation._Store(min_remaining))
+        return fetcher, asyncio.run(fetcher.fetch(self.cert))
+
+    def test_crl_served_from_shared_cache_until_next_update(self):
+        inner = _CountingCRLFetcher(NOW + datetime.timedelta(hours=6))
+        self._fetch(inner)
+        # Un autre worker (nouvelles instances de fetchers) réutilise l'entrée partagée
+        fetcher, crls = self._fetch(inner)
+
+        self.assertEqual(inner.calls, 1)
+        self.assertEqual(len(crls), 1)
+        self.assertEqual(list(fetcher.fetched_crls_for_cert(self.cert)), crls)
+
+    def test_stale_crl_is_not_cached(self):
+        inner = _CountingCRLFetcher(NOW - datetime.timedelta(minutes=1))
+        self._fetch(inner)
+        self._fetch(inner)
+        self.assertEqual(inner.calls, 2)
+
+    def test_prewarm_margin_refreshes_entries_close_to_next_update(self):
+        inner = _CountingCRLFetcher(NOW + datetime.timedelta(minutes=10))
+        self._fetch(inner)
+        self._fetch(inner)
+        self.assertEqual(inner.calls, 1)
+
+        self._fetch(inner, min_remaining=15 * 60)
+        self.assertEqual(inner.calls, 2)
+
+    def test_ttl_is_capped(self):
+        with override_settings(REVOCATION_CACHE_MAX_TTL=60):
+            self.assertEqual(revocation._ttl_until(NOW + datetime.timedelta(days=3)), 60)
+        with override_settings(REVOCATION_CACHE_DEFAULT_TTL=120):
+            self.assertEqual(revocation._ttl_until(None), 120)
+
+    def test_ocsp_responses_not_accumulated_per_cert(self):
+        inner = _CountingOCSPFetcher()
+        fetcher = revocation.CachedOCSPFetcher(inner, revocation._Store(0))
+        authority = mock.Mock(public_key=self.cert.public_key)
+        for _ in range(3):
+            asyncio.run(fetcher.fetch(self.cert, authority))
+
+        self.assertEqual(len(list(fetcher.fetched_responses_for_cert(self.cert))), 1)
+        self.assertEqual(len(list(fetcher.fetched_responses())), 1)
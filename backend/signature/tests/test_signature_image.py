@@ -0,0 +1,60 @@
+import base64
+import io
+import threading
+
+from django.test import SimpleTestCase, override_settings
+from PIL import Image
+
+from signature import signature_image
+
+
+def _image_bytes(color, fmt="PNG") -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (4, 2), color).save(buf, format=fmt)
+    return buf.getvalue()
+
+
+class PreparedSignatureTests(SimpleTestCase):
+    def setUp(self):
+        signature_image.reset_prepared_signatures()
+        self.addCleanup(signature_image.reset_prepared_signatures)
+
+    def test_same_content_shares_one_prepared_object(self):
+        raw = _image_bytes("red", fmt="JPEG")
+        prepared = signature_image.prepare_signature(raw)
+
+        b64 = base64.b64encode(raw).decode()
+        self.assertIs(signature_image.prepare_signature(b64), prepared)
+        self.assertIs(signature_image.prepare_signature(f"data:image/jpeg;base64,{b64}"), prepared)
+        self.assertIs(signature_image.prepare_signature({"data_url": b64}), prepared)
+        # Le PNG normalisé (transmis en base64 aux tâches) retombe sur la même entrée
+        self.assertIs(signature_image.prepare_signature(prepared.b64), prepared)
+        self.assertIs(signature_image.prepare_signature(prepared), prepared)
+        self.assertEqual(signature_image.prepared_signature_stats()["misses"], 1)
+
+        self.assertTrue(prepared.png.startswith(b"\x89PNG"))
+        self.assertIs(prepared.image_reader, prepared.image_reader)
+        self.assertIs(prepared.stamp_style, prepared.stamp_style)
+
+    def test_stamp_style_is_per_thread(self):
+        prepared = signature_image.prepare_signature(_image_bytes("blue"))
+        other = []
+        t = threading.Thread(target=lambda: other.append(prepared.stamp_style))
+        t.start()
+        t.join()
+        self.assertIsNot(other[0], prepared.stamp_style)
+
+    def test_invalid_data_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            signature_image.prepare_signature(b"not an image")
+        with self.assertRaises(ValueError):
+            signature_image.prepare_signature("")
+
+    @override_settings(SIGNATURE_IMAGE_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        first = signature_image.prepare_signature(_image_bytes("red"))
+        signature_image.prepare_signature(_image_bytes("green"))
+        signature_image.prepare_signature(_image_bytes("blue"))
+
+        self.assertEqual(signature_image.prepared_signature_stats()["entries"], 2)
+        self.assertIsNot(signature_image.prepare_signature(_image_bytes("red")), first)
@@ -1,4 +1,6 @@
+import io
 import os
+import shutil
 import tempfile
 from pathlib import Path
 
@@ -25,7 +27,19 @@ from django.test import SimpleTestCase, override_settings
 from signature.storages import EncryptedFileSystemStorage
 
 
+def _use_temp_media(test):
+    """MEDIA_ROOT temporaire : les fichiers enregistrés ne restent pas dans backend/media."""
+    temp_media = tempfile.mkdtemp()
+    override = override_settings(MEDIA_ROOT=temp_media)
+    override.enable()
+    test.addCleanup(override.disable)
+    test.addCleanup(lambda: shutil.rmtree(temp_media, ignore_errors=True))
+
+
 class LargeFileEncryptionTest(SimpleTestCase):
+    def setUp(self):
+        _use_temp_media(self)
+
     def test_large_pdf_encryption(self):
         storage = EncryptedFileSystemStorage()
         data = b'%PDF-1.4\n' + os.urandom(2 * 1024 * 1024)  # 2 Mo
@@ -65,3 +79,58 @@ class StorageValidationTest(SimpleTestCase):
         cf.content_type = 'application/pdf'
         with self.assertRaises(ValidationError):
             self.storage.save('big.pdf', cf)
+
+
+@override_settings(ENCRYPTED_STORAGE_FORMAT='EG3', ENCRYPTED_STORAGE_SEGMENT_SIZE=4096)
+class StreamingEG3Test(SimpleTestCase):
+    def setUp(self):
+        _use_temp_media(self)
+        self.storage = EncryptedFileSystemStorage()
+
+    def _save(self, data, name='stream.pdf'):
+        cf = ContentFile(data, name=name)
+        cf.content_type = 'application/pdf'
+        return self.storage.save(name, cf)
+
+    def test_written_as_eg3_and_read_lazily(self):
+        data = b'%PDF-1.4\n' + os.urandom(3 * 4096 + 17)
+        name = self._save(data)
+        with open(self.storage.path(name), 'rb') as raw:
+            self.assertEqual(raw.read(3), b'EG3')
+        self.assertEqual(self.storage.size(name), len(data))
+
+        f = self.storage.open(name)
+        try:
+            self.assertFalse(isinstance(f, io.BytesIO))
+            self.assertEqual(f.size, len(data))
+            f.seek(4000)
+            self.assertEqual(f.read(200), data[4000:4200])
+            f.seek(-10, io.SEEK_END)
+            self.assertEqual(f.read(), data[-10:])
+            f.seek(0)
+            self.assertEqual(f.read(), data)
+        finally:
+            f.close()
+
+    def test_tampered_segment_is_rejected(self):
+        data = b'%PDF-1.4\n' + os.urandom(2 * 4096)
+        name = self._save(data)
+        path = self.storage.path(name)
+        with open(path, 'r+b') as raw:
+            raw.seek(-1, io.SEEK_END)
+            last = raw.read(1)
+            raw.seek(-1, io.SEEK_END)
+            raw.write(bytes([last[0] ^ 1]))
+        with self.storage.open(name) as f:
+            with self.assertRaises(ValueError):
+                f.read()
+
+    def test_eg2_files_remain_readable(self):
+        data = b'%PDF-1.4\n' + os.urandom(5000)
+        with override_settings(ENCRYPTED_STORAGE_FORMAT='EG2'):
+            name = self._save(data, 'legacy.pdf')
+        with open(self.storage.path(name), 'rb') as raw:
+            self.assertEqual(raw.read(3), b'EG2')
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.storage.size(name), len(data))
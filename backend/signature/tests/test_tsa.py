@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+import hashlib
+import shutil
+import socket
+import tempfile
+from pathlib import Path
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+from django.test import SimpleTestCase, override_settings
+
+from signature import tsa
+
+
+def _write_tsa_identity(directory: str) -> tuple[str, str]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "Local TSA")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.ExtendedKeyUsage([ExtendedKeyUsageOID.TIME_STAMPING]), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_file = str(Path(directory) / "tsa_cert.pem")
+    key_file = str(Path(directory) / "tsa_key.pem")
+    Path(cert_file).write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    Path(key_file).write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+    return cert_file, key_file
+
+
+def _closed_port_url() -> str:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/tsr"
+
+
+def _timestamp(stamper):
+    digest = hashlib.sha256(b"document").digest()
+    return asyncio.run(stamper.async_timestamp(digest, "sha256"))
+
+
+@override_settings(TSA_RETRIES=0, TSA_RETRY_BACKOFF=0, TSA_BREAKER_THRESHOLD=1, TSA_BREAKER_RESET=3600)
+class TimeStamperTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.mkdtemp()
+        cls.cert_file, cls.key_file = _write_tsa_identity(cls.tmp)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        tsa.reset_timestamper()
+        tsa._metrics.reset()
+        self.server = tsa.LocalTSAServer(self.cert_file, self.key_file).start()
+        self.addCleanup(self.server.stop)
+
+    def test_pooled_client_against_local_server(self):
+        with override_settings(TSA_BACKENDS=[{"name": "local-http", "type": "http", "url": self.server.url}]):
+            stamper = tsa.get_timestamper()
+            token = _timestamp(stamper)
+            self.assertIs(tsa.get_timestamper(), stamper)
+
+        self.assertEqual(token["content_type"].native, "signed_data")
+        stats = tsa.tsa_stats()["local-http"]
+        self.assertEqual(stats["failures"], 0)
+        self.assertGreaterEqual(stats["requests"], 1)
+        self.assertGreater(stats["max_seconds"], 0)
+
+    def test_transient_server_error_is_retried(self):
+        self.server.fail_requests = 1
+        with override_settings(
+            TSA_RETRIES=1, TSA_BACKENDS=[{"name": "local-http", "type": "http", "url": self.server.url}]
+        ):
+            _timestamp(tsa.get_timestamper())
+        self.assertEqual(tsa.tsa_stats()["local-http"]["failures"], 0)
+        self.assertGreaterEqual(self.server.requests, 2)
+
+    def test_failover_and_circuit_breaker(self):
+        backends = [
+            {"name": "down", "type": "http", "url": _closed_port_url()},
+            {"name": "local", "type": "local", "cert_file": self.cert_file, "key_file": self.key_file},
+        ]
+        with override_settings(TSA_BACKENDS=backends):
+            stamper = tsa.get_timestamper()
+            _timestamp(stamper)
+            _timestamp(stamper)
+
+        stats = tsa.tsa_stats()
+        # Disjoncteur ouvert après le premier échec : le backend en panne n'est plus sollicité
+        self.assertEqual(stats["down"]["requests"], 1)
+        self.assertEqual(stats["down"]["failures"], 1)
+        self.assertGreaterEqual(stats["local"]["requests"], 2)
+
+    def test_all_backends_down_raises(self):
+        with override_settings(TSA_BACKENDS=[{"name": "down", "type": "http", "url": _closed_port_url()}]):
+            with self.assertRaises(IOError):
+                _timestamp(tsa.get_timestamper())
+
+    def test_half_open_trial_released_on_unexpected_error(self):
+        class Broken(tsa.TimeStamper):
+            async def async_request_tsa_response(self, req):
+                raise ValueError("réponse inattendue")
+
+        local = tsa.LocalTimeStamper.from_files(self.cert_file, self.key_file)
+        stamper = tsa.FailoverTimeStamper([("broken", Broken()), ("local", local)], breaker_threshold=1,
+                                          breaker_reset=0)
+        _timestamp(stamper)
+        _timestamp(stamper)
+
+        breaker = stamper.backends[0][2]
+        # Chaque essai semi-ouvert se termine par un échec enregistré, jamais bloqué « en cours »
+        self.assertFalse(breaker._trial_in_flight)
+        self.assertEqual(tsa.tsa_stats()["broken"]["failures"], tsa.tsa_stats()["broken"]["requests"])
+        self.assertGreaterEqual(tsa.tsa_stats()["broken"]["requests"], 2)
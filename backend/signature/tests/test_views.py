@@ -1,5 +1,12 @@
+import shutil
+import tempfile
 import uuid
+from pathlib import Path
 
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
@@ -9,7 +16,11 @@ from rest_framework.test import APITestCase
 
 import jwt
 
-from signature.models import Envelope, EnvelopeRecipient
+from unittest import mock
+
+from signature.models import Envelope, EnvelopeRecipient, GuestIdentifier, SignatureDocument, SigningField
+from signature.views import envelope as envelope_views
+from signature.views.envelope import _guest_identifier, _resolve_guest_identifiers
 
 class AuthTests(APITestCase):
     def test_register_invalid(self):
@@ -101,3 +112,187 @@ class GuestEnvelopeAccessTests(APITestCase):
         response = self.client.get(url, {'token': self.token})
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn('annul', response.data['error'].lower())
+
+
+class PdfRangeServingTests(APITestCase):
+    def setUp(self):
+        self.temp_media = tempfile.mkdtemp()
+        base_dir = Path(__file__).resolve().parents[2]
+        override = override_settings(
+            MEDIA_ROOT=self.temp_media,
+            KMS_ACTIVE_KEY_ID=1,
+            KMS_RSA_PUBLIC_KEYS={"1": str(base_dir / "certs" / "kms_pub_1.pem")},
+            KMS_RSA_PRIVATE_KEYS={"1": str(base_dir / "certs" / "kms_priv_1.pem")},
+            ENCRYPTED_STORAGE_SEGMENT_SIZE=1024,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(lambda: shutil.rmtree(self.temp_media, ignore_errors=True))
+
+        self.user = get_user_model().objects.create_user(username='owner', password='p', email='owner@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.pdf = b'%PDF-1.4\n' + bytes(range(256)) * 20
+        self.envelope = Envelope.objects.create(title='Range', created_by=self.user)
+        self.envelope.document_file.save('range.pdf', ContentFile(self.pdf, name='range.pdf'))
+        self.url = reverse('envelopes-original-document', kwargs={'pk': self.envelope.public_id})
+
+    def test_full_response_advertises_ranges(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'])
+        self.assertEqual(b''.join(response.streaming_content), self.pdf)
+
+    def test_range_returns_partial_content(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=1000-2099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 1000-2099/{len(self.pdf)}')
+        self.assertEqual(response['Content-Length'], '1100')
+        self.assertEqual(b''.join(response.streaming_content), self.pdf[1000:2100])
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.pdf[-10:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.pdf) + 5}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.pdf)}')
+
+    def test_if_range_mismatch_serves_full_document(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.pdf)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FieldsPayloadQueryTests(APITestCase):
+    def setUp(self):
+        self.creator = get_user_model().objects.create_user(username='owner', password='p', email='owner@example.com')
+        self.signer = get_user_model().objects.create_user(username='signer', password='p', email='signer@example.com')
+        self.envelope = Envelope.objects.create(title='Fields', created_by=self.creator, status='sent', flow_type='parallel')
+        self.done = EnvelopeRecipient.objects.create(
+            envelope=self.envelope, email='done@example.com', full_name='Done', order=1, signed=True
+        )
+        self.guest = EnvelopeRecipient.objects.create(
+            envelope=self.envelope, email='guest@example.com', full_name='Guest', order=2
+        )
+        self.member = EnvelopeRecipient.objects.create(
+            envelope=self.envelope, email='signer@example.com', user=self.signer, full_name='Signer', order=3
+        )
+        for data in ('old-signature', 'new-signature'):
+            SignatureDocument.objects.create(envelope=self.envelope, recipient=self.done, signature_data=data)
+        secret = getattr(settings, 'SIGNATURE_JWT_SECRET', settings.SECRET_KEY)
+        token = jwt.encode({'env_id': str(self.envelope.public_id), 'recipient_id': self.guest.id}, secret, algorithm='HS256')
+        self.token = token if isinstance(token, str) else token.decode('utf-8')
+
+    def _add_fields(self, count):
+        recipients = [self.done, self.guest, self.member]
+        for i in range(count):
+            SigningField.objects.create(
+                envelope=self.envelope, recipient=recipients[i % 3], field_type='signature', page=1,
+                position={'x': 0, 'y': 0, 'width': 10, 'height': 10}, name=f'f{i}',
+            )
+
+    def _count_queries(self, method, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = method(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data
+
+    def test_guest_view_fixed_queries_and_bulk_identifiers(self):
+        url = reverse('guest-envelope', kwargs={'public_id': self.envelope.public_id})
+        self._add_fields(3)
+        small, _ = self._count_queries(self.client.get, url, token=self.token)
+        self._add_fields(30)
+        large, data = self._count_queries(self.client.get, url, token=self.token)
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['fields']), 33)
+        field = SigningField.objects.filter(envelope=self.envelope).first()
+        by_id = {f['id']: f for f in data['fields']}
+        self.assertIn(_guest_identifier(self.envelope, 'field', field.id), by_id)
+        self.assertEqual(
+            {f['recipient_id'] for f in data['fields']},
+            {_guest_identifier(self.envelope, 'recipient', r.id) for r in (self.done, self.guest, self.member)},
+        )
+        # Signature des autres destinataires masquée côté invité
+        self.assertTrue(all(f['signature_data'] is None for f in data['fields']))
+
+    def test_sign_page_fixed_queries_with_latest_signature(self):
+        self.client.force_authenticate(user=self.signer)
+        url = reverse('envelopes-sign-page', kwargs={'pk': self.envelope.public_id})
+        self._add_fields(3)
+        small, _ = self._count_queries(self.client.get, url)
+        self._add_fields(30)
+        large, data = self._count_queries(self.client.get, url)
+
+        self.assertEqual(small, large)
+        done_fields = [f for f in data['fields'] if f['recipient_id'] == self.done.id]
+        self.assertTrue(done_fields)
+        self.assertTrue(all(f['signature_data'] == 'new-signature' for f in done_fields))
+        editable = {f['recipient_id'] for f in data['fields'] if f['editable']}
+        self.assertEqual(editable, {self.member.id})
+
+
+class GuestIdentifierMappingTests(APITestCase):
+    def setUp(self):
+        creator = get_user_model().objects.create_user(username='owner', password='p', email='owner@example.com')
+        self.envelope = Envelope.objects.create(title='Mapping', created_by=creator, status='sent')
+        self.recipients = [
+            EnvelopeRecipient.objects.create(envelope=self.envelope, email=f'r{i}@example.com', full_name='R', order=i)
+            for i in range(1, 4)
+        ]
+
+    def _wanted(self, *recipients):
+        return {'recipient': {_guest_identifier(self.envelope, 'recipient', r.id) for r in recipients}}
+
+    def test_reverse_lookup_is_indexed_after_lazy_backfill(self):
+        first = _resolve_guest_identifiers(self.envelope, self._wanted(*self.recipients))
+        self.assertEqual(sorted(first['recipient'].values()), sorted(r.id for r in self.recipients))
+        self.assertEqual(GuestIdentifier.objects.filter(envelope=self.envelope).count(), 3)
+
+        with mock.patch.object(envelope_views, '_guest_lookup_tables') as recompute, \
+                self.assertNumQueries(1):
+            again = _resolve_guest_identifiers(self.envelope, self._wanted(self.recipients[1]))
+        recompute.assert_not_called()
+        self.assertEqual(list(again['recipient'].values()), [self.recipients[1].id])
+
+    def test_new_objects_and_salt_rotation_backfilled_on_miss(self):
+        _resolve_guest_identifiers(self.envelope, self._wanted(self.recipients[0]))
+        late = EnvelopeRecipient.objects.create(envelope=self.envelope, email='late@example.com', full_name='L', order=4)
+        self.assertEqual(
+            list(_resolve_guest_identifiers(self.envelope, self._wanted(late))['recipient'].values()), [late.id]
+        )
+
+        old_wanted = self._wanted(self.recipients[0])
+        with override_settings(SIGNATURE_GUEST_SALT='rotated-salt'):
+            self.assertEqual(_resolve_guest_identifiers(self.envelope, old_wanted), {'recipient': {}})
+            resolved = _resolve_guest_identifiers(self.envelope, self._wanted(self.recipients[0]))
+            self.assertEqual(list(resolved['recipient'].values()), [self.recipients[0].id])
+            fingerprints = set(
+                GuestIdentifier.objects.filter(envelope=self.envelope).values_list('salt_fingerprint', flat=True)
+            )
+            self.assertEqual(fingerprints, {envelope_views._guest_salt_fingerprint()})
+
+    def test_unknown_identifier_does_not_rewrite_current_table(self):
+        _resolve_guest_identifiers(self.envelope, self._wanted(*self.recipients))
+
+        forged = {'recipient': {'0' * 24}}
+        with mock.patch.object(envelope_views, '_backfill_guest_identifiers') as backfill:
+            self.assertEqual(_resolve_guest_identifiers(self.envelope, forged), {})
+        backfill.assert_not_called()
+
+        # Objet supprimé : la table est recalculée une fois, puis de nouveau considérée à jour
+        self.recipients[2].delete()
+        self.assertEqual(_resolve_guest_identifiers(self.envelope, forged), {'recipient': {}})
+        self.assertEqual(GuestIdentifier.objects.filter(envelope=self.envelope).count(), 2)
+        with mock.patch.object(envelope_views, '_backfill_guest_identifiers') as backfill:
+            self.assertEqual(_resolve_guest_identifiers(self.envelope, forged), {})
+        backfill.assert_not_called()
@@ -0,0 +1,383 @@
+# ===============================================
+# signature/tsa.py
+# Client d'horodatage RFC 3161 : pool keep-alive, retries bornés,
+# disjoncteur par backend, bascule entre backends et métriques de latence
+# ===============================================
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from asyncio import to_thread
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import requests
+from asn1crypto import keys, pem, tsp, x509 as asn1x509
+from django.conf import settings
+from pyhanko.sign.timestamps.api import TimeStamper
+from pyhanko.sign.timestamps.common_utils import TimestampRequestError
+from pyhanko.sign.timestamps.dummy_client import DummyTimeStamper
+from pyhanko.sign.timestamps.requests_client import HTTPTimeStamper
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+TSA_CONTENT_TYPE = "application/timestamp-reply"
+
+
+def _abs_path(p) -> str:
+    pp = Path(p)
+    if pp.is_absolute():
+        return str(pp)
+    return str(Path(settings.BASE_DIR) / pp)
+
+
+def _load_der(path) -> bytes:
+    data = Path(_abs_path(path)).read_bytes()
+    if pem.detect(data):
+        _, _, data = pem.unarmor(data)
+    return data
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur simple : ouvert après `threshold` échecs consécutifs, puis une
+    requête d'essai (semi-ouvert) est autorisée au bout de `reset_after` secondes.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 60.0):
+        self.threshold = max(1, int(threshold))
+        self.reset_after = float(reset_after)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+
+
+class TSAMetrics:
+    """Compteurs et latences d'horodatage par backend (lisibles via tsa_stats())."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, float]] = {}
+
+    def record(self, backend: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            d = self._data.setdefault(
+                backend,
+                {"requests": 0, "failures": 0, "total_seconds": 0.0, "last_seconds": 0.0, "max_seconds": 0.0},
+            )
+            d["requests"] += 1
+            if not ok:
+                d["failures"] += 1
+            d["total_seconds"] += seconds
+            d["last_seconds"] = seconds
+            d["max_seconds"] = max(d["max_seconds"], seconds)
+        logger.info("TSA %s: %s en %.0f ms", backend, "ok" if ok else "échec", seconds * 1000)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            out = {}
+            for name, d in self._data.items():
+                avg = d["total_seconds"] / d["requests"] if d["requests"] else 0.0
+                out[name] = {**d, "avg_seconds": avg}
+            return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_metrics = TSAMetrics()
+
+
+class PooledHTTPTimeStamper(HTTPTimeStamper):
+    """
+    HTTPTimeStamper sur une requests.Session partagée (connexions keep-alive poolées),
+    avec timeouts (connexion, lecture) distincts et retries bornés sur erreurs réseau / 5xx.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        pool_size: int = 10,
+        auth=None,
+        headers=None,
+    ):
+        super().__init__(url, timeout=(connect_timeout, read_timeout), auth=auth, headers=headers)
+        self.retries = max(0, int(retries))
+        self.backoff = float(backoff)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _post(self, req: tsp.TimeStampReq) -> tsp.TimeStampResp:
+        body = req.dump()
+        last_exc: Exception | None = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            try:
+                raw_res = self.session.post(
+                    self.url, body, headers=self.request_headers(), auth=self.auth, timeout=self.timeout
+                )
+            except IOError as e:
+                last_exc = e
+                continue
+            if raw_res.status_code >= 500:
+                last_exc = TimestampRequestError(f"Serveur d'horodatage en erreur ({raw_res.status_code})", raw_res)
+                continue
+            if raw_res.headers.get("Content-Type") != TSA_CONTENT_TYPE:
+                raise TimestampRequestError("Timestamp server response is malformed.", raw_res)
+            return tsp.TimeStampResp.load(raw_res.content)
+        raise TimestampRequestError("Error in communication with timestamp server") from last_exc
+
+    async def async_request_tsa_response(self, req: tsp.TimeStampReq) -> tsp.TimeStampResp:
+        return await to_thread(self._post, req)
+
+
+class LocalTimeStamper(DummyTimeStamper):
+    """TSA RFC 3161 en process (dev / tests / secours) signant avec un certificat local."""
+
+    @classmethod
+    def from_files(cls, cert_file, key_file) -> "LocalTimeStamper":
+        cert = asn1x509.Certificate.load(_load_der(cert_file))
+        key = keys.PrivateKeyInfo.load(_load_der(key_file))
+        return cls(tsa_cert=cert, tsa_key=key)
+
+
+class FailoverTimeStamper(TimeStamper):
+    """
+    Essaie les backends dans l'ordre, en sautant ceux dont le disjoncteur est ouvert.
+    Une seule instance par process : le cache de réponses « dummy » de pyHanko
+    (estimation de taille) est ainsi partagé au lieu d'être refait à chaque signature.
+    """
+
+    def __init__(self, backends: List[Tuple[str, TimeStamper]], *, breaker_threshold: int = 5,
+                 breaker_reset: float = 60.0):
+        super().__init__()
+        self.backends = [
+            (name, backend, CircuitBreaker(breaker_threshold, breaker_reset)) for name, backend in backends
+        ]
+
+    async def async_request_tsa_response(self, req: tsp.TimeStampReq) -> tsp.TimeStampResp:
+        last_exc: Exception | None = None
+        for name, backend, breaker in self.backends:
+            if not breaker.allow():
+                logger.warning("TSA %s: disjoncteur ouvert, backend ignoré", name)
+                continue
+            t0 = time.monotonic()
+            # Toute issue de l'appel clôt l'essai semi-ouvert (succès ou échec), sinon
+            # le disjoncteur resterait bloqué avec un essai « en cours » pour toujours
+            try:
+                res = await backend.async_request_tsa_response(req)
+            except Exception as e:
+                breaker.record_failure()
+                _metrics.record(name, time.monotonic() - t0, False)
+                logger.warning("TSA %s indisponible: %s", name, e)
+                last_exc = e
+                continue
+            except BaseException:
+                # Annulation / arrêt : pas de bascule, mais l'essai est libéré
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            _metrics.record(name, time.monotonic() - t0, True)
+            return res
+        raise TimestampRequestError("Aucun serveur d'horodatage disponible") from last_exc
+
+
+def _backend_configs() -> list:
+    configured = getattr(settings, "TSA_BACKENDS", None)
+    if configured:
+        return list(configured)
+    return [{"name": "freetsa", "type": "http", "url": settings.FREETSA_URL}]
+
+
+def _build_backend(conf: dict) -> TimeStamper:
+    kind = conf.get("type", "http")
+    if kind == "http":
+        return PooledHTTPTimeStamper(
+            conf["url"],
+            connect_timeout=float(getattr(settings, "TSA_CONNECT_TIMEOUT", 3.0)),
+            read_timeout=float(getattr(settings, "TSA_READ_TIMEOUT", 10.0)),
+            retries=int(getattr(settings, "TSA_RETRIES", 2)),
+            backoff=float(getattr(settings, "TSA_RETRY_BACKOFF", 0.5)),
+            pool_size=int(getattr(settings, "TSA_POOL_SIZE", 10)),
+            auth=tuple(conf["auth"]) if conf.get("auth") else None,
+            headers=conf.get("headers"),
+        )
+    if kind == "local":
+        return LocalTimeStamper.from_files(conf["cert_file"], conf["key_file"])
+    raise ValueError(f"Type de backend TSA inconnu: {kind}")
+
+
+class TimeStamperRegistry:
+    """
+    Timestamper process-wide, reconstruit si les settings TSA_* changent
+    (même principe que KMSClientRegistry).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamper: FailoverTimeStamper | None = None
+        self._fingerprint: str | None = None
+
+    @staticmethod
+    def _current_fingerprint() -> str:
+        return json.dumps(
+            [
+                _backend_configs(),
+                getattr(settings, "TSA_CONNECT_TIMEOUT", 3.0),
+                getattr(settings, "TSA_READ_TIMEOUT", 10.0),
+                getattr(settings, "TSA_RETRIES", 2),
+                getattr(settings, "TSA_RETRY_BACKOFF", 0.5),
+                getattr(settings, "TSA_POOL_SIZE", 10),
+                getattr(settings, "TSA_BREAKER_THRESHOLD", 5),
+                getattr(settings, "TSA_BREAKER_RESET", 60),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    def get(self) -> FailoverTimeStamper:
+        fingerprint = self._current_fingerprint()
+        stamper = self._stamper
+        if stamper is not None and self._fingerprint == fingerprint:
+            return stamper
+        with self._lock:
+            if self._stamper is not None and self._fingerprint == fingerprint:
+                return self._stamper
+            backends = [
+                (conf.get("name") or conf.get("url") or conf.get("type", "tsa"), _build_backend(conf))
+                for conf in _backend_configs()
+            ]
+            self._stamper = FailoverTimeStamper(
+                backends,
+                breaker_threshold=int(getattr(settings, "TSA_BREAKER_THRESHOLD", 5)),
+                breaker_reset=float(getattr(settings, "TSA_BREAKER_RESET", 60)),
+            )
+            self._fingerprint = fingerprint
+            return self._stamper
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._stamper = None
+            self._fingerprint = None
+
+
+_registry = TimeStamperRegistry()
+
+
+def get_timestamper() -> FailoverTimeStamper:
+    return _registry.get()
+
+
+def reset_timestamper() -> None:
+    _registry.invalidate()
+
+
+def tsa_stats() -> Dict[str, Dict[str, float]]:
+    return _metrics.stats()
+
+
+class LocalTSAServer:
+    """
+    Petit serveur HTTP RFC 3161 en process (127.0.0.1, port libre) adossé à LocalTimeStamper.
+    `fail_requests` : nombre de prochaines requêtes à rejeter en 503 (tests de retry/bascule).
+
+        with LocalTSAServer(cert_file, key_file) as server:
+            settings.TSA_BACKENDS = [{"type": "http", "url": server.url}]
+    """
+
+    def __init__(self, cert_file, key_file, host: str = "127.0.0.1", port: int = 0):
+        self.stamper = LocalTimeStamper.from_files(cert_file, key_file)
+        self.fail_requests = 0
+        self.requests = 0
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                server.requests += 1
+                if server.fail_requests > 0:
+                    server.fail_requests -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                res = server.stamper.request_tsa_response(tsp.TimeStampReq.load(body)).dump()
+                self.send_response(200)
+                self.send_header("Content-Type", TSA_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(res)))
+                self.end_headers()
+                self.wfile.write(res)
+
+            def log_message(self, fmt, *args):
+                logger.debug("LocalTSAServer: " + fmt, *args)
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/tsr"
+
+    def start(self) -> "LocalTSAServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -117,3 +117,31 @@ def validate_pdf(file) -> None:
     except Exception as exc:  # pragma: no cover - defensive logging
         logger.error("PDF validation error: %s", exc)
         raise ValidationError("Le fichier PDF est corrompu ou invalide.")
+
+
+def pdf_page_geometry(data: bytes) -> dict:
+    """
+    Index de géométrie d'un PDF, calculé une seule fois à l'upload :
+    {"page_count": n, "pages": [{"mediabox": [x0, y0, x1, y1], "cropbox": [...]}, ...]}
+    Retourne {} si le contenu n'est pas un PDF lisible (best-effort).
+    """
+    if not data or not data.startswith(b"%PDF-"):
+        return {}
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        pages = []
+        for page in reader.pages:
+            pages.append({
+                "mediabox": [float(v) for v in page.mediabox],
+                "cropbox": [float(v) for v in page.cropbox],
+            })
+    except Exception as exc:
+        logger.warning("Impossible d'indexer la géométrie du PDF (taille=%s): %s", len(data), exc)
+        return {}
+    return {"page_count": len(pages), "pages": pages}
+
+
+def page_size(geometry: dict, page_ix: int) -> tuple[float, float]:
+    """(largeur, hauteur) de la MediaBox d'une page de l'index de géométrie."""
+    x0, y0, x1, y1 = geometry["pages"][page_ix]["mediabox"]
+    return x1 - x0, y1 - y0
@@ -29,6 +29,7 @@ from ..serializers import (
     ChangePasswordSerializer,
 )
 from ..email_utils import EmailTemplates
+from ..mailer import request_retries
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -121,7 +122,7 @@ def register(request):
         
         # Utiliser le nouveau template d'email
         try:
-            EmailTemplates.activation_email(user, activation_link)
+            EmailTemplates.activation_email(user, activation_link, retries=request_retries())
             return Response(
                 {'detail': 'Inscription réussie. Vérifiez votre e-mail pour activer votre compte.'},
                 status=status.HTTP_201_CREATED,
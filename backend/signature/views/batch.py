@@ -7,90 +7,21 @@ from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUpload
 from django.utils import timezone
 from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils.text import get_valid_filename
 import json, base64, io, qrcode
 
-from ..tasks import process_batch_sign_job
+from ..tasks import process_batch_sign_job, iter_batch_zip, _paste_signature_on_pdf  # calque incrémental partagé
 from ..models import BatchSignJob, BatchSignItem, EnvelopeDocument, EnvelopeRecipient, PrintQRCode, SavedSignature, Envelope, SignatureDocument, PrintQRCode
 from ..serializers import BatchSignJobSerializer
 from ..crypto_utils import sign_pdf_bytes, compute_hashes, extract_signer_certificate_info  # util commun
+from ..qr_stamp import stamp_qr_all_pages
+from ..signature_image import prepare_signature
 from django.conf import settings
 # === Helpers d'implémentation exportés pour tasks.py =========================
-from PIL import Image, UnidentifiedImageError
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 
 
-def _paste_signature_on_pdf(pdf_bytes: bytes, sig_img_bytes: bytes, placements: list) -> bytes:
-    """
-    Appose l'image de signature aux positions indiquées (page,x,y,width,height)
-    - x,y,width,height : valeurs relatives (0-1) mesurées depuis le HAUT-GAUCHE de la CropBox dans le front.
-    - Conversion ici vers repère PDF (bas-gauche) + offset CropBox.
-    Retourne un PDF bytes (non signé crypto).
-    """
-    base_reader = PdfReader(io.BytesIO(pdf_bytes))
-    out = PdfWriter()
-
-    # image
-    sig_img = Image.open(io.BytesIO(sig_img_bytes)).convert("RGBA")
-    sig_reader = ImageReader(sig_img)
-
-    # indexer placements par page (1-based)
-    by_page = {}
-    for p in placements:
-        page_no = int(p["page"])
-        by_page.setdefault(page_no, []).append({
-            "x": float(p["x"]),
-            "y": float(p["y"]),
-            "width": float(p["width"]),
-            "height": float(p["height"]),
-        })
-
-    for page_num in range(1, len(base_reader.pages) + 1):
-        page = base_reader.pages[page_num - 1]
-        crop = getattr(page, "cropbox", None) or page.mediabox
-        crop_llx = float(crop.left)
-        crop_lly = float(crop.bottom)
-        crop_urx = float(crop.right)
-        crop_ury = float(crop.top)
-        page_w = crop_urx - crop_llx
-        page_h = crop_ury - crop_lly
-
-        overlay_buf = io.BytesIO()
-        c = canvas.Canvas(overlay_buf, pagesize=(page_w, page_h))
-
-        for pl in by_page.get(page_num, []):
-            # valeurs relatives → points PDF
-            x_ui = pl["x"] * page_w
-            y_ui = pl["y"] * page_h
-            w = pl["width"] * page_w
-            h = pl["height"] * page_h
-
-            # front en haut-gauche → PDF en bas-gauche
-            x_pdf = crop_llx + x_ui
-            y_pdf = crop_lly + (page_h - y_ui - h)
-            c.drawImage(sig_reader, x_pdf, y_pdf, width=w, height=h, mask='auto')
-
-        c.showPage()
-        c.save()
-        overlay_buf.seek(0)
-
-        overlay_reader = PdfReader(overlay_buf)
-        overlay_page = overlay_reader.pages[0]
-
-        # fusionner
-        base_page = page
-        base_page.merge_page(overlay_page)
-        out.add_page(base_page)
-
-    buf = io.BytesIO()
-    out.write(buf)
-    return buf.getvalue()
-
-
 def _crypto_sign_pdf(
     pdf_bytes: bytes,
     field_name: str | None = None,
@@ -106,21 +37,7 @@ def _crypto_sign_pdf(
 
 
 def _add_qr_overlay_all_pages(pdf_bytes: bytes, qr_png_bytes: bytes, size_pt=50, margin_pt=13, y_offset=-5) -> bytes:
-    base_reader = PdfReader(io.BytesIO(pdf_bytes))
-    writer = PdfWriter()
-    for page in base_reader.pages:
-        w = float(page.mediabox.width); h = float(page.mediabox.height)
-        buf = io.BytesIO()
-        c = canvas.Canvas(buf, pagesize=(w, h))
-        x = w - margin_pt - size_pt
-        y = margin_pt + y_offset
-        c.drawImage(ImageReader(io.BytesIO(qr_png_bytes)), x, y, width=size_pt, height=size_pt, mask='auto')
-        c.showPage(); c.save(); buf.seek(0)
-        overlay_pdf = PdfReader(buf)
-        page.merge_page(overlay_pdf.pages[0])
-        writer.add_page(page)
-    out = io.BytesIO(); writer.write(out)
-    return out.getvalue()
+    return stamp_qr_all_pages(pdf_bytes, qr_png_bytes, size_pt=size_pt, margin_pt=margin_pt, y_offset=y_offset)
 
 
 class SelfSignView(APIView):
@@ -183,15 +100,13 @@ class SelfSignView(APIView):
         if not sig_img_bytes:
             return Response({"error": "signature manquante"}, status=400)
 
-        # Normaliser en PNG (élimine WEBP/SVG/HEIC non supportés)
+        # Normaliser en PNG (élimine WEBP/SVG/HEIC non supportés) — préparée une fois
+        # pour le calque reportlab et le tampon pyHanko
         try:
-            im = Image.open(io.BytesIO(sig_img_bytes)).convert("RGBA")
-            out = io.BytesIO()
-            im.save(out, format="PNG")
-            sig_img_bytes = out.getvalue()
-            sig_b64 = base64.b64encode(sig_img_bytes).decode()
-        except UnidentifiedImageError:
+            sig = prepare_signature(sig_img_bytes)
+        except ValueError:
             return Response({"error": "format de signature non supporté"}, status=400)
+        sig_b64 = sig.b64
 
         # 3) PDF source — accepte pdf/document/file, puis files[]/files (1er élément)
         pdf_file = (
@@ -208,7 +123,7 @@ class SelfSignView(APIView):
         pdf_src = pdf_file.read()
 
         # 4) apposer l'image puis signer (PAdES) — 1er scellement
-        stamped = _paste_signature_on_pdf(pdf_src, sig_img_bytes, placements)
+        stamped = _paste_signature_on_pdf(pdf_src, sig, placements)
         signed = _crypto_sign_pdf(
             stamped,
             field_name="SelfSign",
@@ -383,8 +298,14 @@ class BatchSignJobViewSet(viewsets.ReadOnlyModelViewSet):
         job = self.get_object()
         if job.created_by != request.user:
             return Response({"error": "Non autorisé"}, status=403)
-        if not job.result_zip:
-            return Response({"error": "Archive non prête"}, status=400)
+        # Flux à la volée (?stream=1, ou pas d'archive stockée — BATCH_ZIP_STORE=False)
+        wants_stream = request.query_params.get("stream") in ("1", "true")
+        if wants_stream or not job.result_zip:
+            if job.status not in ("completed", "partial"):
+                return Response({"error": "Archive non prête"}, status=400)
+            resp = StreamingHttpResponse(iter_batch_zip(job), content_type="application/zip")
+            resp["Content-Disposition"] = f'attachment; filename="batch_{job.id}.zip"'
+            return resp
         f = job.result_zip
         f.open("rb")
         resp = FileResponse(f, content_type="application/zip")
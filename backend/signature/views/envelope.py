@@ -14,28 +14,36 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django.db import transaction
 from django.http import Http404, FileResponse
+from django.urls import reverse
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.views.decorators.clickjacking import xframe_options_exempt
-from django.db.models import Q
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+from rest_framework.pagination import CursorPagination
 import io,qrcode,logging,jwt,base64,uuid
 from django.conf import settings
-from ..tasks import send_signature_email,send_document_completed_notification,send_signed_pdf_to_all_signers
+from ..tasks import send_signature_email,send_document_completed_notification,send_signed_pdf_to_all_signers,process_signing_job
 from ..otp import generate_otp, validate_otp, send_otp
 from ..hsm import hsm_sign
 from jwt import InvalidTokenError, ExpiredSignatureError
-from ..models import ( Envelope,EnvelopeRecipient,SignatureDocument,PrintQRCode,EnvelopeDocument,)
+from ..models import ( Envelope,EnvelopeRecipient,SignatureDocument,PrintQRCode,EnvelopeDocument,SigningJob,GuestIdentifier,)
 from ..serializers import (EnvelopeSerializer,EnvelopeListSerializer,SigningFieldSerializer,SignatureDocumentSerializer,PrintQRCodeSerializer,)
 from signature.crypto_utils import sign_pdf_bytes,compute_hashes, extract_signer_certificate_info
-from reportlab.pdfgen import canvas
+from signature.pdf_overlay import IncrementalOverlay, fit_box
+from signature.qr_stamp import stamp_qr_all_pages
+from signature.signature_image import prepare_signature
+from signature import qr_verify_cache
 from django.core.files.base import ContentFile
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.lib.utils import ImageReader
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import status
-from ..utils import stream_hash
-import hashlib,hmac
+from ..utils import stream_hash, page_size
+from ..working_base import ensure_working_base, read_working_base
+import hashlib,hmac,json
 
 
 
@@ -49,30 +57,124 @@ logger = logging.getLogger(__name__)
 _GUEST_UNAVAILABLE_STATUSES = {"cancelled", "expired"}
 
 
+def _guest_salt() -> str:
+    return getattr(settings, "SIGNATURE_GUEST_SALT", settings.SECRET_KEY)
+
+
+def _guest_salt_fingerprint() -> str:
+    return hashlib.sha256(b"guest-salt:" + _guest_salt().encode("utf-8")).hexdigest()[:16]
+
+
 def _guest_identifier(envelope: Envelope, kind: str, raw_id) -> str | None:
-    if raw_id in (None, "", "null", "None"):
-        return None
+    return _guest_identifiers(envelope, kind, [raw_id]).get(raw_id)
 
-    secret = getattr(settings, "SIGNATURE_GUEST_SALT", settings.SECRET_KEY)
-    message = f"{kind}:{envelope.public_id}:{raw_id}".encode("utf-8")
-    digest = hmac.new(secret.encode("utf-8"), message, hashlib.sha256).hexdigest()
-    return digest[:24]
+
+def _guest_identifiers(envelope: Envelope, kind: str, raw_ids) -> dict:
+    """
+    {raw_id: identifiant invité} pour plusieurs ids d'un même type : chaque id
+    distinct n'est haché qu'une fois, à partir d'un HMAC dont la clé est
+    préparée une seule fois.
+    """
+    base = hmac.new(_guest_salt().encode("utf-8"), digestmod=hashlib.sha256)
+    prefix = f"{kind}:{envelope.public_id}:"
+    identifiers = {}
+    for raw_id in raw_ids:
+        if raw_id in (None, "", "null", "None") or raw_id in identifiers:
+            continue
+        mac = base.copy()
+        mac.update(f"{prefix}{raw_id}".encode("utf-8"))
+        identifiers[raw_id] = mac.hexdigest()[:24]
+    return identifiers
+
+
+_GUEST_RELATIONS = {"recipient": "recipients", "document": "documents", "field": "fields"}
 
 
 def _guest_lookup_tables(envelope: Envelope) -> dict[str, dict[str, int]]:
     return {
-        "recipient": {
-            _guest_identifier(envelope, "recipient", rec.id): rec.id
-            for rec in envelope.recipients.all()
-        },
-        "document": {
-            _guest_identifier(envelope, "document", doc.id): doc.id
-            for doc in envelope.documents.all()
-        },
-        "field": {
-            _guest_identifier(envelope, "field", field.id): field.id
-            for field in envelope.fields.all()
-        },
+        kind: {
+            ident: raw_id
+            for raw_id, ident in _guest_identifiers(
+                envelope, kind, getattr(envelope, relation).values_list("id", flat=True)
+            ).items()
+        }
+        for kind, relation in _GUEST_RELATIONS.items()
+    }
+
+
+def _guest_tables_current(envelope: Envelope, fingerprint: str) -> bool:
+    """
+    Les lignes GuestIdentifier du sel courant couvrent-elles exactement les objets
+    de l'enveloppe ? Comparaison (nombre, id max) par type : un objet ajouté a un id
+    plus grand, un objet supprimé change le nombre.
+    """
+    stored = {
+        kind: (count, top)
+        for kind, count, top in (
+            GuestIdentifier.objects
+            .filter(envelope=envelope, salt_fingerprint=fingerprint)
+            .values("kind")
+            .annotate(count=Count("id"), top=Max("raw_id"))
+            .values_list("kind", "count", "top")
+        )
+    }
+    for kind, relation in _GUEST_RELATIONS.items():
+        live = getattr(envelope, relation).aggregate(count=Count("id"), top=Max("id"))
+        if stored.get(kind, (0, None)) != (live["count"], live["top"]):
+            return False
+    return True
+
+
+def _backfill_guest_identifiers(envelope: Envelope, fingerprint: str) -> dict[str, dict[str, int]]:
+    """Recalcule toutes les correspondances de l'enveloppe (ancien sel, objets supprimés inclus)."""
+    tables = _guest_lookup_tables(envelope)
+    GuestIdentifier.objects.filter(envelope=envelope).delete()
+    GuestIdentifier.objects.bulk_create(
+        [
+            GuestIdentifier(
+                envelope=envelope, kind=kind, opaque_id=opaque_id, raw_id=raw_id, salt_fingerprint=fingerprint
+            )
+            for kind, table in tables.items()
+            for opaque_id, raw_id in table.items()
+        ],
+        ignore_conflicts=True,
+    )
+    return tables
+
+
+def _resolve_guest_identifiers(envelope: Envelope, wanted: dict[str, set]) -> dict[str, dict[str, int]]:
+    """
+    Résolution inverse {type: {identifiant opaque: id réel}} en une requête
+    indexée sur GuestIdentifier. Si un identifiant manque et que la table n'est
+    plus à jour (sel changé, objet ajouté ou supprimé, jamais résolue), elle est
+    recalculée une fois (backfill paresseux) ; sinon l'identifiant est inconnu et
+    simplement absent, sans aucune écriture.
+    """
+    wanted = {kind: {str(v) for v in values} for kind, values in wanted.items() if values}
+    if not wanted:
+        return {}
+    fingerprint = _guest_salt_fingerprint()
+    query = Q()
+    for kind, values in wanted.items():
+        query |= Q(kind=kind, opaque_id__in=values)
+    resolved: dict[str, dict[str, int]] = {}
+    rows = (
+        GuestIdentifier.objects
+        .filter(query, envelope=envelope, salt_fingerprint=fingerprint)
+        .values_list('kind', 'opaque_id', 'raw_id')
+    )
+    for kind, opaque_id, raw_id in rows:
+        resolved.setdefault(kind, {})[opaque_id] = raw_id
+    if all(values <= resolved.get(kind, {}).keys() for kind, values in wanted.items()):
+        return resolved
+    if _guest_tables_current(envelope, fingerprint):
+        # Identifiant forgé ou périmé : pas de recalcul à chaque requête
+        return resolved
+
+    tables = _backfill_guest_identifiers(envelope, fingerprint)
+    return {
+        kind: {v: tables[kind][v] for v in values if v in tables.get(kind, {})}
+        for kind, values in wanted.items()
     }
 
 
@@ -185,15 +287,17 @@ def guest_envelope_view(request, public_id):
         guest=True,
     )
 
+    docs = list(envelope.documents.all())
+    doc_ids = _guest_identifiers(envelope, 'document', [doc.id for doc in docs])
     documents = [
         {
-            'id': _guest_identifier(envelope, 'document', doc.id),
+            'id': doc_ids[doc.id],
             'name': doc.name,
             'file_type': doc.file_type,
             'file_size': doc.file_size,
             'version': doc.version,
         }
-        for doc in envelope.documents.all()
+        for doc in docs
     ]
 
     payload = {
@@ -214,13 +318,104 @@ def guest_envelope_view(request, public_id):
 
     return Response(payload)
 
+class _RangeReader:
+    """Lecteur borné sur [start, start+length) d'un fichier déchiffré (corps d'une réponse 206)."""
+
+    def __init__(self, fh, start: int, length: int):
+        self._fh = fh
+        self._remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fh.close()
+
+
+def _pdf_etag(file_field, size: int | None) -> str | None:
+    """ETag faible coût : nom stocké + mtime du blob chiffré + taille en clair (aucun déchiffrement)."""
+    try:
+        mtime = file_field.storage.get_modified_time(file_field.name).timestamp()
+    except Exception:
+        return None
+    raw = f"{file_field.name}:{mtime}:{size}".encode("utf-8")
+    return '"%s"' % hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _requested_range(request, size: int | None, etag: str | None):
+    """
+    Interprète l'en-tête Range (une seule plage `bytes=`).
+    Retourne None (réponse complète), (start, end) inclusifs, ou "unsatisfiable".
+    If-Range non concordant => réponse complète.
+    """
+    header = (request.META.get("HTTP_RANGE") or "").strip() if request is not None else ""
+    if not header or size is None:
+        return None
+    if_range = (request.META.get("HTTP_IF_RANGE") or "").strip()
+    if if_range and if_range != etag:
+        return None
+
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # plages multiples non gérées : on renvoie le document complet (autorisé par la RFC 9110)
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                return "unsatisfiable"
+            start, end = max(0, size - suffix), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return "unsatisfiable"
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
 def _safe_filename(name: str) -> str:
     base = (name or "document").replace('"', "").strip() or "document"
     if not base.lower().endswith(".pdf"):
         base += ".pdf"
     return base
 
-    
+
+
+def _recipient_count(**filters):
+    """Nombre de destinataires de l'enveloppe courante (sous-requête scalaire, sans GROUP BY)."""
+    counts = (
+        EnvelopeRecipient.objects
+        .filter(envelope=OuterRef('pk'), **filters)
+        .order_by()
+        .values('envelope')
+        .annotate(n=Count('pk'))
+        .values('n')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class EnvelopeListPagination(CursorPagination):
+    """Pagination par curseur du mode liste (?view=list) : coût constant quelle que soit la page."""
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'ENVELOPE_LIST_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
 class EnvelopeViewSet(viewsets.ModelViewSet):
     serializer_class = EnvelopeSerializer
     permission_classes = [IsAuthenticated]
@@ -242,13 +437,21 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         return super().get_object()
 
     # ---------- Queryset & pages ----------
+    def _recipient_filter(self, user, **recipient_q):
+        """
+        Enveloppes où `user` est destinataire (compte lié, ou invité sur son email),
+        en semi-jointures (pk IN sous-requête) : pas de jointure sur les
+        destinataires ni de DISTINCT. Deux sous-requêtes pour rester sur les index
+        (user, signed) et (email, signed) de EnvelopeRecipient ; contrairement à un
+        EXISTS corrélé, SQLite les pilote aussi depuis ces index.
+        """
+        by_user = EnvelopeRecipient.objects.filter(user=user, **recipient_q).values('envelope_id')
+        by_email = EnvelopeRecipient.objects.filter(user__isnull=True, email=user.email, **recipient_q).values('envelope_id')
+        return Q(pk__in=by_user) | Q(pk__in=by_email)
+
     def get_queryset(self):
         user = self.request.user
         status_q = self.request.query_params.get('status')
-        recipient_filter = (
-            Q(recipients__user=user) |
-            (Q(recipients__user__isnull=True) & Q(recipients__email=user.email))
-        )
 
         # 1) Brouillons / annulées (créateur)
         if status_q in ['draft', 'cancelled']:
@@ -267,23 +470,41 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             return (
                 Envelope.objects
                 .filter(status__in=['sent', 'pending'])
-                .filter(recipient_filter & Q(recipients__signed=False))
-            ).distinct().order_by('-created_at')
+                .filter(self._recipient_filter(user, signed=False))
+            ).order_by('-created_at')
 
         # 4) Complétées : créateur + destinataires ayant signé
         if status_q == 'completed':
             return (
                 Envelope.objects.filter(status='completed')
-                .filter(
-                    Q(created_by=user) | (recipient_filter & Q(recipients__signed=True))
-                )
-            ).distinct().order_by('-created_at')
+                .filter(Q(created_by=user) | self._recipient_filter(user, signed=True))
+            ).order_by('-created_at')
 
         # 5) Page “Documents” (tout : créateur + destinataires)
         return (
             Envelope.objects
-            .filter(Q(created_by=user) | recipient_filter)
-        ).distinct().order_by('-created_at')
+            .filter(Q(created_by=user) | self._recipient_filter(user))
+        ).order_by('-created_at')
+
+    def _list_queryset(self):
+        return (
+            self.filter_queryset(self.get_queryset())
+            .select_related('created_by')
+            .annotate(
+                recipients_count=_recipient_count(),
+                signed_count=_recipient_count(signed=True),
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        # ?view=list : tableau de bord allégé (EnvelopeListSerializer, compteurs annotés,
+        # pagination par curseur). Sans ce paramètre, la réponse historique est inchangée.
+        if request.query_params.get('view') != 'list':
+            return super().list(request, *args, **kwargs)
+        paginator = EnvelopeListPagination()
+        page = paginator.paginate_queryset(self._list_queryset(), request, view=self)
+        serializer = EnvelopeListSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
 
     # -------------------- Helpers internes --------------------
     def _get_token(self, request) -> str | None:
@@ -337,30 +558,49 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             )
         return None
 
-    def _delete_envelope_files(self, envelope: Envelope) -> None:
-        files_to_delete = []
-
-        if envelope.document_file and envelope.document_file.name:
-            files_to_delete.append(envelope.document_file)
-
-        for doc in envelope.documents.all():
-            if doc.file and doc.file.name:
-                files_to_delete.append(doc.file)
-
-        for signature in envelope.signatures.all():
-            if signature.signed_file and signature.signed_file.name:
-                files_to_delete.append(signature.signed_file)
-
-        for field_file in files_to_delete:
-            try:
-                field_file.delete(save=False)
-            except FileNotFoundError:
-                continue
-
     @staticmethod
-    def _serve_pdf(file_field, filename: str, inline: bool = True):
-        fh = file_field.storage.open(file_field.name, "rb")
-        resp = FileResponse(fh, content_type="application/pdf")
+    def _serve_pdf(file_field, filename: str, inline: bool = True, request=None):
+        """
+        Sert un PDF déchiffré à la volée.
+        Avec `request` : ETag + If-None-Match (304) et requêtes Range / If-Range (206),
+        pour que pdf.js charge les pages progressivement sans tout déchiffrer.
+        """
+        storage = file_field.storage
+        try:
+            size = storage.size(file_field.name)
+        except Exception:
+            size = None
+        etag = _pdf_etag(file_field, size)
+
+        if request is not None and etag:
+            if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                resp = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                resp["ETag"] = etag
+                resp["Accept-Ranges"] = "bytes"
+                return resp
+
+        byte_range = _requested_range(request, size, etag)
+        if byte_range == "unsatisfiable":
+            resp = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            resp["Content-Range"] = f"bytes */{size}"
+            resp["Accept-Ranges"] = "bytes"
+            return resp
+
+        fh = storage.open(file_field.name, "rb")
+        if byte_range:
+            start, end = byte_range
+            length = end - start + 1
+            resp = FileResponse(
+                _RangeReader(fh, start, length),
+                content_type="application/pdf",
+                status=status.HTTP_206_PARTIAL_CONTENT,
+            )
+            resp["Content-Length"] = str(length)
+            resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            resp = FileResponse(fh, content_type="application/pdf")
+
         disp = "inline" if inline else "attachment"
         safe_name = get_valid_filename(filename)
         resp["Content-Disposition"] = f'{disp}; filename="{safe_name}"; filename*=UTF-8\'\'{safe_name}'
@@ -370,8 +610,28 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         resp["Cache-Control"] = "no-store"
         resp["Pragma"] = "no-cache"
         resp["Expires"] = "0"
+        resp["Accept-Ranges"] = "bytes"
+        if etag:
+            resp["ETag"] = etag
         return resp
 
+    def _latest_signature_data(self, envelope: Envelope, recipient_ids) -> dict:
+        """signature_data de la dernière SignatureDocument de chaque destinataire, en une requête."""
+        if not recipient_ids:
+            return {}
+        latest = (
+            SignatureDocument.objects
+            .filter(envelope=envelope, recipient_id__in=recipient_ids)
+            .annotate(rank=Window(
+                RowNumber(),
+                partition_by=F('recipient_id'),
+                order_by=[F('signed_at').desc(), F('id').desc()],
+            ))
+            .filter(rank=1)
+            .values_list('recipient_id', 'signature_data')
+        )
+        return dict(latest)
+
     def _build_fields_payload(
         self,
         envelope: Envelope,
@@ -379,35 +639,33 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         *,
         guest: bool = False,
     ):
+        # Nombre de requêtes fixe : champs (+ destinataire, document) puis dernières signatures
+        field_objs = list(envelope.fields.select_related('recipient', 'document'))
+        signatures = self._latest_signature_data(
+            envelope, {f.recipient_id for f in field_objs if f.recipient.signed}
+        )
+        if guest:
+            guest_ids = {
+                'field': _guest_identifiers(envelope, 'field', [f.id for f in field_objs]),
+                'recipient': _guest_identifiers(envelope, 'recipient', [f.recipient_id for f in field_objs]),
+                'document': _guest_identifiers(envelope, 'document', [f.document_id for f in field_objs]),
+            }
+
         fields = []
-        for f in envelope.fields.all():
+        for f in field_objs:
             fld = SigningFieldSerializer(f).data
             assigned: EnvelopeRecipient = f.recipient
 
             # statut + last signature_data si signé
             fld['signed'] = assigned.signed
-            if assigned.signed:
-                sig_doc = (
-                    SignatureDocument.objects
-                    .filter(envelope=envelope, recipient=assigned)
-                    .order_by('-signed_at')
-                    .first()
-                )
-                fld['signature_data'] = sig_doc.signature_data if sig_doc else None
-            else:
-                fld['signature_data'] = None
+            fld['signature_data'] = signatures.get(assigned.id) if assigned.signed else None
 
             fld['editable'] = (current_recipient_id is not None and assigned.id == current_recipient_id and not assigned.signed)
 
             if guest:
-                fld['id'] = _guest_identifier(envelope, 'field', f.id)
-                fld['recipient_id'] = _guest_identifier(envelope, 'recipient', assigned.id)
-                document_identifier = fld.get('document_id')
-                fld['document_id'] = (
-                    _guest_identifier(envelope, 'document', document_identifier)
-                    if document_identifier
-                    else None
-                )
+                fld['id'] = guest_ids['field'][f.id]
+                fld['recipient_id'] = guest_ids['recipient'][assigned.id]
+                fld['document_id'] = guest_ids['document'].get(fld.get('document_id'))
                 if assigned.id != current_recipient_id:
                     fld['signature_data'] = None
                 fld.pop('recipient_real_id', None)
@@ -508,6 +766,12 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         envelope.save()
         envelope.save(update_fields=['include_qr_code', 'deadline_at', 'status'])
 
+        # Matérialiser la base de travail dès l'envoi (sinon construite au premier signataire)
+        try:
+            ensure_working_base(envelope)
+        except Exception:
+            logger.exception("Construction de la base de travail impossible pour l'enveloppe %s", envelope.id)
+
         # Planification des rappels & envoi au(x) premier(s)
         self._reset_reminders_and_notify(envelope)
 
@@ -564,7 +828,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        self._delete_envelope_files(envelope)
+        envelope.delete_stored_files()
         envelope.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -716,7 +980,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Document introuvable'}, status=404)
 
         filename = doc.name or f"document_{doc.id}.pdf"
-        return EnvelopeViewSet._serve_pdf(doc.file, filename)
+        return EnvelopeViewSet._serve_pdf(doc.file, filename, request=request)
 
     @action(detail=True, methods=['get'], url_path='original-document')
     @method_decorator(xframe_options_exempt, name='dispatch')
@@ -737,7 +1001,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             if not doc:
                 return Response({'error': 'Pas de document original'}, status=status.HTTP_404_NOT_FOUND)
             filename = f"{envelope.title}.pdf"
-            return EnvelopeViewSet._serve_pdf(doc, filename, inline=True)
+            return EnvelopeViewSet._serve_pdf(doc, filename, inline=True, request=request)
         except Exception as e:
             return Response({'error': f'Échec d\'ouverture du fichier : {e}'}, status=500)
 
@@ -811,7 +1075,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         #     if not is_valid:
         #         return Response({'error': 'OTP invalide'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return self._do_sign(envelope, recipient, signature_data, signed_fields)
+        return self._start_sign(envelope, recipient, signature_data, signed_fields)
 
     @action(detail=True, methods=['post'], url_path='sign_authenticated')
     def sign_authenticated(self, request, pk=None):
@@ -825,7 +1089,9 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         except EnvelopeRecipient.DoesNotExist:
             return Response({"detail": "Aucun destinataire correspondant."}, status=status.HTTP_403_FORBIDDEN)
 
-        self._do_sign(envelope, recipient, signature_data, signed_fields)
+        response = self._start_sign(envelope, recipient, signature_data, signed_fields)
+        if response.status_code == status.HTTP_202_ACCEPTED:
+            return response
         return Response({"detail": "Document signé avec succès."}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -857,20 +1123,95 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
         pin = request.data.get('pin')
         try:
             signature = hsm_sign(recipient, pin)
-            return self._do_sign(envelope, recipient, signature, request.data.get('signed_fields', {}))
+            return self._start_sign(envelope, recipient, signature, request.data.get('signed_fields', {}))
         except Exception as e:
             return Response({'error': f'Erreur HSM : {e}'}, status=status.HTTP_400_BAD_REQUEST)
 
         # ---------- Cœur de signature ----------
-    def _do_sign(self, envelope, recipient, signature_data, signed_fields):
+    def _sign_context(self) -> dict:
+        """Contexte HTTP utile au cœur de signature (sérialisable pour la file asynchrone)."""
+        request = self.request
+        user = getattr(request, "user", None)
+        return {
+            "signer_id": user.pk if user is not None and user.is_authenticated else None,
+            "ip_address": request.META.get("REMOTE_ADDR"),
+            "user_agent": request.META.get("HTTP_USER_AGENT", ""),
+            "base_url": request.build_absolute_uri("/").rstrip("/"),
+        }
+
+    def _start_sign(self, envelope, recipient, signature_data, signed_fields):
+        """
+        Signature synchrone (défaut) ou, si SIGNATURE_ASYNC, mise en file sur la file de
+        signature : réponse 202 + job id, suivi via sign-jobs/<job_id>.
+        """
+        if not getattr(settings, "SIGNATURE_ASYNC", False):
+            return self._do_sign(envelope, recipient, signature_data, signed_fields)
+
+        job = (
+            SigningJob.objects
+            .filter(recipient=recipient, status__in=["queued", "running"])
+            .order_by("-created_at")
+            .first()
+        )
+        if job is None:
+            job = SigningJob.objects.create(
+                envelope=envelope,
+                recipient=recipient,
+                signature_data=signature_data,
+                signed_fields=signed_fields,
+                context=self._sign_context(),
+            )
+            job_id = str(job.id)
+            transaction.on_commit(lambda: process_signing_job.delay(job_id))
+        return Response(
+            {
+                'status': job.status,
+                'job_id': str(job.id),
+                'status_url': self.request.build_absolute_uri(
+                    reverse('envelopes-sign-job', kwargs={'pk': envelope.public_id, 'job_id': job.id})
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(detail=True, methods=['get'], url_path=r'sign-jobs/(?P<job_id>[0-9a-f-]+)',
+            url_name='sign-job', permission_classes=[permissions.AllowAny])
+    def sign_job(self, request, pk=None, job_id=None):
+        """Statut d'une signature asynchrone (l'identifiant aléatoire du job fait office de jeton)."""
+        try:
+            envelope = _get_envelope_by_identifier(pk)
+            job = SigningJob.objects.get(pk=job_id, envelope=envelope)
+        except (Envelope.DoesNotExist, SigningJob.DoesNotExist, ValueError, ValidationError):
+            return Response({'error': 'Job introuvable'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({
+            'job_id': str(job.id),
+            'status': job.status,
+            'error': job.error if job.status == 'failed' else '',
+            'signature_document': job.signature_document_id,
+            'finished_at': job.finished_at,
+        })
+
+    def _do_sign(self, envelope, recipient, signature_data, signed_fields, context=None):
+        context = context or self._sign_context()
         # 1) Trouver TOUS les champs de CE destinataire
-        guest_lookup_cache = None
+        def _opaque(value) -> str | None:
+            """Identifiant invité (non entier) à résoudre, sinon None."""
+            if value in (None, "", "null", "None") or isinstance(value, int):
+                return None
+            try:
+                int(value)
+            except (TypeError, ValueError):
+                return str(value)
+            return None
 
-        def _ensure_guest_tables() -> dict[str, dict[str, int]]:
-            nonlocal guest_lookup_cache
-            if guest_lookup_cache is None:
-                guest_lookup_cache = _guest_lookup_tables(envelope)
-            return guest_lookup_cache
+        # Identifiants opaques des invités résolus en une seule requête (GuestIdentifier)
+        metas = [meta for meta in (signed_fields or {}).values() if meta]
+        guest_tables = _resolve_guest_identifiers(envelope, {
+            'recipient': {
+                v for v in (_opaque(m.get('recipient_id') or m.get('assigned_recipient_id')) for m in metas) if v
+            },
+            'document': {v for v in (_opaque(m.get('document_id')) for m in metas) if v},
+        })
 
         def _coerce_recipient_identifier(value) -> int | None:
             if value in (None, ""):
@@ -880,8 +1221,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             try:
                 return int(value)
             except (TypeError, ValueError):
-                tables = _ensure_guest_tables()
-                return tables.get('recipient', {}).get(str(value))
+                return guest_tables.get('recipient', {}).get(str(value))
 
         def _coerce_document_identifier(value) -> int | None:
             if value in (None, "", "null", "None"):
@@ -891,8 +1231,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             try:
                 return int(value)
             except (TypeError, ValueError):
-                tables = _ensure_guest_tables()
-                return tables.get('document', {}).get(str(value))
+                return guest_tables.get('document', {}).get(str(value))
 
         def _normalize_meta(meta):
             if not meta:
@@ -945,64 +1284,15 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             doc_key = _normalize_doc_id(meta.get('document_id'))
             fields_by_doc.setdefault(doc_key, []).append(meta)
 
-        # Préparer les documents disponibles (ordre = document principal puis annexes)
-        doc_order: list[int | None] = []
-        doc_sources: dict[int | None, bytes] = {}
-        doc_page_counts: dict[int | None, int] = {}
-
-        def _read_file_bytes(field_file):
-            if not field_file or not getattr(field_file, 'name', ''):
-                return b''
-            storage = getattr(field_file, 'storage', None)
-            try:
-                if storage:
-                    with storage.open(field_file.name, 'rb') as fh:
-                        return fh.read()
-                with field_file.open('rb') as fh:  # fallback
-                    return fh.read()
-            except Exception:
-                logger.exception("Impossible de lire le fichier %s", getattr(field_file, 'name', ''))
-                return b''
+        # 2) Base de travail de l'enveloppe : concaténation des originaux construite une
+        #    seule fois (à l'envoi ou ici sous verrou), avec ordre / offsets / géométrie.
+        layout = ensure_working_base(envelope)
+        doc_order: list[int | None] = list(layout['order'])
+        doc_offsets: dict[int | None, int] = dict(zip(doc_order, layout['offsets']))
+        base_geometry = {'pages': layout['pages']}
+        total_pages = len(base_geometry['pages'])
 
-        def _count_pdf_pages(data: bytes) -> int:
-            if not data:
-                return 0
-            try:
-                return len(PdfReader(io.BytesIO(data)).pages)
-            except Exception:
-                logger.warning("Impossible de compter les pages du document (taille=%s)", len(data))
-                return 0
-
-        if envelope.document_file and getattr(envelope.document_file, 'name', ''):
-            doc_order.append(None)
-            data = _read_file_bytes(envelope.document_file)
-            doc_sources[None] = data
-            doc_page_counts[None] = _count_pdf_pages(data)
-
-        for doc in envelope.documents.order_by('id'):
-            doc_order.append(doc.id)
-            data = _read_file_bytes(doc.file)
-            doc_sources[doc.id] = data
-            doc_page_counts[doc.id] = _count_pdf_pages(data)
-
-        # Ajouter les éventuels documents référencés dans signed_fields mais absents (sécurité)
-        for doc_key in list(fields_by_doc.keys()):
-            if doc_key in doc_sources or doc_key is None:
-                continue
-            try:
-                extra_doc = envelope.documents.get(id=doc_key)
-            except EnvelopeDocument.DoesNotExist:
-                logger.warning("document_id %s introuvable dans l'enveloppe %s", doc_key, envelope.id)
-                continue
-            doc_order.append(doc_key)
-            data = _read_file_bytes(extra_doc.file)
-            doc_sources[doc_key] = data
-            doc_page_counts[doc_key] = _count_pdf_pages(data)
-
-        if not doc_order:
-            raise ValueError("Pas de document original")
-
-        # 2) Choisir la base PDF : dernier signé sinon concat des originaux
+        # Point de départ : dernier PDF signé, sinon la base de travail
         latest = (
             SignatureDocument.objects
             .filter(envelope=envelope, signed_file__isnull=False)
@@ -1014,56 +1304,18 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                 base_bytes = bf.read()
             logger.info(f"_do_sign: base = dernier PDF signé (SignatureDocument {latest.id})")
         else:
-            if len(doc_order) == 1:
-                base_bytes = doc_sources.get(doc_order[0])
-            else:
-                writer = PdfWriter()
-                for doc_key in doc_order:
-                    data = doc_sources.get(doc_key)
-                    if not data:
-                        continue
-                    try:
-                        reader = PdfReader(io.BytesIO(data))
-                    except Exception:
-                        logger.warning("Impossible de lire le document %s pour concaténation", doc_key)
-                        continue
-                    for page in reader.pages:
-                        writer.add_page(page)
-                buffer = io.BytesIO()
-                writer.write(buffer)
-                base_bytes = buffer.getvalue()
-            if not base_bytes:
-                raise ValueError("Pas de document original")
-            logger.info("_do_sign: base = concaténation des documents originaux")
-
-        base_reader = PdfReader(io.BytesIO(base_bytes))
-        total_pages = len(base_reader.pages)
-        expected_pages = sum(doc_page_counts.get(doc_key, 0) for doc_key in doc_order)
-        if doc_order and expected_pages and expected_pages != total_pages:
-            logger.warning(
-                "_do_sign: nombre de pages attendu (%s) différent du PDF base (%s) pour envelope %s",
-                expected_pages,
-                total_pages,
-                envelope.id,
-            )
-            if expected_pages < total_pages:
-                last_key = doc_order[-1]
-                doc_page_counts[last_key] = doc_page_counts.get(last_key, 0) + (total_pages - expected_pages)
-            total_pages = len(PdfReader(io.BytesIO(base_bytes)).pages)
-
-        # Calculer les offsets de page pour chaque document
-        doc_offsets: dict[int | None, int] = {}
-        running = 0
-        for doc_key in doc_order:
-            doc_offsets[doc_key] = running
-            running += doc_page_counts.get(doc_key, 0)
-
-        # 3) TRAITEMENT DOCUMENT PAR DOCUMENT : overlay + signature uniquement sur les champs concernés
+            base_bytes = read_working_base(envelope)
+            logger.info("_do_sign: base = PDF de base de travail de l'enveloppe")
+        if not base_bytes:
+            raise ValueError("Pas de document original")
+
+        # 3) Géométrie de chaque champ (les MediaBox ne changent pas avec les overlays/signatures incrémentales)
         doc_sequence = list(doc_order)
         for doc_key in fields_by_doc.keys():
             if doc_key not in doc_sequence:
                 doc_sequence.append(doc_key)
 
+        placements: list[dict] = []
         for doc_key in doc_sequence:
             field_list = fields_by_doc.get(doc_key)
             if not field_list:
@@ -1077,18 +1329,15 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                 page_num = int(fmeta.get('page') or 1)
                 page_ix = page_offset + max(0, page_num - 1)
 
-                reader_dim = PdfReader(io.BytesIO(base_bytes))
-                if page_ix >= len(reader_dim.pages):
+                if page_ix >= total_pages:
                     logger.warning(
                         "_do_sign: page %s hors limites pour document %s (total %s) — utilisation de la dernière page",
                         page_ix,
                         effective_doc_key,
-                        len(reader_dim.pages),
+                        total_pages,
                     )
-                    page_ix = max(0, len(reader_dim.pages) - 1)
-                page = reader_dim.pages[page_ix]
-                page_w = float(page.mediabox.width)
-                page_h = float(page.mediabox.height)
+                    page_ix = max(0, total_pages - 1)
+                page_w, page_h = page_size(base_geometry, page_ix)
 
                 try:
                     x_rel = float(pos.get('x', 0)); y_rel = float(pos.get('y', 0))
@@ -1102,6 +1351,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                 y_top = y_rel * page_h
                 w = w_rel * page_w
                 h = h_rel * page_h
+                y_pdf = page_h - (y_top + h)
 
                 field_id = str(fmeta.get('id') or fmeta.get('field_id') or '')
                 img_for_this_field = None
@@ -1115,52 +1365,84 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                 elif isinstance(signature_data, str):
                     img_for_this_field = signature_data
 
-                img_for_this_field = _clean_b64(img_for_this_field)
+                placements.append({
+                    'doc_key': doc_key,
+                    'effective_doc_key': effective_doc_key,
+                    'index': i,
+                    'field_id': field_id,
+                    'page_num': page_num,
+                    'page_ix': page_ix,
+                    'x': x,
+                    'y_top': y_top,
+                    'w': w,
+                    'h': h,
+                    'rect': (x + 1, y_pdf + 1, x + w - 1, y_pdf + h - 1),
+                    'img': _clean_b64(img_for_this_field),
+                })
+
+        def _unique_field_name(label) -> str:
+            signature_timestamp = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
+            unique_suffix = str(uuid.uuid4())[:8]
+            return f"Sig_{recipient.id}_{label}_{signature_timestamp}_{unique_suffix}"
+
+        def _seal(pdf_bytes: bytes, anchor: dict, label) -> bytes:
+            field_name = _unique_field_name(label)
+            logger.info(
+                "_do_sign: ajout signature numérique %s (doc=%s, page=%s)",
+                field_name,
+                anchor['effective_doc_key'],
+                anchor['page_num'],
+            )
+            return sign_pdf_bytes(
+                pdf_bytes,
+                field_name=field_name,
+                reason=f"Signature numérique - {recipient.full_name}",
+                location="Plateforme IntelliVibe",
+                rect=anchor['rect'],
+                page_ix=anchor['page_ix'],
+                appearance_image_b64=anchor['img'],
+            )
 
-                if img_for_this_field:
+        # 4) Overlays + scellement selon SIGNATURE_SEAL_MODE :
+        #    - per_field    : overlay + signature PAdES par champ (historique)
+        #    - per_document : tous les overlays en une passe, puis une signature par document
+        #    - single       : tous les overlays en une passe, puis une seule signature
+        seal_mode = str(getattr(settings, "SIGNATURE_SEAL_MODE", "per_field")).lower()
+        if seal_mode in ("single", "per_document") and placements:
+            overlays = [
+                (pl['page_ix'], pl['x'], pl['y_top'], pl['w'], pl['h'], pl['img'])
+                for pl in placements
+                if pl['img']
+            ]
+            if overlays:
+                logger.info("_do_sign: %s overlay(s) graphique(s) en une passe", len(overlays))
+                base_bytes = self._add_signature_overlays_to_pdf(base_bytes, overlays)
+
+            if seal_mode == "single":
+                base_bytes = _seal(base_bytes, placements[0], "all")
+            else:
+                groups: dict[int | None, list[dict]] = {}
+                for pl in placements:
+                    groups.setdefault(pl['doc_key'], []).append(pl)
+                for doc_key, group in groups.items():
+                    base_bytes = _seal(base_bytes, group[0], f"doc{doc_key}")
+        else:
+            for pl in placements:
+                if pl['img']:
                     logger.info(
                         "_do_sign: ajout overlay graphique pour champ %s (doc=%s, page=%s)",
-                        field_id,
-                        effective_doc_key,
-                        page_num,
+                        pl['field_id'],
+                        pl['effective_doc_key'],
+                        pl['page_num'],
                     )
                     base_bytes = self._add_signature_overlay_to_pdf(
-                        base_bytes, img_for_this_field, x, y_top, w, h, page_ix
+                        base_bytes, pl['img'], pl['x'], pl['y_top'], pl['w'], pl['h'], pl['page_ix']
                     )
-
-                reader_after_overlay = PdfReader(io.BytesIO(base_bytes))
-                current_page = reader_after_overlay.pages[page_ix]
-                page_h = float(current_page.mediabox.height)
-                y_pdf = page_h - (y_top + h)
-                rect_crypto = (x + 1, y_pdf + 1, x + w - 1, y_pdf + h - 1)
-
-                signature_timestamp = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
-                unique_suffix = str(uuid.uuid4())[:8]
-                unique_field_name = (
-                    f"Sig_{recipient.id}_{field_id}_{doc_key}_{i}_{signature_timestamp}_{unique_suffix}"
-                )
-
-                logger.info(
-                    "_do_sign: ajout signature numérique %s pour champ %s (doc=%s, page=%s)",
-                    unique_field_name,
-                    field_id,
-                    effective_doc_key,
-                    page_num,
-                )
-
-                base_bytes = sign_pdf_bytes(
-                    base_bytes,
-                    field_name=unique_field_name,
-                    reason=f"Signature numérique - {recipient.full_name}",
-                    location="Plateforme IntelliVibe",
-                    rect=rect_crypto,
-                    page_ix=page_ix,
-                    appearance_image_b64=img_for_this_field,
-                )
+                base_bytes = _seal(base_bytes, pl, f"{pl['field_id']}_{pl['doc_key']}_{pl['index']}")
 
         logger.info("_do_sign: traitement de tous les documents terminé")
 
-        # 4) Sauvegarder le résultat & statut
+        # 5) Sauvegarder le résultat & statut
         with transaction.atomic():
             # 1) Marquer le destinataire comme signé
             recipient.signed = True
@@ -1171,12 +1453,12 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
             sig_doc = SignatureDocument.objects.create(
                 envelope=envelope,
                 recipient=recipient,
-                signer=(self.request.user if self.request and self.request.user.is_authenticated else None),
+                signer_id=context.get("signer_id"),
                 is_guest=(recipient.user is None),
                 signature_data=signature_data,
                 signed_fields=signed_fields,
-                ip_address=self.request.META.get("REMOTE_ADDR"),
-                user_agent=self.request.META.get("HTTP_USER_AGENT", ""),
+                ip_address=context.get("ip_address"),
+                user_agent=context.get("user_agent", ""),
             )
         
             # 3) Sauvegarder le PDF signé initial (bytes = base_bytes)
@@ -1217,7 +1499,7 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
                     if front_base:
                         verify_url = f"{front_base}/verify/{qr.uuid}?sig={qr.hmac}"
                     else:
-                        verify_url = self.request.build_absolute_uri(f"/verify/{qr.uuid}?sig={qr.hmac}")
+                        verify_url = f"{context.get('base_url', '')}/verify/{qr.uuid}?sig={qr.hmac}"
         
                     # Anti-doublon: si déjà posé/scellé, ne pas recommencer
                     already_qr = bool((sig_doc.certificate_data or {}).get("qr_embedded"))
@@ -1327,116 +1609,60 @@ class EnvelopeViewSet(viewsets.ModelViewSet):
     @staticmethod
     def _add_qr_overlay_to_pdf(pdf_bytes: bytes, qr_png_bytes: bytes, *, size_pt=50, margin_pt=13, y_offset=-5):
         """
-        Ajoute un QR code en bas à droite du PDF, plus petit et légèrement plus bas.
-        - size_pt : taille du QR code (par défaut 60pt ≈ 0.8cm)
+        Ajoute un QR code en bas à droite de chaque page, plus petit et légèrement plus bas.
+        - size_pt : taille du QR code (par défaut 50pt)
         - margin_pt : marge avec le bord droit
         - y_offset : permet de descendre un peu plus le QR (valeur négative -> plus bas)
+        Le QR est embarqué une seule fois (Form XObject partagé, voir signature.qr_stamp).
         """
-        base_reader = PdfReader(io.BytesIO(pdf_bytes))
-        writer = PdfWriter()
-    
-        for page in base_reader.pages:
-            w = float(page.mediabox.width)
-            h = float(page.mediabox.height)
-    
-            buf = io.BytesIO()
-            c = canvas.Canvas(buf, pagesize=(w, h))
-    
-            # position : coin bas droit avec offset
-            x = w - margin_pt - size_pt
-            y = margin_pt + y_offset
-    
-            c.drawImage(
-                ImageReader(io.BytesIO(qr_png_bytes)),
-                x, y,
-                width=size_pt, height=size_pt,
-                mask='auto'
-            )
-            c.showPage()
-            c.save()
-            buf.seek(0)
-    
-            overlay_pdf = PdfReader(buf)
-            page.merge_page(overlay_pdf.pages[0])
-            writer.add_page(page)
-    
-        out = io.BytesIO()
-        writer.write(out)
-        return out.getvalue()
+        return stamp_qr_all_pages(pdf_bytes, qr_png_bytes, size_pt=size_pt, margin_pt=margin_pt, y_offset=y_offset)
     
     
 
     def _add_signature_overlay_to_pdf(self, pdf_bytes, signature_data, x, y_top, w, h, page_ix):
         """Version améliorée qui préserve TOUJOURS les signatures existantes"""
+        return self._add_signature_overlays_to_pdf(pdf_bytes, [(page_ix, x, y_top, w, h, signature_data)])
+
+    def _add_signature_overlays_to_pdf(self, pdf_bytes, overlays):
+        """
+        Appose plusieurs images de signature en UNE SEULE révision incrémentale.
+        overlays : [(page_ix, x, y_top, w, h, signature_data), ...] — coordonnées en points,
+        y_top mesuré depuis le haut de la page. Seules les pages touchées sont réécrites
+        (signature.pdf_overlay) : les signatures déjà présentes restent valides, et
+        chaque image n'est décodée et embarquée qu'une fois.
+        """
         try:
-            logger.info(f"_add_signature_overlay_to_pdf: overlay à ({x}, {y_top}, {w}, {h}) sur page {page_ix}")
-
-            # 1) Lire le PDF de base (qui peut déjà contenir des signatures)
-            base_reader = PdfReader(io.BytesIO(pdf_bytes))
-
-            # 2) Obtenir les dimensions de la page cible
-            if page_ix >= len(base_reader.pages):
-                logger.warning(f"Page {page_ix} n'existe pas, utilisation de la page 0")
-                page_ix = 0
-            page = base_reader.pages[page_ix]
-            page_w = float(page.mediabox.width)
-            page_h = float(page.mediabox.height)
-
-            # 3) Convertir les coordonnées (front-end -> PDF)
-            y_pdf = page_h - (y_top + h)
-
-            # 4) Extraire et valider l'image de signature
-            img_data = signature_data
-            if isinstance(signature_data, dict):
-                for key, value in signature_data.items():
-                    if isinstance(value, str) and value:
-                        img_data = value
-                        break
-            if not img_data or not isinstance(img_data, str):
-                logger.warning("Pas d'image de signature trouvée, overlay ignoré")
-                return pdf_bytes
-
-            # 5) Créer l'overlay avec ReportLab
-            packet = io.BytesIO()
-            c = canvas.Canvas(packet, pagesize=(page_w, page_h))
-            try:
-                # Gérer les data URLs
-                b64_data = img_data.split(',', 1)[1] if img_data.startswith('data:') else img_data
-                if b64_data:
-                    img_bytes = base64.b64decode(b64_data)
-                    c.drawImage(
-                        ImageReader(io.BytesIO(img_bytes)),
-                        x, y_pdf, width=w, height=h,
-                        preserveAspectRatio=True, mask='auto'
-                    )
-                    logger.info(f"Image de signature ajoutée avec succès à ({x}, {y_pdf})")
-            except Exception as e:
-                logger.warning(f"Erreur lors du traitement de l'image de signature: {e}")
-                # Continuer sans l'image plutôt que d'échouer
-
-            c.showPage()
-            c.save()
-            packet.seek(0)
-
-            # 6) Fusionner l'overlay avec TOUTES les pages existantes (préserve les signatures)
-            overlay_reader = PdfReader(packet)
-            writer = PdfWriter()
-
-            for i, base_page in enumerate(base_reader.pages):
-                if i == page_ix and len(overlay_reader.pages) > 0:
-                    try:
-                        base_page.merge_page(overlay_reader.pages[0])
-                        logger.info(f"Overlay fusionné sur page {i}")
-                    except Exception as e:
-                        logger.warning(f"Erreur lors de la fusion de l'overlay sur la page {i}: {e}")
-                writer.add_page(base_page)
-
-            # 7) Écrire le résultat
-            output = io.BytesIO()
-            writer.write(output)
-            result = output.getvalue()
-
-            logger.info(f"Overlay ajouté avec succès, taille finale: {len(result)} bytes")
+            logger.info(f"_add_signature_overlays_to_pdf: {len(overlays)} overlay(s)")
+
+            # 1) Ouvrir le PDF de base (qui peut déjà contenir des signatures)
+            overlay = IncrementalOverlay(pdf_bytes)
+            page_count = overlay.page_count
+
+            # 2) Poser chaque image (repère PDF bas-gauche, ratio conservé)
+            drawn = 0
+            for page_ix, x, y_top, w, h, signature_data in overlays:
+                if page_ix >= page_count:
+                    logger.warning(f"Page {page_ix} n'existe pas, utilisation de la page 0")
+                    page_ix = 0
+                try:
+                    sig = prepare_signature(signature_data)
+                except ValueError:
+                    logger.warning("Pas d'image de signature trouvée, overlay ignoré")
+                    continue
+                try:
+                    llx, lly, urx, ury = overlay.media_box(page_ix)
+                    # Convertir les coordonnées (front-end -> PDF)
+                    y_pdf = (ury - lly) - (y_top + h)
+                    box = fit_box(sig.image.width, sig.image.height, x, y_pdf, w, h)
+                    overlay.add_image(page_ix, sig.image, *box, key=sig.key)
+                    drawn += 1
+                except Exception as e:
+                    logger.warning(f"Erreur lors du traitement de l'image de signature: {e}")
+                    # Continuer sans l'image plutôt que d'échouer
+
+            # 3) Écrire la révision
+            result = overlay.to_bytes()
+            logger.info(f"{drawn} overlay(s) ajouté(s), taille finale: {len(result)} bytes")
             return result
 
         except Exception as e:
@@ -1507,7 +1733,7 @@ def serve_decrypted_pdf(request, public_id: uuid.UUID):
         )
         if sig_doc and sig_doc.signed_file:
             filename = _safe_filename(envelope.title or "document")
-            return EnvelopeViewSet._serve_pdf(sig_doc.signed_file, filename, inline=True)
+            return EnvelopeViewSet._serve_pdf(sig_doc.signed_file, filename, inline=True, request=request)
 
     # 2) sinon : original (global ou premier sous-document)
     doc = envelope.document_file or (envelope.documents.first().file if envelope.documents.exists() else None)
@@ -1515,7 +1741,7 @@ def serve_decrypted_pdf(request, public_id: uuid.UUID):
         return Response({"error": "Pas de document disponible"}, status=status.HTTP_404_NOT_FOUND)
 
     filename = _safe_filename(envelope.title or "document")
-    return EnvelopeViewSet._serve_pdf(doc, filename, inline=True)
+    return EnvelopeViewSet._serve_pdf(doc, filename, inline=True, request=request)
 
 class PrintQRCodeViewSet(viewsets.ModelViewSet):
     serializer_class = PrintQRCodeSerializer
@@ -1564,24 +1790,48 @@ class PrintQRCodeViewSet(viewsets.ModelViewSet):
         if not last_sig or not last_sig.signed_file:
             return Response({'error': 'Aucun document signé'}, status=status.HTTP_404_NOT_FOUND)
     
-        ev = EnvelopeViewSet(); ev.request = request 
-        return EnvelopeViewSet._serve_pdf(last_sig.signed_file, f"{env.title}.pdf", inline=True)
+        return EnvelopeViewSet._serve_pdf(last_sig.signed_file, f"{env.title}.pdf", inline=True, request=request)
 
     @action(detail=True, methods=['get'], permission_classes=[permissions.AllowAny])
     def verify(self, request, *args, **kwargs):
-        """Preuve publique pérenne (aucun token, aucun expiry) + liste des signataires."""
-        try:
-            qr = self.get_object()
-        except Exception:
-            return Response({'error': 'QR non trouvé'}, status=status.HTTP_404_NOT_FOUND)
-    
+        """
+        Preuve publique pérenne (aucun token, aucun expiry) + liste des signataires.
+        Réponse mise en cache par QR (signature.qr_verify_cache) et revalidable
+        via ETag / Last-Modified.
+        """
         sig = request.GET.get('sig')
-        if not sig or sig != qr.hmac:
-            return Response({'error': 'Signature HMAC manquante ou invalide'}, status=status.HTTP_403_FORBIDDEN)
-    
-        if not qr.is_valid:
-            return Response({'error': 'QR révoqué'}, status=status.HTTP_403_FORBIDDEN)
-    
+        entry = qr_verify_cache.get_entry(kwargs.get(self.lookup_url_kwarg), sig)
+        if entry is None:
+            try:
+                qr = self.get_object()
+            except Exception:
+                return Response({'error': 'QR non trouvé'}, status=status.HTTP_404_NOT_FOUND)
+
+            if not sig or sig != qr.hmac:
+                return Response({'error': 'Signature HMAC manquante ou invalide'}, status=status.HTTP_403_FORBIDDEN)
+
+            if not qr.is_valid:
+                return Response({'error': 'QR révoqué'}, status=status.HTTP_403_FORBIDDEN)
+
+            entry = self._verify_entry(qr)
+            qr_verify_cache.set_entry(qr.uuid, sig, entry)
+
+        # URL absolue (PDF signé) pratique pour le front
+        base_api = (request.build_absolute_uri('/')[:-1]).rstrip('/')
+        payload = dict(entry['payload'])
+        payload['document_url'] = f"{base_api}/api/signature/prints/{payload['qr_uuid']}/document/?sig={sig}"
+
+        response = Response(payload)
+        response['ETag'] = entry['etag']
+        if entry['last_modified'] is not None:
+            response['Last-Modified'] = http_date(entry['last_modified'])
+        response['Cache-Control'] = 'no-cache'
+        return get_conditional_response(
+            request, etag=entry['etag'], last_modified=entry['last_modified'], response=response
+        )
+
+    def _verify_entry(self, qr) -> dict:
+        """Payload de verify (sans document_url, propre à l'hôte) + validateurs HTTP."""
         env = qr.envelope
         # Dernier document signé (si dispo)
         last_sig = (
@@ -1590,9 +1840,10 @@ class PrintQRCodeViewSet(viewsets.ModelViewSet):
             .order_by('-signed_at')
             .first()
         )
-    
+
         # Construire la liste des signataires (nom + date)
         signers = []
+        modified = [env.updated_at]
         for r in env.recipients.order_by('order'):
             signers.append({
                 'full_name': r.full_name,
@@ -1600,11 +1851,8 @@ class PrintQRCodeViewSet(viewsets.ModelViewSet):
                 'signed': bool(r.signed),
                 'signed_at': r.signed_at.isoformat() if r.signed_at else None,
             })
-    
-        # URL absolue (PDF signé) pratique pour le front
-        base_api = (request.build_absolute_uri('/')[:-1]).rstrip('/')
-        doc_url = f"{base_api}/api/signature/prints/{qr.uuid}/document/?sig={sig}"
-    
+            modified.append(r.signed_at)
+
         # Payload de base
         payload = {
             'qr_uuid': str(qr.uuid),
@@ -1614,9 +1862,9 @@ class PrintQRCodeViewSet(viewsets.ModelViewSet):
             'completed': (env.status == 'completed'),
             'completed_at': last_sig.signed_at.isoformat() if last_sig and last_sig.signed_file else None,
             'signers': signers,
-            'document_url': doc_url,
+            'document_url': None,
         }
-    
+
         # Ajouter empreintes + infos certificat
         cert_data = (last_sig.certificate_data or {}) if last_sig else {}
         payload.update({
@@ -1629,6 +1877,14 @@ class PrintQRCodeViewSet(viewsets.ModelViewSet):
                 "serial_number":(cert_data.get("certificate") or {}).get("serial_number"),
             },
         })
-    
-        return Response(payload)
+        if last_sig:
+            modified.append(last_sig.signed_at)
+
+        digest = hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        last_modified = max((m for m in modified if m), default=None)
+        return {
+            'payload': payload,
+            'etag': f'"{digest[:32]}"',
+            'last_modified': int(last_modified.timestamp()) if last_modified else None,
+        }
     
\ No newline at end of file
@@ -0,0 +1,132 @@
+"""
+PDF de base de travail par enveloppe.
+
+Concaténation chiffrée des documents originaux (document principal puis annexes),
+ou le document d'origine tel quel s'il est unique. Matérialisée une seule fois
+(à l'envoi, ou à la demande sous verrou) et réutilisée par tous les signataires. Le layout associé fixe l'ordre des documents, le nombre
+de pages et les offsets de chacun, ainsi que la géométrie de chaque page.
+"""
+from __future__ import annotations
+
+import io
+import logging
+
+from django.db import transaction
+from PyPDF2 import PdfReader, PdfWriter
+
+from .models import Envelope
+from .storages import AADContentFile
+
+logger = logging.getLogger(__name__)
+
+
+def _sources(envelope: Envelope) -> list[tuple[int | None, object, object, list]]:
+    """
+    [(doc_key, propriétaire, field_file, empreinte)] dans l'ordre de concaténation
+    (None => document_file ; le propriétaire porte l'index page_geometry).
+    """
+    sources = []
+    if envelope.document_file and getattr(envelope.document_file, "name", ""):
+        sources.append((None, envelope, envelope.document_file, [None, envelope.hash_original, envelope.version]))
+    for doc in envelope.documents.order_by("id"):
+        sources.append((doc.id, doc, doc.file, [doc.id, doc.hash_original, doc.version]))
+    return sources
+
+
+def _is_fresh(envelope: Envelope, fingerprint: list) -> bool:
+    layout = envelope.working_base_layout or {}
+    return bool(envelope.working_base and envelope.working_base.name) and layout.get("sources") == fingerprint
+
+
+def _read(field_file) -> bytes:
+    with field_file.storage.open(field_file.name, "rb") as fh:
+        return fh.read()
+
+
+def _build(envelope: Envelope, sources) -> dict:
+    readable = []
+    for doc_key, owner, field_file, _ in sources:
+        # Géométrie lue sur l'index persisté à l'upload (EnvelopeDocument/Envelope.page_geometry)
+        geometry = owner.get_page_geometry()
+        try:
+            data = _read(field_file)
+        except Exception:
+            data = None
+        if not data or not geometry.get("pages"):
+            logger.warning("Impossible de lire le document %s pour la base de l'enveloppe %s", doc_key, envelope.id)
+            continue
+        readable.append((doc_key, data, geometry["pages"]))
+    if not readable:
+        raise ValueError("Pas de document original")
+
+    order = [doc_key for doc_key, _, _ in readable]
+    page_counts = [len(doc_pages) for _, _, doc_pages in readable]
+    pages = [page for _, _, doc_pages in readable for page in doc_pages]
+    if len(readable) == 1:
+        # Document unique : octets d'origine inchangés (PdfWriter ne garde que les pages et
+        # perdrait AcroForm, signets, signatures existantes, OpenAction, métadonnées)
+        base_bytes = readable[0][1]
+    else:
+        writer = PdfWriter()
+        for _, data, _ in readable:
+            for page in PdfReader(io.BytesIO(data)).pages:
+                writer.add_page(page)
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        base_bytes = buffer.getvalue()
+
+    offsets, running = [], 0
+    for count in page_counts:
+        offsets.append(running)
+        running += count
+
+    old_name = envelope.working_base.name if envelope.working_base else ""
+    envelope.working_base.save(
+        f"base_{envelope.public_id}.pdf",
+        AADContentFile(base_bytes, aad=envelope.doc_uuid.bytes),
+        save=False,
+    )
+    layout = {
+        "sources": [fp for *_, fp in sources],
+        "order": order,
+        "page_counts": page_counts,
+        "offsets": offsets,
+        "pages": pages,
+    }
+    envelope.working_base_layout = layout
+    # update() : ne pas repasser par Envelope.save() (re-chiffrement / versioning)
+    Envelope.objects.filter(pk=envelope.pk).update(
+        working_base=envelope.working_base.name, working_base_layout=layout
+    )
+    if old_name and old_name != envelope.working_base.name:
+        try:
+            envelope.working_base.storage.delete(old_name)
+        except Exception:
+            logger.warning("Impossible de supprimer l'ancienne base %s", old_name)
+    logger.info("Base de travail construite pour l'enveloppe %s (%s pages)", envelope.id, len(pages))
+    return layout
+
+
+def ensure_working_base(envelope: Envelope) -> dict:
+    """
+    Retourne le layout de la base de travail, en la (re)construisant si elle manque
+    ou si un document source a changé. La construction se fait sous verrou de ligne
+    pour que des signataires parallèles ne concatènent pas chacun de leur côté.
+    """
+    sources = _sources(envelope)
+    fingerprint = [fp for *_, fp in sources]
+    if _is_fresh(envelope, fingerprint):
+        return envelope.working_base_layout
+
+    with transaction.atomic():
+        locked = Envelope.objects.select_for_update().get(pk=envelope.pk)
+        if not _is_fresh(locked, fingerprint):
+            _build(locked, sources)
+    envelope.working_base = locked.working_base.name
+    envelope.working_base_layout = locked.working_base_layout
+    return envelope.working_base_layout
+
+
+def read_working_base(envelope: Envelope) -> bytes:
+    """Octets déchiffrés de la base de travail (appeler ensure_working_base avant)."""
+    return _read(envelope.working_base)